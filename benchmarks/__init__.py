@@ -0,0 +1 @@
+"""Бенчмарки горячих путей обработки сообщений (см. benchmarks/runner.py)."""
@@ -0,0 +1,79 @@
+"""Сборка контекста, обслуживание rolling-памяти и сборка промпта."""
+
+from __future__ import annotations
+
+import shutil
+from datetime import datetime
+
+from benchmarks.fixtures import HOT_CHAT_ID, populate_interactions, populate_recent_days
+from noty.core.context_manager import DynamicContextBuilder
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.memory.recent_days_memory import RecentDaysMemory
+from noty.memory.sqlite_db import SQLiteDBManager
+from noty.perf.harness import FakeEncoder
+from noty.prompts.prompt_builder import ModularPromptBuilder
+
+MAINTENANCE_NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def _context_builder(workdir, interactions: int) -> DynamicContextBuilder:
+    db_path = workdir / "noty.db"
+    populate_interactions(db_path, interactions)
+    return DynamicContextBuilder(
+        db_manager=SQLiteDBManager(db_path=str(db_path)),
+        embedding_filter=EmbeddingFilter(encoder=FakeEncoder(), cache_path=str(workdir / "embeddings_cache")),
+    )
+
+
+class ContextBuildSuite:
+    params = [1_000, 100_000, 1_000_000]
+    quick_params = [1_000]
+    repeat = 3
+
+    def prepare(self, interactions: int) -> None:
+        self.builder = _context_builder(self.workdir, interactions)
+
+    def time_build_context(self, interactions: int) -> None:
+        self.builder.build_context(chat_id=HOT_CHAT_ID, current_message="ноти, почему код опять упал?", user_id=1, platform="vk")
+
+
+class RecentDaysMaintenanceSuite:
+    params = [1_000, 20_000]
+    quick_params = [1_000]
+    number = 1
+
+    def prepare(self, rows_count: int) -> None:
+        self.template = self.workdir / "template.db"
+        RecentDaysMemory(SQLiteDBManager(db_path=str(self.template)), logs_dir=str(self.workdir / "logs"))
+        populate_recent_days(self.template, rows_count, now=MAINTENANCE_NOW)
+        self.work_db = self.workdir / "work.db"
+
+    def setup(self, rows_count: int) -> None:
+        shutil.copyfile(self.template, self.work_db)
+        self.memory = RecentDaysMemory(SQLiteDBManager(db_path=str(self.work_db)), logs_dir=str(self.workdir / "logs"))
+
+    def time_run_maintenance(self, rows_count: int) -> None:
+        self.memory._run_maintenance(MAINTENANCE_NOW)
+
+
+class PromptBuildSuite:
+    def prepare(self) -> None:
+        builder = _context_builder(self.workdir, 1_000)
+        self.context = builder.build_context(chat_id=HOT_CHAT_ID, current_message="ноти, почему код опять упал?", user_id=1, platform="vk")
+        self.prompt_builder = ModularPromptBuilder(
+            prompts_dir=str(self.workdir / "prompts"), config_path=str(self.workdir / "persona_prompt_config.json")
+        )
+        self.persona = {"tone": "ironic", "known_aliases": ["кот", "бро"], "preferred_alias": "кот"}
+        self.thoughts = {"strategy": "playful_sarcasm", "quality_score": 0.8, "thoughts": ["мысль"] * 5}
+
+    def time_build_full_prompt(self) -> None:
+        self.prompt_builder.build_full_prompt(
+            context=self.context,
+            mood="playful",
+            energy=80,
+            user_relationship={"score": 3, "name": "кот"},
+            runtime_modifiers={"preferred_tone": "playful", "sarcasm_level": 0.5, "response_rate_bias": 0.0},
+            persona_profile=self.persona,
+            thought_context=self.thoughts,
+            environment_context={"platform": "vk", "tools": []},
+        )
@@ -0,0 +1,38 @@
+"""Фильтры: эвристика и пакетная семантическая фильтрация."""
+
+from __future__ import annotations
+
+import random
+
+from benchmarks.fixtures import message_corpus
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.heuristic_filter import HeuristicFilter
+from noty.perf.harness import FakeEncoder
+
+
+class HeuristicFilterSuite:
+    def prepare(self) -> None:
+        self.filter = HeuristicFilter()
+        self.messages = message_corpus(200)
+
+    def setup(self) -> None:
+        random.seed(0)
+
+    def time_should_check_embeddings(self) -> None:
+        for message in self.messages:
+            self.filter.should_check_embeddings(message)
+
+
+class EmbeddingBatchFilterSuite:
+    params = [16, 256]
+
+    def prepare(self, batch_size: int) -> None:
+        self.filter = EmbeddingFilter(encoder=FakeEncoder(), cache_path=str(self.workdir / "embeddings_cache"))
+        self.messages = message_corpus(batch_size)
+
+    def time_batch_filter_cold(self, batch_size: int) -> None:
+        self.filter._message_vector_cache.clear()
+        self.filter.batch_filter(self.messages)
+
+    def time_batch_filter_warm(self, batch_size: int) -> None:
+        self.filter.batch_filter(self.messages)
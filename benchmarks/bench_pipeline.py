@@ -0,0 +1,48 @@
+"""Транспортное состояние и сквозной handle_message на заглушённом боте."""
+
+from __future__ import annotations
+
+import itertools
+import json
+
+from noty.perf.harness import build_stub_bot, resolve_subsystems, synthetic_events
+from noty.transport.vk.state_store import VKStateStore
+
+
+class VKStateStoreSuite:
+    params = [1_000, 5_000]
+
+    def prepare(self, cache_size: int) -> None:
+        self.state_path = self.workdir / "vk_state.json"
+
+    def setup(self, cache_size: int) -> None:
+        self.state_path.write_text(
+            json.dumps({"longpoll_ts": "1", "processed_update_ids": [str(i) for i in range(cache_size)]}), encoding="utf-8"
+        )
+        self.store = VKStateStore(state_path=str(self.state_path), dedup_cache_size=cache_size)
+        self.store.journal_path.unlink(missing_ok=True)
+        self.next_id = itertools.count(cache_size)
+
+    def time_mark_processed(self, cache_size: int) -> None:
+        self.store.mark_processed(next(self.next_id))
+
+    def time_is_processed(self, cache_size: int) -> None:
+        self.store.is_processed(cache_size // 2)
+
+    def time_poll_cycle_batched(self, cache_size: int) -> None:
+        with self.store.batch():
+            self.store.set_longpoll_ts(str(next(self.next_id)))
+            for _ in range(10):
+                self.store.mark_processed(next(self.next_id))
+
+
+class HandleMessageSuite:
+    params = ["full", "no_logging"]
+
+    def prepare(self, variant: str) -> None:
+        disabled = ["logging"] if variant == "no_logging" else []
+        self.bot = build_stub_bot(self.workdir, subsystems=resolve_subsystems(disabled=disabled))
+        self.events = itertools.cycle(synthetic_events(200, force_respond_ratio=1.0))
+
+    def time_handle_message(self, variant: str) -> None:
+        self.bot.handle_message(next(self.events))
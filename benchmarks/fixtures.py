@@ -0,0 +1,67 @@
+"""Детерминированные фикстуры для бенчмарков: наполненная SQLite, контекст, сообщения."""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from noty.perf.harness import SYNTHETIC_PHRASES
+
+CHATS = 50
+HOT_CHAT_ID = 1000
+
+
+def message_corpus(count: int, seed: int = 0) -> List[str]:
+    """Уникальные сообщения на основе синтетических фраз (чтобы кэш эмбеддингов не срабатывал)."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(SYNTHETIC_PHRASES)} #{idx}" for idx in range(count)]
+
+
+def populate_interactions(db_path: str | Path, interactions: int, seed: int = 0) -> None:
+    """Заполняет таблицу interactions: ``interactions`` строк на ``CHATS`` чатов одной транзакцией."""
+    from noty.memory.sqlite_db import SQLiteDBManager
+
+    SQLiteDBManager(db_path=str(db_path))
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    rows = (
+        (
+            (started + timedelta(seconds=idx)).isoformat(),
+            "vk",
+            HOT_CHAT_ID + idx % CHATS,
+            1 + rng.randrange(200),
+            f"{SYNTHETIC_PHRASES[idx % len(SYNTHETIC_PHRASES)]} #{idx}",
+            0,
+            "",
+        )
+        for idx in range(interactions)
+    )
+    conn = sqlite3.connect(str(db_path))
+    conn.executemany(
+        "INSERT INTO interactions (timestamp, platform, chat_id, user_id, message_text, noty_responded, response_text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def populate_recent_days(db_path: str | Path, rows_count: int, now: datetime, seed: int = 0) -> None:
+    """Наполняет recent_days_memory: ~10% дублей и ~20% записей старше окна хранения."""
+    rng = random.Random(seed)
+    rows = []
+    for idx in range(rows_count):
+        age_days = rng.uniform(0, 14) if rng.random() < 0.2 else rng.uniform(0, 4)
+        text = f"факт #{idx // 10 if rng.random() < 0.1 else idx}"
+        created_at = (now - timedelta(days=age_days)).isoformat()
+        rows.append(("vk", HOT_CHAT_ID + idx % CHATS, 1, text, 1.0 + rng.random(), 1.0, "message", created_at))
+    conn = sqlite3.connect(str(db_path))
+    conn.executemany(
+        "INSERT INTO recent_days_memory (platform, chat_id, user_id, memory_text, base_importance, cached_weight, source, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
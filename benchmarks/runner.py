@@ -0,0 +1,193 @@
+"""Запуск бенчмарков горячих путей и сравнение результатов между коммитами.
+
+Протокол (в духе asv): модуль ``benchmarks/bench_*.py`` объявляет классы ``*Suite``.
+
+- ``params`` / ``quick_params`` — список значений параметра (``quick_params`` для ``--quick``);
+- ``prepare(param)`` — один раз на значение параметра (тяжёлые фикстуры);
+- ``setup(param)`` — перед каждым повтором;
+- ``time_*(param)`` — измеряемый метод;
+- ``number`` — вызовов на повтор (0 = автокалибровка до ``min_repeat_seconds``), ``repeat`` — число повторов.
+
+Перед ``prepare`` раннер выставляет ``self.workdir`` — временный каталог фикстур.
+
+    python -m benchmarks.runner --quick
+    python -m benchmarks.runner --compare benchmarks/results/<old>.json --fail-on-regression
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import inspect
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+NO_PARAM = object()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR.parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def discover_suites(name_filter: str | None = None) -> List[tuple[str, type]]:
+    suites: List[tuple[str, type]] = []
+    for path in sorted(BENCH_DIR.glob("bench_*.py")):
+        module = importlib.import_module(f"benchmarks.{path.stem}")
+        for name, obj in inspect.getmembers(module, inspect.isclass):
+            if obj.__module__ != module.__name__ or not name.endswith("Suite"):
+                continue
+            qualified = f"{path.stem}.{name}"
+            if name_filter and name_filter.lower() not in qualified.lower():
+                continue
+            suites.append((qualified, obj))
+    return suites
+
+
+def _call(method: Any, param: Any) -> Any:
+    return method() if param is NO_PARAM else method(param)
+
+
+def _calibrate(method: Any, param: Any, min_repeat_seconds: float) -> int:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            _call(method, param)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_repeat_seconds or number >= 1_000_000:
+            return number
+        number = max(number * 2, int(number * min_repeat_seconds / max(elapsed, 1e-9)))
+
+
+def _measure(suite: Any, method: Any, param: Any, repeat: int, min_repeat_seconds: float) -> Dict[str, Any]:
+    setup = getattr(suite, "setup", None)
+    number = int(getattr(suite, "number", 0) or 0)
+    if number <= 0:
+        if setup:
+            _call(setup, param)
+        number = _calibrate(method, param, min_repeat_seconds)
+    per_call: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            _call(setup, param)
+        started = time.perf_counter()
+        for _ in range(number):
+            _call(method, param)
+        per_call.append((time.perf_counter() - started) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_seconds": min(per_call),
+        "median_seconds": statistics.median(per_call),
+        "mean_seconds": statistics.fmean(per_call),
+        "stddev_seconds": statistics.pstdev(per_call),
+    }
+
+
+def run_benchmarks(
+    name_filter: str | None = None,
+    quick: bool = False,
+    repeat: int | None = None,
+    min_repeat_seconds: float = 0.2,
+    log: Any = print,
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    tmp_root = Path(tempfile.mkdtemp(prefix="noty-bench-"))
+    try:
+        for qualified, suite_cls in discover_suites(name_filter):
+            params: Iterable[Any] = (getattr(suite_cls, "quick_params", None) if quick else None) or getattr(suite_cls, "params", None) or [NO_PARAM]
+            for param in params:
+                suite = suite_cls()
+                suite.workdir = tmp_root / qualified / ("default" if param is NO_PARAM else str(param))
+                suite.workdir.mkdir(parents=True, exist_ok=True)
+                if hasattr(suite, "prepare"):
+                    _call(suite.prepare, param)
+                suite_repeat = repeat or int(getattr(suite_cls, "repeat", 5))
+                for method_name, method in inspect.getmembers(suite, inspect.ismethod):
+                    if not method_name.startswith("time_"):
+                        continue
+                    key = f"{qualified}.{method_name}" + ("" if param is NO_PARAM else f"[{param}]")
+                    stats = _measure(suite, method, param, suite_repeat, min_repeat_seconds)
+                    results[key] = stats
+                    log(f"{key:<75} {stats['median_seconds'] * 1e6:>12.1f} us  (x{stats['number']}, r{stats['repeat']})")
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Сравнение медиан; ``regression`` — новая медиана медленнее базовой больше чем на ``threshold``."""
+    rows: List[Dict[str, Any]] = []
+    for key, stats in sorted(current.get("results", {}).items()):
+        base = baseline.get("results", {}).get(key)
+        if not base or not base.get("median_seconds"):
+            continue
+        ratio = stats["median_seconds"] / base["median_seconds"]
+        rows.append(
+            {
+                "benchmark": key,
+                "baseline_seconds": base["median_seconds"],
+                "current_seconds": stats["median_seconds"],
+                "ratio": round(ratio, 4),
+                "regression": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Noty hot-path benchmarks")
+    parser.add_argument("--filter", default=None, help="подстрока имени suite (например ContextBuild)")
+    parser.add_argument("--quick", action="store_true", help="только малые параметры (без 100k/1M)")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--output", default=None, help="куда сохранить JSON (по умолчанию benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.1, help="допустимое замедление медианы (0.1 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(name_filter=args.filter, quick=args.quick, repeat=args.repeat)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['meta']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты: {output}")
+
+    if not args.compare:
+        return 0
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    rows = compare_results(baseline, report, threshold=args.threshold)
+    for row in rows:
+        mark = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['benchmark']:<75} x{row['ratio']:<8} {mark}")
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
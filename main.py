@@ -3,19 +3,29 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import importlib
 import json
+import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 import yaml
 
-from noty.core.api_rotator import APIRotator
+from noty.core.api_rotator import APIRotator, LLMCallPolicy, ProviderTier
 from noty.core.bot import NotyBot
+from noty.core.coalescer import MessageCoalescer
 from noty.core.context_manager import DynamicContextBuilder
 from noty.core.events import InteractionJSONLLogger
 from noty.core.message_handler import MessageHandler
+from noty.core.model_router import ModelRouter
+from noty.core.warmup import ModelWarmup, embedding_warmup
 from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.encoders import DEFAULT_MODEL_NAME, build_encoder
 from noty.filters.heuristic_filter import HeuristicFilter
+from noty.filters.interest_profiles import InterestProfileRegistry
+from noty.filters.reaction_decider import DeciderStateStore, ReactionDecider
+from noty.filters.reaction_model import ReactionModel
 from noty.memory.semantic_retriever import LlamaSemanticRetriever
 from noty.memory.notebook import NotiNotebookManager
 from noty.memory.sqlite_db import SQLiteDBManager
@@ -25,26 +35,73 @@ from noty.prompts.prompt_builder import ModularPromptBuilder
 from noty.thought.monologue import InternalMonologue, ThoughtLogger
 from noty.tools.notebook_tools import NotebookToolService, register_notebook_tools
 from noty.tools.tool_executor import SafeToolExecutor
+from noty.transport.router import TransportRouter, create_transport_router
+from noty.transport.runtime import (
+    TransportRuntime,
+    bot_event_handler,
+    reply_dispatcher,
+    reply_senders_for,
+    telegram_reply_sender,
+    vk_reply_sender,
+)
+from noty.transport.telegram.client import TelegramClient
 from noty.transport.vk.client import VKAPIClient
+from noty.transport.vk.outbound import VKOutboundDispatcher
 from noty.transport.vk.polling import VKLongPollTransport
 from noty.transport.vk.state_store import VKStateStore
-from noty.transport.vk.webhook import VKWebhookHandler
+from noty.transport.webhook_server import WebhookIngress
 from noty.utils.logger import configure_logging
 from noty.utils.metrics import MetricsCollector
+from noty.utils.openmetrics import MetricsHTTPServer
+from noty.utils.tracing import Tracer
+
+
+CHAT_CONFIG_PATH = "./noty/config/chat_config.yaml"
+logger = logging.getLogger(__name__)
 
 
 def load_yaml(path: str) -> Dict[str, Any]:
     return yaml.safe_load(Path(path).read_text(encoding="utf-8"))
 
 
+def load_chat_config(path: str = CHAT_CONFIG_PATH) -> Dict[str, Any]:
+    return (load_yaml(path) or {}) if Path(path).exists() else {}
+
+
 def load_api_keys(path: str) -> list[str]:
     data = json.loads(Path(path).read_text(encoding="utf-8"))
     return data.get("openrouter_keys", [])
 
 
-def build_bot(config: Dict[str, Any]) -> NotyBot:
+def _load_reaction_model(config: Dict[str, Any], embedding_filter: EmbeddingFilter) -> tuple[ReactionModel | None, float]:
+    """Обученная модель реакции для A/B (bot.reaction_model); при любой несовместимости — только пайплайн."""
+    model_cfg = config.get("bot", {}).get("reaction_model", {}) or {}
+    path = model_cfg.get("path", "./noty/data/reaction_model.npz")
+    if not model_cfg.get("enabled") or not Path(path).exists():
+        return None, 0.0
+    try:
+        model = ReactionModel.load(path)
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Модель реакции %s не загружена: %s", path, exc)
+        return None, 0.0
+    encoder_id = getattr(embedding_filter.encoder, "model_id", embedding_filter.model_name)
+    if model.encoder_id and model.encoder_id != encoder_id:
+        logger.warning("Модель реакции обучена на %s, а encoder — %s: A/B выключен", model.encoder_id, encoder_id)
+        return None, 0.0
+    return model, float(model_cfg.get("traffic", 0.5))
+
+
+def build_bot(config: Dict[str, Any], chat_config: Dict[str, Any] | None = None) -> NotyBot:
     db_manager = SQLiteDBManager()
-    embedding_filter = EmbeddingFilter()
+    chat_config = load_chat_config() if chat_config is None else chat_config
+    warmup_cfg = config.get("bot", {}).get("warmup", {}) or {}
+    embedding_cfg = config.get("embedding", {}) or {}
+    embedding_filter = EmbeddingFilter(
+        model_name=embedding_cfg.get("model_name", DEFAULT_MODEL_NAME),
+        encoder=build_encoder(embedding_cfg),
+        defer_load=bool(warmup_cfg.get("enabled")),
+        profiles=InterestProfileRegistry.from_config(chat_config.get("interest_profiles")),
+    )
     semantic_retriever = LlamaSemanticRetriever()
     metrics = MetricsCollector()
     recent_days_memory = RecentDaysMemory(db_manager=db_manager)
@@ -57,22 +114,55 @@ def build_bot(config: Dict[str, Any]) -> NotyBot:
         metrics=metrics,
     )
     prompt_builder = ModularPromptBuilder()
+    decider_cfg = config.get("bot", {}).get("reaction_decider", {}) or {}
+    reaction_decider = ReactionDecider(
+        half_life_seconds=float(decider_cfg.get("half_life_seconds", 3600)),
+        max_scopes=int(decider_cfg.get("max_scopes", 10000)),
+        store=DeciderStateStore(decider_cfg["state_path"]) if decider_cfg.get("state_path") else None,
+        flush_interval_seconds=float(decider_cfg.get("flush_interval_seconds", 60)),
+    )
+    reaction_model, model_traffic = _load_reaction_model(config, embedding_filter)
     message_handler = MessageHandler(
         context_builder=context_builder,
         prompt_builder=prompt_builder,
         heuristic_filter=HeuristicFilter(pass_probability=config["bot"].get("react_target_rate", 0.2)),
         embedding_filter=embedding_filter,
+        reaction_decider=reaction_decider,
         metrics=metrics,
+        reaction_model=reaction_model,
+        model_traffic=model_traffic,
     )
+    if reaction_decider.store is not None:
+        atexit.register(message_handler.flush_decider_state)
     mood_manager = MoodManager()
     tool_executor = SafeToolExecutor(owner_id=config["transport"].get("owner_id", 0))
     notebook_manager = NotiNotebookManager(db_manager=db_manager)
     register_notebook_tools(tool_executor, NotebookToolService(notebook=notebook_manager))
+    llm_cfg = config.get("llm", {})
+    api_keys = load_api_keys("./noty/config/api_keys.json")
+    tiers = [ProviderTier.from_config(item, default_keys=api_keys) for item in llm_cfg.get("tiers", []) or []]
     api_rotator = APIRotator(
-        api_keys=load_api_keys("./noty/config/api_keys.json"),
-        backend=config.get("llm", {}).get("backend", "openai"),
+        api_keys=api_keys,
+        backend=llm_cfg.get("backend", "openai"),
+        tiers=tiers or None,
+    )
+    call_policies = llm_cfg.get("call_policies", {}) or {}
+    monologue_policy = LLMCallPolicy(**call_policies["monologue"]) if call_policies.get("monologue") else None
+    response_policy = LLMCallPolicy(**call_policies["response"]) if call_policies.get("response") else None
+    monologue = InternalMonologue(
+        api_rotator=api_rotator,
+        thought_logger=ThoughtLogger(),
+        cheap_model_name=config["bot"].get("cheap_thought_model", "meta-llama/llama-3.1-8b-instruct"),
+        full_model_name=config["bot"].get("response_model", "meta-llama/llama-3.1-70b-instruct"),
+        call_policy=monologue_policy,
     )
-    monologue = InternalMonologue(api_rotator=api_rotator, thought_logger=ThoughtLogger())
+    model_router = ModelRouter.from_config(config) if config.get("routing", {}).get("enabled", True) else None
+
+    warmup = ModelWarmup(metrics=metrics)
+    if warmup_cfg.get("enabled"):
+        warmup.add("embedding", embedding_warmup(embedding_filter, batches=int(warmup_cfg.get("batches", 2))))
+        if llm_cfg.get("backend", "openai") == "openai":
+            warmup.add("llm_client", lambda: importlib.import_module("openai"))
 
     return NotyBot(
         api_rotator=api_rotator,
@@ -83,16 +173,98 @@ def build_bot(config: Dict[str, Any]) -> NotyBot:
         db_manager=db_manager,
         interaction_logger=InteractionJSONLLogger(),
         metrics=metrics,
+        model_router=model_router,
+        response_call_policy=response_policy,
+        result_mode=config.get("bot", {}).get("result_mode", "lean"),
+        tracer=Tracer.from_config(config.get("tracing")),
+        # Без прогрева всё загружено синхронно: пустой ModelWarmup сразу готов.
+        warmup=warmup.start(),
     )
 
 
+def _build_event_handler(bot: NotyBot, config: Dict[str, Any], senders: Dict[str, Any]) -> Tuple[Any, MessageCoalescer | None]:
+    """Обработчик событий runtime: напрямую в бота или через склейку всплесков (bot.coalescing).
+
+    Вместе с обработчиком возвращается коалесцер (или None): его нужно остановить после runtime,
+    чтобы накопленные всплески не потерялись.
+    """
+    coalesce_cfg = config.get("bot", {}).get("coalescing", {}) or {}
+    if not coalesce_cfg.get("enabled"):
+        return bot_event_handler(bot, senders), None
+    runtime_cfg = config.get("transport", {}).get("runtime", {}) or {}
+    coalescer = MessageCoalescer(
+        bot.handle_message,
+        on_result=reply_dispatcher(senders),
+        window_seconds=float(coalesce_cfg.get("window_seconds", 1.5)),
+        max_wait_seconds=float(coalesce_cfg.get("max_wait_seconds", 6.0)),
+        max_messages=int(coalesce_cfg.get("max_messages", 10)),
+        # submit ждёт места, пока коалесцер полон: воркер runtime держит слот, и backpressure доходит до поллеров.
+        max_pending=int(coalesce_cfg.get("max_pending", runtime_cfg.get("max_pending", 256))),
+        workers=int(runtime_cfg.get("workers", 4)),
+        metrics=bot.metrics,
+    ).start()
+    return coalescer.submit, coalescer
+
+
+def _serve_webhooks(bot: NotyBot, config: Dict[str, Any], vk_client: VKAPIClient, outbound: VKOutboundDispatcher | None) -> None:
+    """ASGI-приём вебхуков VK и Telegram: ответ сразу, обработка — в пуле воркеров runtime."""
+    import uvicorn
+
+    transport_cfg = config.get("transport", {})
+    runtime_cfg = transport_cfg.get("runtime", {}) or {}
+    webhook_cfg = transport_cfg.get("webhook", {}) or {}
+    tg_cfg = transport_cfg.get("telegram", {}) or {}
+    senders: Dict[str, Any] = {"vk": vk_reply_sender(vk_client, outbound=outbound)}
+    if tg_cfg.get("bot_token"):
+        telegram_client = TelegramClient(token=tg_cfg["bot_token"])
+        senders["telegram"] = telegram_reply_sender(telegram_client)
+        if webhook_cfg.get("public_url"):
+            telegram_client.set_webhook(
+                webhook_cfg["public_url"].rstrip("/") + "/telegram",
+                secret_token=webhook_cfg.get("telegram_secret_token"),
+            )
+
+    # Апдейты приходят снаружи, поэтому роутер без поллеров: runtime работает только как пул воркеров.
+    handler, coalescer = _build_event_handler(bot, config, senders)
+    runtime = TransportRuntime(
+        TransportRouter([]),
+        handler,
+        workers=int(runtime_cfg.get("workers", 4)),
+        max_pending=int(runtime_cfg.get("max_pending", 256)),
+        metrics=bot.metrics,
+    ).start()
+    ingress = WebhookIngress(
+        submit=lambda event: runtime.submit(event, block=False),
+        telegram_secret_token=webhook_cfg.get("telegram_secret_token"),
+        vk_secret=webhook_cfg.get("vk_secret"),
+        vk_confirmation_token=transport_cfg.get("vk_confirmation_token"),
+        vk_group_id=transport_cfg.get("vk_group_id"),
+        dedup_size=int(transport_cfg.get("dedup_cache_size", 5000)),
+        metrics=bot.metrics,
+        readiness=lambda: bot.warmup is None or bot.warmup.ready,
+    )
+    try:
+        uvicorn.run(ingress, host=webhook_cfg.get("host", "127.0.0.1"), port=int(webhook_cfg.get("port", 8080)), log_level="warning")
+    finally:
+        runtime.stop()
+        if coalescer is not None:
+            coalescer.stop()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Noty bot runner")
     parser.add_argument("--mode", choices=["vk_longpoll", "vk_webhook", "dry_run"], default=None)
     parser.add_argument("--log-level", default=None)
     parser.add_argument("--log-file", default=None)
+    parser.add_argument("--profile-startup", action="store_true", help="показать разбор времени импорта и выйти")
     args = parser.parse_args()
 
+    if args.profile_startup:
+        from noty.perf.startup import profile_startup, render_startup_report
+
+        print(render_startup_report(profile_startup("main")))
+        return
+
     config = load_yaml("./noty/config/bot_config.yaml")
     log_cfg = config.get("logging", {})
     configure_logging(
@@ -106,6 +278,19 @@ def main() -> None:
         return
 
     bot = build_bot(config)
+    warmup_cfg = config.get("bot", {}).get("warmup", {}) or {}
+    metrics_cfg = config.get("metrics", {}) or {}
+    if metrics_cfg.get("enabled"):
+        MetricsHTTPServer(
+            bot.metrics,
+            host=metrics_cfg.get("host", "127.0.0.1"),
+            port=int(metrics_cfg.get("port", 9464)),
+            max_scopes=int(metrics_cfg.get("max_scopes", 50)),
+        ).start()
+    if warmup_cfg.get("enabled") and warmup_cfg.get("gate_transports"):
+        timeout = warmup_cfg.get("gate_timeout_seconds", 120)
+        if not bot.warmup.wait_ready(float(timeout) if timeout is not None else None):
+            print("Модели не готовы к старту транспорта — ранние сообщения пойдут в эвристическом режиме")
     transport_cfg = config.get("transport", {})
     client = VKAPIClient(
         token=transport_cfg["vk_token"],
@@ -118,18 +303,51 @@ def main() -> None:
         dedup_cache_size=transport_cfg.get("dedup_cache_size", 5000),
     )
 
+    outbound_cfg = transport_cfg.get("outbound", {}) or {}
+    outbound = None
+    if outbound_cfg.get("enabled"):
+        outbound = VKOutboundDispatcher(
+            client,
+            rate_per_second=float(outbound_cfg.get("rate_per_second", 20)),
+            max_batch=int(outbound_cfg.get("max_batch", 25)),
+            linger_seconds=float(outbound_cfg.get("linger_seconds", 0.05)),
+            metrics=bot.metrics,
+        ).start()
+
+    runtime_cfg = transport_cfg.get("runtime", {}) or {}
+    if mode == "vk_longpoll" and runtime_cfg.get("enabled"):
+        router = create_transport_router("./noty/config/bot_config.yaml")
+        senders = reply_senders_for(router, vk_outbound=outbound)
+        handler, coalescer = _build_event_handler(bot, config, senders)
+        try:
+            TransportRuntime(
+                router,
+                handler,
+                workers=int(runtime_cfg.get("workers", 4)),
+                max_pending=int(runtime_cfg.get("max_pending", 256)),
+                poll_idle_delay_seconds=float(runtime_cfg.get("poll_idle_delay_seconds", 0.5)),
+                metrics=bot.metrics,
+            ).run_forever()
+        finally:
+            if coalescer is not None:
+                coalescer.stop()
+        return
+
     if mode == "vk_longpoll":
-        VKLongPollTransport(client=client, bot=bot, state_store=state_store).run_forever()
+        lanes_cfg = transport_cfg.get("lanes", {}) or {}
+        VKLongPollTransport(
+            client=client,
+            bot=bot,
+            state_store=state_store,
+            lanes=int(lanes_cfg.get("count", 0)),
+            max_queue_per_lane=int(lanes_cfg.get("max_queue_per_lane", 64)),
+            overflow=lanes_cfg.get("overflow", "coalesce"),
+            max_age_seconds=lanes_cfg.get("max_age_seconds"),
+            outbound=outbound,
+        ).run_forever()
         return
 
-    webhook = VKWebhookHandler(
-        client=client,
-        bot=bot,
-        state_store=state_store,
-        confirmation_token=transport_cfg.get("vk_confirmation_token"),
-    )
-    print("VK webhook mode инициализирован. Используй VKWebhookHandler.handle_update(payload).")
-    _ = webhook
+    _serve_webhooks(bot, config, client, outbound)
 
 
 if __name__ == "__main__":
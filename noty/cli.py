@@ -122,7 +122,7 @@ def _health_status(config: dict[str, Any], log_level: str | None = None, log_fil
         _print_status("Telegram token", tg_token_ok, "опционально для first-run")
 
 
-def run_command(mode: str | None = None, log_level: str | None = None, log_file: str | None = None) -> int:
+def run_command(mode: str | None = None, log_level: str | None = None, log_file: str | None = None, profile_startup: bool = False) -> int:
     if not BOT_CONFIG_PATH.exists():
         _print_status("Config", False, f"не найден: {BOT_CONFIG_PATH}")
         return 1
@@ -135,6 +135,8 @@ def run_command(mode: str | None = None, log_level: str | None = None, log_file:
     _health_status(config, log_level=log_level, log_file=log_file)
 
     cmd = [sys.executable, "main.py"]
+    if profile_startup:
+        cmd.append("--profile-startup")
     if mode:
         cmd.extend(["--mode", mode])
     if log_level:
@@ -181,6 +183,268 @@ def panel_command(host: str = "127.0.0.1", port: int = 8765, reload_enabled: boo
     return 0
 
 
+def profile_command(
+    events_path: str | None = None,
+    count: int = 200,
+    output_dir: str = "./noty/data/profile",
+    disabled: list[str] | None = None,
+    enabled: list[str] | None = None,
+    sample_interval_ms: float = 1.0,
+    top: int = 30,
+    llm_latency_ms: float = 0.0,
+    seed: int = 0,
+) -> int:
+    from tempfile import TemporaryDirectory
+
+    from noty.perf.harness import FakeLLMRotator, build_stub_bot, load_interaction_events, resolve_subsystems, synthetic_events
+    from noty.perf.profiler import run_profile
+
+    try:
+        subsystems = resolve_subsystems(disabled=disabled or [], enabled=enabled or [])
+    except ValueError as exc:
+        _print_status("Profile", False, str(exc))
+        return 1
+
+    if events_path:
+        if not Path(events_path).exists():
+            _print_status("Events", False, f"не найден: {events_path}")
+            return 1
+        events = load_interaction_events(events_path, limit=count)
+    else:
+        events = synthetic_events(count, seed=seed)
+    if not events:
+        _print_status("Events", False, "корпус событий пуст")
+        return 1
+
+    print("== Профилирование пайплайна Noty ==")
+    _print_status("Events", True, f"{len(events)} ({events_path or 'synthetic'})")
+    _print_status("Subsystems", True, ", ".join(f"{name}={'on' if on else 'off'}" for name, on in subsystems.items()))
+
+    with TemporaryDirectory(prefix="noty-profile-") as workdir:
+        counter = iter(range(1_000_000))
+
+        def bot_factory():
+            return build_stub_bot(
+                Path(workdir) / f"run{next(counter)}",
+                subsystems=subsystems,
+                api_rotator=FakeLLMRotator(latency_seconds=llm_latency_ms / 1000),
+                seed=seed,
+            )
+
+        summary = run_profile(events, bot_factory, output_dir, sample_interval_seconds=sample_interval_ms / 1000, top=top)
+
+    _print_status("Throughput", True, f"{summary['per_event_ms']} мс/событие, статусы: {summary['statuses']}")
+    print("Горячие функции (tottime):")
+    for row in summary["hot_path"][:10]:
+        print(f"  {row['tottime_seconds']:>9.4f}s  {row['calls']:>7}  {row['function']}")
+    for name, path in summary["files"].items():
+        _print_status(name, True, path)
+    return 0
+
+
+def loadgen_command(
+    events_path: str | None = None,
+    mix_path: str | None = None,
+    count: int = 500,
+    rate: float = 0.0,
+    concurrency: int = 4,
+    llm_latency: str = "fixed:50",
+    llm_error_rate: float = 0.0,
+    keys: int = 4,
+    disabled: list[str] | None = None,
+    output_path: str | None = None,
+    seed: int = 0,
+) -> int:
+    import json
+    from tempfile import TemporaryDirectory
+
+    from noty.perf.fake_openrouter import parse_latency_spec
+    from noty.perf.harness import load_interaction_events, resolve_subsystems, synthetic_events
+    from noty.perf.loadgen import load_mix_spec, run_load
+
+    try:
+        subsystems = resolve_subsystems(disabled=disabled or [])
+        parse_latency_spec(llm_latency)
+    except ValueError as exc:
+        _print_status("Loadgen", False, str(exc))
+        return 1
+
+    if events_path:
+        if not Path(events_path).exists():
+            _print_status("Events", False, f"не найден: {events_path}")
+            return 1
+        events = load_interaction_events(events_path, limit=count)
+    else:
+        mix = load_mix_spec(mix_path) if mix_path else {}
+        events = synthetic_events(count, seed=seed, **mix)
+    if not events:
+        _print_status("Events", False, "корпус событий пуст")
+        return 1
+
+    print("== Нагрузочный прогон Noty ==")
+    _print_status("Events", True, f"{len(events)} ({events_path or mix_path or 'synthetic'})")
+    _print_status("Load", True, f"rate={rate or 'max'}/s, concurrency={concurrency}, llm={llm_latency}, errors={llm_error_rate}")
+
+    with TemporaryDirectory(prefix="noty-loadgen-") as workdir:
+        report = run_load(
+            events,
+            workdir,
+            rate=rate,
+            concurrency=concurrency,
+            llm_latency=llm_latency,
+            llm_error_rate=llm_error_rate,
+            keys=keys,
+            subsystems=subsystems,
+            seed=seed,
+        )
+
+    _print_status("Throughput", True, f"{report['throughput_per_second']} соб/с (offered {report['offered_rate']}), статусы: {report['statuses']}")
+    for name, row in report["latency"].items():
+        print(f"  {name:<12} p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms max={row['max_ms']}ms")
+    print(f"  queue depth  max={report['queue_depth']['max']} mean={report['queue_depth']['mean']}")
+    for stage, platforms in report["stages"].items():
+        for platform, row in platforms.items():
+            print(f"  {stage:<20} {platform:<9} p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms")
+    if output_path:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(output_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        _print_status("Report", True, output_path)
+    return 0
+
+
+def encoder_export_command(model_name: str | None = None, output_dir: str | None = None, quantize: bool = True) -> int:
+    from noty.filters.encoders import DEFAULT_MODEL_NAME, export_onnx_model
+
+    embedding_cfg = (_load_yaml(BOT_CONFIG_PATH) if BOT_CONFIG_PATH.exists() else {}).get("embedding", {}) or {}
+    model_name = model_name or embedding_cfg.get("model_name", DEFAULT_MODEL_NAME)
+    output_dir = output_dir or (embedding_cfg.get("onnx", {}) or {}).get("model_dir") or f"./noty/data/onnx/{model_name.rsplit('/', 1)[-1]}"
+    try:
+        path = export_onnx_model(model_name, output_dir, quantize=quantize)
+    except ImportError as exc:
+        _print_status("ONNX export", False, f"нужны torch, transformers и onnxruntime: {exc}")
+        return 1
+    _print_status("ONNX export", True, str(path))
+    return 0
+
+
+def encoder_check_command(candidate: str = "onnx", min_cosine: float = 0.98, output_path: str | None = None) -> int:
+    from noty.filters.encoders import build_encoder
+    from noty.perf.encoder_check import cross_check_encoders
+
+    embedding_cfg = dict((_load_yaml(BOT_CONFIG_PATH) if BOT_CONFIG_PATH.exists() else {}).get("embedding", {}) or {})
+    reference = build_encoder({**embedding_cfg, "backend": "sentence_transformers"})
+    try:
+        report = cross_check_encoders(reference, build_encoder({**embedding_cfg, "backend": candidate}), min_cosine=min_cosine)
+    except (RuntimeError, FileNotFoundError) as exc:
+        _print_status("Encoder check", False, str(exc))
+        return 1
+    print(f"== {report['candidate']} vs {report['reference']} на {report['texts']} текстах ==")
+    print(f"  cosine min={report['min_cosine']} mean={report['mean_cosine']}")
+    print(f"  topic agreement={report['topic_agreement']} max score drift={report['max_score_drift']}")
+    print(f"  encode: reference={report['reference_ms']}ms candidate={report['candidate_ms']}ms speedup={report['speedup']}x")
+    for row in report["worst"]:
+        print(f"  {row['cosine']:.5f}  {row['text']}")
+    if output_path:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(output_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    _print_status("Encoder check", report["passed"], "согласие с PyTorch в пределах порога" if report["passed"] else "расхождение выше порога")
+    return 0 if report["passed"] else 2
+
+
+def interest_learn_command(scope: str, k: int = 6, limit: int = 1000, db_path: str = "./noty/data/noty.db") -> int:
+    """Темы профиля по истории чата: печатает YAML-фрагмент для interest_profiles в chat_config.yaml."""
+    import yaml
+
+    from noty.filters.encoders import build_encoder
+    from noty.filters.interest_profiles import learn_topics
+    from noty.memory.sqlite_db import SQLiteDBManager
+
+    platform, _, chat_id = scope.partition(":")
+    if not platform or not chat_id.lstrip("-").isdigit():
+        _print_status("Interest learn", False, f"scope должен быть platform:chat_id, получено {scope!r}")
+        return 1
+    rows = SQLiteDBManager(db_path=db_path).get_recent_messages(platform, int(chat_id), limit=limit)
+    texts = [row["text"] for row in rows if row.get("text") and len(row["text"].split()) >= 3]
+    if len(texts) < k:
+        _print_status("Interest learn", False, f"мало истории: {len(texts)} сообщений в {scope}")
+        return 1
+    embedding_cfg = (_load_yaml(BOT_CONFIG_PATH) if BOT_CONFIG_PATH.exists() else {}).get("embedding", {}) or {}
+    topics = learn_topics(texts, build_encoder(embedding_cfg).encode(texts, convert_to_numpy=True), k=k)
+    snippet = {"interest_profiles": {scope.replace(":", "_").replace("-", ""): {"scopes": [scope], "topics": topics}}}
+    print(yaml.safe_dump(snippet, allow_unicode=True, sort_keys=False))
+    _print_status("Interest learn", True, f"{len(topics)} тем из {len(texts)} сообщений; проверь и перенеси в chat_config.yaml")
+    return 0
+
+
+def reaction_train_command(
+    logs_path: str = "./noty/data/logs/interactions",
+    output_path: str = "./noty/data/reaction_model.npz",
+    target_rate: float | None = None,
+    ignored_weight: float = 0.25,
+    holdout: float = 0.2,
+    l2: float = 1.0,
+) -> int:
+    """Обучение модели реакции по журналам; модель включается в bot.reaction_model."""
+    from noty.filters.embedding_filter import EmbeddingFilter
+    from noty.filters.encoders import build_encoder
+    from noty.filters.heuristic_filter import HeuristicFilter
+    from noty.filters.interest_profiles import InterestProfileRegistry
+    from noty.filters.reaction_training import build_training_set, load_decision_samples, train_reaction_model
+
+    config = _load_yaml(BOT_CONFIG_PATH) if BOT_CONFIG_PATH.exists() else {}
+    bot_cfg = config.get("bot", {}) or {}
+    chat_config_path = CONFIG_DIR / "chat_config.yaml"
+    chat_cfg = _load_yaml(chat_config_path) if chat_config_path.exists() else {}
+    samples = load_decision_samples(logs_path)
+    if len(samples) < 50:
+        _print_status("Reaction train", False, f"мало решений в журнале: {len(samples)} (нужно хотя бы 50)")
+        return 1
+    encoder = build_encoder(config.get("embedding", {}) or {})
+    embedding_filter = EmbeddingFilter(
+        encoder=encoder,
+        profiles=InterestProfileRegistry.from_config(chat_cfg.get("interest_profiles")),
+    )
+    X, y, weights = build_training_set(
+        samples,
+        embedding_filter,
+        HeuristicFilter(),
+        half_life_seconds=float((bot_cfg.get("reaction_decider", {}) or {}).get("half_life_seconds", 3600)),
+        ignored_weight=ignored_weight,
+    )
+    if len(set(y.tolist())) < 2:
+        _print_status("Reaction train", False, "в журнале только один класс исходов")
+        return 1
+    model, report = train_reaction_model(
+        X,
+        y,
+        weights,
+        target_rate=target_rate if target_rate is not None else float(bot_cfg.get("react_target_rate", 0.2)),
+        holdout=holdout,
+        l2=l2,
+        encoder_id=getattr(encoder, "model_id", ""),
+    )
+    model.save(output_path)
+    for key, value in report.items():
+        print(f"  {key:<24} {value}")
+    _print_status("Reaction train", True, f"{output_path} ({model.n_features} признаков); включи bot.reaction_model.enabled")
+    return 0
+
+
+def reaction_report_command(logs_path: str = "./noty/data/logs/interactions") -> int:
+    from noty.filters.reaction_training import ab_report, load_decision_samples
+
+    report = ab_report(load_decision_samples(logs_path))
+    if not report:
+        _print_status("Reaction A/B", False, f"нет решений в {logs_path}")
+        return 1
+    for variant, row in sorted(report.items()):
+        print(
+            f"  {variant:<9} decisions={row['decisions']} scopes={row['scopes']} "
+            f"response_rate={row['response_rate']} approval_rate={row['approval_rate']}"
+        )
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Noty local CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -192,6 +456,7 @@ def build_parser() -> argparse.ArgumentParser:
     run_parser.add_argument("--mode", choices=["vk_longpoll", "vk_webhook", "dry_run"], default=None)
     run_parser.add_argument("--log-level", default=None, help="уровень логирования (DEBUG/INFO/WARNING/ERROR)")
     run_parser.add_argument("--log-file", default=None, help="путь к файлу логов (например ./noty/data/noty.log)")
+    run_parser.add_argument("--profile-startup", action="store_true", help="разбор времени импорта (-X importtime) вместо запуска")
 
     panel_parser = subparsers.add_parser("panel", help="запуск localhost web-панели конфигурации")
     panel_parser.add_argument("--host", default="127.0.0.1")
@@ -202,6 +467,59 @@ def build_parser() -> argparse.ArgumentParser:
         help="автоперезагрузка web-панели при изменении исходников (режим разработки)",
     )
 
+    from noty.perf.subsystems import SUBSYSTEMS
+
+    profile_parser = subparsers.add_parser("profile", help="профилирование пайплайна на заглушённом боте")
+    profile_parser.add_argument("--events", default=None, help="JSONL InteractionJSONLLogger (файл или каталог); по умолчанию синтетика")
+    profile_parser.add_argument("--count", type=int, default=200, help="число событий для прогона")
+    profile_parser.add_argument("--output", default="./noty/data/profile", help="каталог для отчётов и flamegraph")
+    profile_parser.add_argument("--disable", action="append", choices=SUBSYSTEMS, default=[], help="выключить подсистему (можно повторять)")
+    profile_parser.add_argument("--enable", action="append", choices=SUBSYSTEMS, default=[], help="включить подсистему (например tracing)")
+    profile_parser.add_argument("--sample-interval-ms", type=float, default=1.0)
+    profile_parser.add_argument("--top", type=int, default=30, help="сколько функций включить в отчёт")
+    profile_parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="искусственная задержка фейкового LLM")
+    profile_parser.add_argument("--seed", type=int, default=0)
+
+    loadgen_parser = subparsers.add_parser("loadgen", help="нагрузочный прогон событий против фейкового OpenRouter")
+    loadgen_parser.add_argument("--events", default=None, help="JSONL InteractionJSONLLogger (файл или каталог); по умолчанию синтетика")
+    loadgen_parser.add_argument("--mix", default=None, help="YAML/JSON с параметрами синтетического микса (chats, users, force_respond_ratio, platforms)")
+    loadgen_parser.add_argument("--count", type=int, default=500)
+    loadgen_parser.add_argument("--rate", type=float, default=0.0, help="событий в секунду (0 = максимально быстро)")
+    loadgen_parser.add_argument("--concurrency", type=int, default=4, help="число воркеров handle_message")
+    loadgen_parser.add_argument("--llm-latency", default="fixed:50", help="fixed:ms | uniform:a:b | lognormal:median:sigma | exp:mean")
+    loadgen_parser.add_argument("--llm-error-rate", type=float, default=0.0, help="доля ответов 429 от фейкового OpenRouter")
+    loadgen_parser.add_argument("--keys", type=int, default=4, help="число фейковых API-ключей")
+    loadgen_parser.add_argument("--disable", action="append", choices=SUBSYSTEMS, default=[], help="выключить подсистему (можно повторять)")
+    loadgen_parser.add_argument("--output", default=None, help="куда сохранить JSON-отчёт")
+    loadgen_parser.add_argument("--seed", type=int, default=0)
+
+    export_parser = subparsers.add_parser("encoder-export", help="экспорт embedding-модели в ONNX (+ int8 квантизация)")
+    export_parser.add_argument("--model", default=None, help="по умолчанию embedding.model_name из bot_config.yaml")
+    export_parser.add_argument("--output", default=None, help="по умолчанию embedding.onnx.model_dir")
+    export_parser.add_argument("--no-quantize", action="store_true", help="оставить только fp32 model.onnx")
+
+    check_parser = subparsers.add_parser("encoder-check", help="сверка encoder-бэкенда с PyTorch на темах интересов")
+    check_parser.add_argument("--backend", default="onnx", help="кандидат (см. embedding.backend)")
+    check_parser.add_argument("--min-cosine", type=float, default=0.98)
+    check_parser.add_argument("--output", default=None, help="куда сохранить JSON-отчёт")
+
+    learn_parser = subparsers.add_parser("interest-learn", help="темы профиля интересов по истории чата")
+    learn_parser.add_argument("--scope", required=True, help="platform:chat_id, например telegram:-1001234567890")
+    learn_parser.add_argument("--k", type=int, default=6, help="сколько тем выделить")
+    learn_parser.add_argument("--limit", type=int, default=1000, help="сколько последних сообщений взять")
+    learn_parser.add_argument("--db", default="./noty/data/noty.db")
+
+    train_parser = subparsers.add_parser("reaction-train", help="обучить модель реакции по журналам взаимодействий")
+    train_parser.add_argument("--logs", default="./noty/data/logs/interactions", help="JSONL InteractionJSONLLogger (файл или каталог)")
+    train_parser.add_argument("--output", default="./noty/data/reaction_model.npz")
+    train_parser.add_argument("--target-rate", type=float, default=None, help="по умолчанию bot.react_target_rate")
+    train_parser.add_argument("--ignored-weight", type=float, default=0.25, help="вес проигнорированных сообщений (исход не наблюдался)")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="доля последних решений для проверки")
+    train_parser.add_argument("--l2", type=float, default=1.0)
+
+    report_parser = subparsers.add_parser("reaction-report", help="сравнение веток A/B (модель / пайплайн) по журналам")
+    report_parser.add_argument("--logs", default="./noty/data/logs/interactions")
+
     return parser
 
 
@@ -214,13 +532,67 @@ def main() -> None:
         raise SystemExit(code)
 
     if args.command == "run":
-        code = run_command(mode=args.mode, log_level=args.log_level, log_file=args.log_file)
+        code = run_command(mode=args.mode, log_level=args.log_level, log_file=args.log_file, profile_startup=args.profile_startup)
         raise SystemExit(code)
 
     if args.command == "panel":
         code = panel_command(host=args.host, port=args.port, reload_enabled=args.reload)
         raise SystemExit(code)
 
+    if args.command == "profile":
+        code = profile_command(
+            events_path=args.events,
+            count=args.count,
+            output_dir=args.output,
+            disabled=args.disable,
+            enabled=args.enable,
+            sample_interval_ms=args.sample_interval_ms,
+            top=args.top,
+            llm_latency_ms=args.llm_latency_ms,
+            seed=args.seed,
+        )
+        raise SystemExit(code)
+
+    if args.command == "loadgen":
+        code = loadgen_command(
+            events_path=args.events,
+            mix_path=args.mix,
+            count=args.count,
+            rate=args.rate,
+            concurrency=args.concurrency,
+            llm_latency=args.llm_latency,
+            llm_error_rate=args.llm_error_rate,
+            keys=args.keys,
+            disabled=args.disable,
+            output_path=args.output,
+            seed=args.seed,
+        )
+        raise SystemExit(code)
+
+    if args.command == "encoder-export":
+        raise SystemExit(encoder_export_command(model_name=args.model, output_dir=args.output, quantize=not args.no_quantize))
+
+    if args.command == "encoder-check":
+        raise SystemExit(encoder_check_command(candidate=args.backend, min_cosine=args.min_cosine, output_path=args.output))
+
+    if args.command == "interest-learn":
+        raise SystemExit(interest_learn_command(scope=args.scope, k=args.k, limit=args.limit, db_path=args.db))
+
+    if args.command == "reaction-train":
+        raise SystemExit(
+            reaction_train_command(
+                logs_path=args.logs,
+                output_path=args.output,
+                target_rate=args.target_rate,
+                ignored_weight=args.ignored_weight,
+                holdout=args.holdout,
+                l2=args.l2,
+            )
+        )
+
+    if args.command == "reaction-report":
+        raise SystemExit(reaction_report_command(logs_path=args.logs))
+
 
 if __name__ == "__main__":
     main()
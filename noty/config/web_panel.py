@@ -18,9 +18,12 @@ from typing import Any
 
 import yaml
 
+from noty.utils.metrics import MetricsCollector
+from noty.utils.openmetrics import CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE, render_openmetrics
+
 try:
     from fastapi import Depends, FastAPI, Form, HTTPException, Request, status
-    from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+    from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
     from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
     FASTAPI_AVAILABLE = True
@@ -66,6 +69,10 @@ except ImportError:  # pragma: no cover - fallback для окружений б
             super().__init__(content)
             self.status_code = status_code
 
+    class PlainTextResponse(str):  # type: ignore[override]
+        def __new__(cls, content: str = "", media_type: str | None = None, status_code: int = 200):
+            return super().__new__(cls, content)
+
     class _Status:
         HTTP_401_UNAUTHORIZED = 401
 
@@ -417,6 +424,17 @@ class LocalPanelChatSimulator:
         with self._lock:
             return list(self._history)
 
+    def metrics_collector(self) -> Any | None:
+        with self._lock:
+            return getattr(self._bot, "metrics", None)
+
+    def metrics_snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            bot = self._bot
+        if bot is None:
+            return {"metrics": MetricsCollector().snapshot(), "filter_stats": {}}
+        return bot.metrics_snapshot()
+
 
 CHAT_SIMULATOR = LocalPanelChatSimulator()
 
@@ -765,6 +783,18 @@ def panel_live(_: str = Depends(_verify_auth)) -> JSONResponse:
     )
 
 
+@app.get("/metrics")
+def metrics(_: str = Depends(_verify_auth)) -> PlainTextResponse:
+    collector = CHAT_SIMULATOR.metrics_collector() or MetricsCollector()
+    max_scopes = int(_load_yaml(PATHS.bot_config_path).get("metrics", {}).get("max_scopes", 50))
+    return PlainTextResponse(render_openmetrics(collector, max_scopes=max_scopes), media_type=OPENMETRICS_CONTENT_TYPE)
+
+
+@app.get("/metrics/snapshot")
+def metrics_snapshot(_: str = Depends(_verify_auth)) -> JSONResponse:
+    return JSONResponse(CHAT_SIMULATOR.metrics_snapshot())
+
+
 @app.post("/save")
 def save(
     request: Request,
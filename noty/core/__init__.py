@@ -1,17 +1,24 @@
 from .adaptation_engine import AdaptationEngine
-from .api_rotator import APIRotator
+from .api_rotator import APIRotator, LLMCallPolicy, ProviderTier
 from .bot import NotyBot
 from .context_manager import DynamicContextBuilder
 from .events import IncomingEvent
+from .key_scheduler import KeyScheduler
 from .message_handler import MessageHandler
+from .model_router import ModelRoute, ModelRouter
 from .response_processor import ResponseProcessor
 
 __all__ = [
     "APIRotator",
     "NotyBot",
+    "ProviderTier",
     "DynamicContextBuilder",
     "IncomingEvent",
+    "LLMCallPolicy",
+    "KeyScheduler",
     "MessageHandler",
+    "ModelRoute",
+    "ModelRouter",
     "AdaptationEngine",
     "ResponseProcessor",
 ]
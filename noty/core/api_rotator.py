@@ -3,14 +3,63 @@
 from __future__ import annotations
 
 import logging
-from time import perf_counter
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Mapping, Optional
 
-from openai import OpenAI
+from noty.core.key_scheduler import KeyScheduler
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+LOCAL_PLACEHOLDER_KEY = "sk-local-no-key"
+
+
+@dataclass(frozen=True)
+class LLMCallPolicy:
+    """Дедлайн и hedging для конкретного call site (монолог, основной ответ)."""
+
+    deadline_seconds: float | None = None
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    min_hedge_delay_seconds: float = 0.5
+    default_hedge_delay_seconds: float = 2.0
+    max_hedges: int = 1
+
+
+@dataclass
+class ProviderTier:
+    """Ступень fallback-цепочки: endpoint + (опционально) модель + свои ключи и бюджет задержки."""
+
+    name: str
+    base_url: str = OPENROUTER_BASE_URL
+    api_keys: List[str] = field(default_factory=list)
+    model: str | None = None
+    timeout_seconds: float | None = None
+    scheduler: KeyScheduler | None = None
+
+    def __post_init__(self) -> None:
+        if not self.api_keys and self.base_url != OPENROUTER_BASE_URL:
+            # Локальные OpenAI-совместимые серверы (llama.cpp, vLLM) ключ не проверяют.
+            self.api_keys = [LOCAL_PLACEHOLDER_KEY]
+        if self.scheduler is None:
+            self.scheduler = KeyScheduler(self.api_keys)
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any], default_keys: List[str]) -> "ProviderTier":
+        keys = config.get("api_keys")
+        timeout = config.get("timeout_seconds")
+        return cls(
+            name=str(config["name"]),
+            base_url=str(config.get("base_url", OPENROUTER_BASE_URL)),
+            api_keys=list(default_keys if keys is None else keys),
+            model=config.get("model"),
+            timeout_seconds=float(timeout) if timeout is not None else None,
+        )
 
 
 class APIRotator:
-    """Умная ротация между API-ключами OpenRouter."""
+    """Умная ротация между API-ключами OpenRouter и fallback-провайдерами."""
 
     def __init__(
         self,
@@ -18,19 +67,31 @@ class APIRotator:
         backend: str = "openai",
         app_referer: Optional[str] = None,
         app_title: str = "Noty",
+        scheduler: KeyScheduler | None = None,
+        max_parallel_calls: int = 8,
+        tiers: List[ProviderTier] | None = None,
     ):
         self.api_keys = api_keys
         self.backend = backend
         self.app_referer = app_referer
         self.app_title = app_title
-        self.current_idx = 0
-        self.failed_keys = set()
-        self.key_stats = {key: {"calls": 0, "errors": 0, "latency_ms": []} for key in api_keys}
-        self.degraded_keys: dict[str, int] = {}
+        self.tiers = tiers or [ProviderTier(name="openrouter", api_keys=list(api_keys), scheduler=scheduler)]
+        self.scheduler = self.tiers[0].scheduler
         self.max_acceptable_latency_ms = 2500
-        self.degraded_cooldown_calls = 2
+        self.max_parallel_calls = max_parallel_calls
+        self.hedge_stats = {"fired": 0, "won": 0, "deadline_exceeded": 0}
+        self.tier_stats: Dict[str, Dict[str, int]] = {
+            tier.name: {"calls": 0, "failovers": 0, "skipped_open": 0, "budget_exceeded": 0} for tier in self.tiers
+        }
+        self._stats_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def failed_keys(self) -> set[str]:
+        return self.scheduler.failed_keys
+
     def _build_default_headers(self) -> Dict[str, str]:
         """Возвращает рекомендуемые OpenRouter-заголовки для идентификации приложения."""
         headers: Dict[str, str] = {}
@@ -40,33 +101,37 @@ class APIRotator:
             headers["X-Title"] = self.app_title
         return headers
 
-    def _maybe_recover_degraded(self) -> None:
-        recovered: list[str] = []
-        for key, remaining_calls in self.degraded_keys.items():
-            if remaining_calls <= 0:
-                recovered.append(key)
-            else:
-                self.degraded_keys[key] = remaining_calls - 1
-        for key in recovered:
-            self.degraded_keys.pop(key, None)
-
-    def _get_next_key(self) -> Optional[str]:
-        attempts = 0
-        max_attempts = len(self.api_keys)
-        self._maybe_recover_degraded()
-        while attempts < max_attempts:
-            key = self.api_keys[self.current_idx % len(self.api_keys)]
-            self.current_idx += 1
-            if key not in self.failed_keys and key not in self.degraded_keys:
-                return key
-            attempts += 1
-        self.failed_keys.clear()
-        if self.degraded_keys:
-            self.degraded_keys.clear()
-        return self.api_keys[0] if self.api_keys else None
-
-    def _mark_key_degraded(self, key: str) -> None:
-        self.degraded_keys[key] = self.degraded_cooldown_calls
+    @staticmethod
+    def _extract_retry_after(exc: Exception) -> float | None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        raw = headers.get("retry-after") or headers.get("Retry-After")
+        if raw is None:
+            return None
+        try:
+            return max(0.0, float(raw))
+        except (TypeError, ValueError):
+            return None
+
+    def _record_failure(self, scheduler: KeyScheduler, api_key: str, exc: Exception) -> None:
+        error_msg = str(exc).lower()
+        status_code = getattr(exc, "status_code", None)
+        if status_code == 429 or "rate_limit" in error_msg or "429" in error_msg:
+            retry_after = self._extract_retry_after(exc)
+            scheduler.record_failure(
+                api_key,
+                retry_after_seconds=retry_after if retry_after is not None else scheduler.rate_limit_cooldown_seconds,
+            )
+            return
+        # 401/403: ключ отозван или запрещён — повторы через circuit breaker бесполезны.
+        if status_code in (401, 403) or "401" in error_msg or "403" in error_msg or "invalid" in error_msg:
+            scheduler.record_failure(api_key, permanent=True)
+            return
+        scheduler.record_failure(api_key)
+
+    def _bump(self, bucket: Dict[str, int], key: str) -> None:
+        with self._stats_lock:
+            bucket[key] += 1
 
     def call(
         self,
@@ -75,66 +140,198 @@ class APIRotator:
         temperature: float = 0.7,
         max_tokens: int = 1000,
         tools: Optional[List[Dict[str, Any]]] = None,
+        policy: LLMCallPolicy | None = None,
         **kwargs: Any,
     ) -> Dict[str, Any]:
-        for _ in range(len(self.api_keys)):
-            api_key = self._get_next_key()
+        call_params: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **kwargs,
+        }
+        if tools:
+            call_params["tools"] = tools
+
+        deadline = monotonic() + policy.deadline_seconds if policy and policy.deadline_seconds else None
+        last_tier = self.tiers[-1]
+        for tier in self.tiers:
+            if tier is not last_tier and not tier.scheduler.has_available():
+                self._bump(self.tier_stats[tier.name], "skipped_open")
+                self.logger.info("LLM tier skipped (circuit open): tier=%s", tier.name)
+                continue
+            if deadline is not None and deadline <= monotonic():
+                break
+            tier_deadline = deadline
+            if tier.timeout_seconds is not None:
+                budget_end = monotonic() + tier.timeout_seconds
+                tier_deadline = budget_end if deadline is None else min(deadline, budget_end)
+
+            tier_params = {**call_params, "base_url": tier.base_url}
+            if tier.model:
+                tier_params["model"] = tier.model
+            self.logger.info("LLM call started: backend=%s tier=%s model=%s", self.backend, tier.name, tier_params["model"])
+            try:
+                if (policy and policy.hedge) or tier_deadline is not None:
+                    result = self._call_with_policy(tier.scheduler, tier_params, policy or LLMCallPolicy(), tier_deadline)
+                else:
+                    result = self._call_sequential(tier.scheduler, tier_params)
+            except RuntimeError as exc:
+                self._bump(self.tier_stats[tier.name], "failovers")
+                if tier_deadline is not None and tier_deadline != deadline and tier_deadline <= monotonic():
+                    self._bump(self.tier_stats[tier.name], "budget_exceeded")
+                self.logger.warning("LLM tier failed: tier=%s reason=%s", tier.name, exc)
+                continue
+            self._bump(self.tier_stats[tier.name], "calls")
+            result["provider_tier"] = tier.name
+            return result
+
+        if deadline is not None and deadline <= monotonic():
+            self._bump(self.hedge_stats, "deadline_exceeded")
+            raise RuntimeError("Дедлайн вызова LLM исчерпан")
+        raise RuntimeError("Все попытки вызова API провалились")
+
+    def _call_sequential(self, scheduler: KeyScheduler, call_params: Dict[str, Any]) -> Dict[str, Any]:
+        tried: set[str] = set()
+        for _ in range(len(scheduler.keys)):
+            api_key = scheduler.acquire(exclude=tried)
             if not api_key:
                 raise RuntimeError("Все API ключи исчерпаны")
+            tried.add(api_key)
             try:
-                call_params: Dict[str, Any] = {
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                    **kwargs,
-                }
-                if tools:
-                    call_params["tools"] = tools
-
-                self.logger.info("LLM call started: backend=%s model=%s", self.backend, model)
-                started_at = perf_counter()
-                response = self._call_backend(api_key=api_key, call_params=call_params)
-                latency_ms = (perf_counter() - started_at) * 1000
-                self.key_stats[api_key]["calls"] += 1
-                self.key_stats[api_key]["latency_ms"].append(round(latency_ms, 2))
-                if latency_ms > self.max_acceptable_latency_ms:
-                    self._mark_key_degraded(api_key)
-
-                return {
-                    "content": response.choices[0].message.content,
-                    "tool_calls": response.choices[0].message.tool_calls,
-                    "finish_reason": response.choices[0].finish_reason,
-                    "usage": {
-                        "prompt_tokens": response.usage.prompt_tokens,
-                        "completion_tokens": response.usage.completion_tokens,
-                        "total_tokens": response.usage.total_tokens,
-                    },
-                }
-            except Exception as exc:  # noqa: BLE001
-                error_msg = str(exc).lower()
-                self.logger.warning("LLM call failed for key idx=%s: %s", self.current_idx, error_msg)
-                self.key_stats[api_key]["errors"] += 1
-                self._mark_key_degraded(api_key)
-                if "rate_limit" in error_msg or "429" in error_msg:
-                    self.failed_keys.add(api_key)
-                    continue
-                if "401" in error_msg or "invalid" in error_msg:
-                    self.failed_keys.add(api_key)
-                    continue
+                return self._attempt(scheduler, api_key, call_params)
+            except Exception:  # noqa: BLE001
                 continue
         raise RuntimeError("Все попытки вызова API провалились")
 
+    def _attempt(self, scheduler: KeyScheduler, api_key: str, call_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Один вызов на конкретном ключе; ключ освобождается при любом исходе."""
+        try:
+            started_at = perf_counter()
+            response = self._call_backend(api_key=api_key, call_params=call_params)
+            latency_ms = (perf_counter() - started_at) * 1000
+            scheduler.record_success(api_key, latency_ms)
+            if latency_ms > self.max_acceptable_latency_ms:
+                self.logger.warning("LLM call slow: latency_ms=%.0f model=%s", latency_ms, call_params.get("model"))
+            return {
+                "content": response.choices[0].message.content,
+                "tool_calls": response.choices[0].message.tool_calls,
+                "finish_reason": response.choices[0].finish_reason,
+                "usage": {
+                    "prompt_tokens": response.usage.prompt_tokens,
+                    "completion_tokens": response.usage.completion_tokens,
+                    "total_tokens": response.usage.total_tokens,
+                },
+            }
+        except Exception as exc:  # noqa: BLE001
+            self.logger.warning("LLM call failed for key #%s: %s", scheduler.keys.index(api_key), str(exc).lower())
+            self._record_failure(scheduler, api_key, exc)
+            raise
+        finally:
+            scheduler.release(api_key)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_parallel_calls, thread_name_prefix="noty-llm")
+            return self._executor
+
+    @staticmethod
+    def _hedge_delay_seconds(scheduler: KeyScheduler, policy: LLMCallPolicy) -> float:
+        quantile_ms = scheduler.latency_quantile_ms(policy.hedge_quantile)
+        if quantile_ms is None:
+            return policy.default_hedge_delay_seconds
+        return max(policy.min_hedge_delay_seconds, quantile_ms / 1000)
+
+    def _call_with_policy(
+        self,
+        scheduler: KeyScheduler,
+        call_params: Dict[str, Any],
+        policy: LLMCallPolicy,
+        deadline: float | None,
+    ) -> Dict[str, Any]:
+        """Hedged-вызов: после p95-задержки дублирует запрос на другой ключ, всё в пределах дедлайна."""
+        executor = self._get_executor()
+        hedge_delay = self._hedge_delay_seconds(scheduler, policy)
+        tried: set[str] = set()
+        pending: Dict[Future, str] = {}
+        hedges = 0
+
+        def remaining() -> float | None:
+            return None if deadline is None else deadline - monotonic()
+
+        def launch() -> bool:
+            api_key = scheduler.acquire(exclude=tried)
+            if not api_key:
+                return False
+            tried.add(api_key)
+            params = dict(call_params)
+            left = remaining()
+            if left is not None:
+                params.setdefault("timeout", max(left, 0.01))
+            pending[executor.submit(self._attempt, scheduler, api_key, params)] = api_key
+            return True
+
+        if not launch():
+            raise RuntimeError("Все API ключи исчерпаны")
+        primary = next(iter(pending))
+
+        while pending:
+            left = remaining()
+            if left is not None and left <= 0:
+                break
+            can_hedge = policy.hedge and hedges < policy.max_hedges and len(tried) < len(scheduler.keys)
+            timeouts = [value for value in (hedge_delay if can_hedge else None, left) if value is not None]
+            done, _ = wait(list(pending), timeout=min(timeouts) if timeouts else None, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception:  # noqa: BLE001
+                    continue
+                if hedges and future is not primary:
+                    self._bump(self.hedge_stats, "won")
+                self._abandon(scheduler, pending)
+                return result
+
+            if not done and can_hedge:
+                if launch():
+                    hedges += 1
+                    self._bump(self.hedge_stats, "fired")
+                    self.logger.info("LLM hedge fired after %.2fs", hedge_delay)
+            elif not pending and not launch():
+                break
+
+        self._abandon(scheduler, pending)
+        left = remaining()
+        if left is not None and left <= 0:
+            raise RuntimeError("Бюджет времени на вызов LLM исчерпан")
+        raise RuntimeError("Все попытки вызова API провалились")
+
+    @staticmethod
+    def _abandon(scheduler: KeyScheduler, pending: Dict[Future, str]) -> None:
+        """Отменяет проигравшие запросы; уже стартовавшие дорабатывают в фоне и освобождают ключ сами."""
+        for future, api_key in pending.items():
+            if future.cancel():
+                scheduler.release(api_key)
+        pending.clear()
+
     def _call_backend(self, api_key: str, call_params: Dict[str, Any]):
+        call_params = dict(call_params)
+        base_url = call_params.pop("base_url", OPENROUTER_BASE_URL)
         default_headers = self._build_default_headers()
         if self.backend == "litellm":
             from litellm import completion
 
             if default_headers:
                 call_params = {**call_params, "extra_headers": default_headers}
-            return completion(api_key=api_key, base_url="https://openrouter.ai/api/v1", **call_params)
+            return completion(api_key=api_key, base_url=base_url, **call_params)
+
+        # openai грузится ~0.8 с: импорт при первом вызове, а не при старте процесса.
+        from openai import OpenAI
 
-        client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=api_key, default_headers=default_headers)
+        client = OpenAI(base_url=base_url, api_key=api_key, default_headers=default_headers)
         return client.chat.completions.create(**call_params)
 
     def structured_call(
@@ -144,27 +341,54 @@ class APIRotator:
         model: str = "meta-llama/llama-3.1-70b-instruct",
         **kwargs: Any,
     ) -> Any:
-        """Структурированный вызов через Instructor поверх OpenAI-клиента."""
-        api_key = self._get_next_key()
+        """Структурированный вызов через Instructor поверх OpenAI-клиента (первая ступень цепочки)."""
+        tier = self.tiers[0]
+        api_key = tier.scheduler.acquire()
         if not api_key:
             raise RuntimeError("Нет доступного API ключа для structured_call")
 
         import instructor
+        from openai import OpenAI
 
-        client = instructor.patch(
-            OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=api_key,
-                default_headers=self._build_default_headers(),
+        try:
+            client = instructor.patch(
+                OpenAI(
+                    base_url=tier.base_url,
+                    api_key=api_key,
+                    default_headers=self._build_default_headers(),
+                )
             )
-        )
-        self.logger.info("Structured LLM call started: model=%s", model)
-        return client.chat.completions.create(response_model=response_model, model=model, messages=messages, **kwargs)
+            self.logger.info("Structured LLM call started: model=%s", tier.model or model)
+            started_at = perf_counter()
+            result = client.chat.completions.create(
+                response_model=response_model, model=tier.model or model, messages=messages, **kwargs
+            )
+            tier.scheduler.record_success(api_key, (perf_counter() - started_at) * 1000)
+            return result
+        except Exception as exc:  # noqa: BLE001
+            self._record_failure(tier.scheduler, api_key, exc)
+            raise
+        finally:
+            tier.scheduler.release(api_key)
 
     def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hedging = dict(self.hedge_stats)
+            tier_counters = {name: dict(values) for name, values in self.tier_stats.items()}
         return {
             "total_keys": len(self.api_keys),
             "failed_keys": len(self.failed_keys),
-            "degraded_keys": list(self.degraded_keys.keys()),
-            "key_stats": self.key_stats,
+            "degraded_keys": self.scheduler.open_keys(),
+            "key_stats": self.scheduler.stats(),
+            "hedging": hedging,
+            "tiers": {
+                tier.name: {
+                    **tier_counters[tier.name],
+                    "base_url": tier.base_url,
+                    "model": tier.model,
+                    "open_keys": len(tier.scheduler.open_keys()),
+                    "key_stats": tier.scheduler.stats(),
+                }
+                for tier in self.tiers
+            },
         }
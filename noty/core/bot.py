@@ -7,10 +7,12 @@ import logging
 from typing import Any, Dict, Mapping
 
 from noty.core.adaptation_engine import AdaptationEngine
-from noty.core.api_rotator import APIRotator
+from noty.core.api_rotator import APIRotator, LLMCallPolicy
 from noty.core.events import InteractionJSONLLogger, enrich_event_scope
 from noty.core.message_handler import MessageHandler
+from noty.core.model_router import ModelRoute, ModelRouter
 from noty.core.response_processor import ResponseProcessor
+from noty.core.warmup import ModelWarmup
 from noty.memory.mem0_wrapper import Mem0Wrapper
 from noty.memory.relationship_manager import RelationshipManager
 from noty.memory.alias_manager import UserAliasManager
@@ -21,7 +23,8 @@ from noty.mood.mood_manager import MoodManager
 from noty.thought.monologue import InternalMonologue
 from noty.tools.tool_executor import SafeToolExecutor
 from noty.transport.types import normalize_incoming_event
-from noty.utils.metrics import MetricsCollector
+from noty.utils.metrics import MetricsCollector, RequestTrace
+from noty.utils.tracing import Tracer, new_trace_id
 
 
 class NotyBot:
@@ -42,6 +45,11 @@ class NotyBot:
         response_processor: ResponseProcessor | None = None,
         persona_manager: PersonaProfileManager | None = None,
         alias_manager: UserAliasManager | None = None,
+        model_router: ModelRouter | None = None,
+        response_call_policy: LLMCallPolicy | None = None,
+        result_mode: str = "lean",
+        tracer: Tracer | None = None,
+        warmup: ModelWarmup | None = None,
     ):
         self.api_rotator = api_rotator
         self.message_handler = message_handler
@@ -58,10 +66,17 @@ class NotyBot:
         self.response_processor = response_processor or ResponseProcessor(tool_executor=self.tool_executor)
         self.persona_manager = persona_manager or (PersonaProfileManager(db_manager=self.db_manager) if self.db_manager else None)
         self.alias_manager = alias_manager or (UserAliasManager(db_manager=self.db_manager) if self.db_manager else None)
+        self.model_router = model_router
+        self.response_call_policy = response_call_policy
+        self.result_mode = result_mode
+        self.tracer = tracer or Tracer(sample_rate=0.0)
+        # Фоновый прогрев моделей (main.build_bot); None — всё загружено синхронно.
+        self.warmup = warmup
         self.logger = logging.getLogger(__name__)
 
     def handle_message(self, event: Mapping[str, Any]) -> Dict[str, Any]:
-        payload = dict(event)
+        # Транспорты передают dataclass-события (IncomingEvent), тесты и панель — словари.
+        payload = event.to_dict() if hasattr(event, "to_dict") else dict(event)
         payload.setdefault("username", f"user_{payload.get('user_id', 'unknown')}")
         payload.setdefault("chat_name", f"chat_{payload.get('chat_id', 'unknown')}")
         payload.setdefault("is_private", False)
@@ -70,7 +85,12 @@ class NotyBot:
 
         normalized = normalize_incoming_event(payload)
         event_data = enrich_event_scope(normalized.to_dict())
+        trace_id = str(event_data.get("trace_id") or new_trace_id())
+        event_data["trace_id"] = trace_id
+        with self.tracer.start_trace("handle_message", trace_id=trace_id, platform=event_data["platform"], scope=event_data["scope"]):
+            return self._handle_event(payload, event_data)
 
+    def _handle_event(self, payload: Dict[str, Any], event_data: Dict[str, Any]) -> Dict[str, Any]:
         chat_id = event_data["chat_id"]
         user_id = event_data["user_id"]
         text = event_data["text"]
@@ -78,28 +98,29 @@ class NotyBot:
         scope = event_data["scope"]
         force_respond = bool(payload.get("force_respond", False))
 
-        self.interaction_logger.log_incoming(event_data)
+        with self.tracer.span("logging"):
+            self.interaction_logger.log_incoming(event_data)
 
         relationship = payload.get("relationship")
         if not relationship and self.relationship_manager:
             relationship = self.relationship_manager.get_relationship(user_id)
 
-        alias_result = self.alias_manager.extract_and_persist(chat_id=chat_id, user_id=user_id, text=text) if self.alias_manager else None
-        preferred_alias = self.alias_manager.get_preferred_alias(chat_id=chat_id, user_id=user_id) if self.alias_manager else None
+        with self.tracer.span("alias_extraction"):
+            alias_result = self.alias_manager.extract_and_persist(chat_id=chat_id, user_id=user_id, text=text) if self.alias_manager else None
+            preferred_alias = self.alias_manager.get_preferred_alias(chat_id=chat_id, user_id=user_id) if self.alias_manager else None
         if preferred_alias:
             relationship = dict(relationship or {})
             relationship["name"] = preferred_alias
 
         if self._should_refuse_private_chat(event_data, relationship):
             self.logger.info("ЛС отклонен по интересу: user_id=%s scope=%s", user_id, scope)
-            self._log_interaction(event_data, responded=False, response_text="", tools_used=[])
             result = {
                 "status": "ignored",
                 "reason": "private_chat_uninteresting",
                 "score": 0.0,
                 "threshold": 1.0,
             }
-            self.interaction_logger.log_outgoing(event_data, result)
+            self._log_ignored(event_data, result)
             return result
 
         self.session_store.set(
@@ -113,23 +134,26 @@ class NotyBot:
             },
         )
 
+        trace = RequestTrace(trace_id=event_data["trace_id"])
         with self.metrics.time_block("message_total_seconds", stage="e2e", platform=platform):
+            decision = None
             if force_respond:
                 self.metrics.inc("force_respond_override", scope=scope)
             else:
-                try:
-                    decision = self.message_handler.decide_reaction(text, scope=scope)
-                except TypeError:
-                    decision = self.message_handler.decide_reaction(text)
+                with self.tracer.span("decide_reaction"):
+                    try:
+                        decision = self.message_handler.decide_reaction(text, scope=scope)
+                    except TypeError:
+                        decision = self.message_handler.decide_reaction(text)
                 if not decision.should_respond:
-                    self._log_interaction(event_data, responded=False, response_text="", tools_used=[])
                     result = {
                         "status": "ignored",
                         "reason": decision.reason,
                         "score": round(decision.score, 4),
                         "threshold": round(decision.threshold, 4),
+                        "variant": getattr(decision, "variant", "pipeline"),
                     }
-                    self.interaction_logger.log_outgoing(event_data, result)
+                    self._log_ignored(event_data, result)
                     return result
 
             mood_state = self.mood_manager.get_current_state()
@@ -138,13 +162,15 @@ class NotyBot:
                 interaction_outcome="success",
                 user_feedback_signals=payload.get("feedback_signals", {}),
                 relationship_trend=relationship_trend,
-                filter_stats=self.message_handler.get_filter_stats(),
+                filter_stats=self._filter_stats(),
             )
 
-            global_memory_summary = self._get_global_memory_summary(user_id=user_id, platform=platform, chat_id=chat_id)
+            with self.tracer.span("mem0_recall"):
+                global_memory_summary = self._get_global_memory_summary(user_id=user_id, platform=platform, chat_id=chat_id)
             self.logger.info("Сформирована глобальная память: user_id=%s chars=%s", user_id, len(global_memory_summary))
 
-            persona_profile = self.persona_manager.update_from_dialogue(user_id=user_id, chat_id=chat_id, text=text) if self.persona_manager else None
+            with self.tracer.span("persona_update"):
+                persona_profile = self.persona_manager.update_from_dialogue(user_id=user_id, chat_id=chat_id, text=text) if self.persona_manager else None
             persona_slice = persona_profile.compact_slice() if persona_profile else {}
             known_aliases = self.alias_manager.list_aliases(chat_id=chat_id, user_id=user_id) if self.alias_manager else []
             if known_aliases:
@@ -161,45 +187,70 @@ class NotyBot:
                 pb_config = getattr(self.message_handler.prompt_builder, "config", {}) or {}
                 fallback = pb_config.get("conservative_fallback", {})
                 runtime_modifiers.update(fallback)
-            thought_entry = self.monologue.generate_thoughts(
-                {
-                    "chat_id": chat_id,
-                    "chat_name": event_data.get("chat_name", "unknown"),
-                    "user_id": user_id,
-                    "username": event_data.get("username", "unknown"),
-                    "message": text,
-                    "relationship_score": (relationship or {}).get("score", 0),
-                    "mood": mood_state["mood"],
-                    "energy": mood_state["energy"],
-                },
-                cheap_model=True,
-            )
-
-            prompt = self.message_handler.prepare_prompt(
-                platform=platform,
-                chat_id=chat_id,
-                user_id=user_id,
-                message_text=text,
-                mood=mood_state["mood"],
-                energy=mood_state["energy"],
-                user_relationship=relationship,
-                runtime_modifiers=runtime_modifiers,
-                strategy_hints=self._build_strategy_hints(payload),
-                persona_profile=persona_slice,
-                thought_context=thought_entry,
-                environment_context=self._build_environment_context(platform=platform),
-            )
+            route: ModelRoute | None = None
+            if self.model_router:
+                route = self.model_router.route(text, topic=getattr(decision, "topic", None), relationship=relationship)
+                self.metrics.inc(f"route_{route.tier}", scope=scope)
+
+            if route is None or route.run_monologue:
+                with self.tracer.span("monologue"), self.metrics.time_block("monologue_seconds", stage="monologue", platform=platform, trace=trace):
+                    thought_entry = self.monologue.generate_thoughts(
+                        {
+                            "chat_id": chat_id,
+                            "chat_name": event_data.get("chat_name", "unknown"),
+                            "user_id": user_id,
+                            "username": event_data.get("username", "unknown"),
+                            "message": text,
+                            "relationship_score": (relationship or {}).get("score", 0),
+                            "mood": mood_state["mood"],
+                            "energy": mood_state["energy"],
+                        },
+                        cheap_model=route.monologue_cheap if route else True,
+                    )
+            else:
+                thought_entry = {"strategy": "dry_brief", "quality_score": 0.0, "decision": "respond", "monologue_skipped": True}
+                self.metrics.inc("monologue_skipped", scope=scope)
+            if route and self.model_router:
+                route = self.model_router.refine(route, thought_entry.get("strategy"))
+
+            with self.tracer.span("prompt_build"):
+                prompt = self.message_handler.prepare_prompt(
+                    platform=platform,
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    message_text=text,
+                    mood=mood_state["mood"],
+                    energy=mood_state["energy"],
+                    user_relationship=relationship,
+                    runtime_modifiers=runtime_modifiers,
+                    strategy_hints=self._build_strategy_hints(payload),
+                    persona_profile=persona_slice,
+                    thought_context=thought_entry,
+                    environment_context=self._build_environment_context(platform=platform),
+                )
             if global_memory_summary:
                 prompt = f"{prompt}\n\nGLOBAL_NOTY_MEMORY:\n{global_memory_summary}"
 
-            with self.metrics.time_block("llm_call_seconds", stage="llm_call", platform=platform):
-                llm_response = self.api_rotator.call(messages=[{"role": "user", "content": prompt}])
+            llm_messages = [{"role": "user", "content": prompt}]
+            call_kwargs: Dict[str, Any] = {"policy": self.response_call_policy} if self.response_call_policy else {}
+            with self.tracer.span("llm_call", model=route.response_model if route else "default") as llm_span, self.metrics.time_block(
+                "llm_call_seconds", stage="llm_call", platform=platform, trace=trace
+            ):
+                if route:
+                    with self.metrics.time_block(f"route_{route.tier}_llm_seconds", stage=f"route_{route.tier}", platform=platform):
+                        llm_response = self.api_rotator.call(messages=llm_messages, model=route.response_model, **call_kwargs)
+                else:
+                    llm_response = self.api_rotator.call(messages=llm_messages, **call_kwargs)
             self.metrics.record_tokens(llm_response.get("usage"))
             usage = llm_response.get("usage") or {}
+            trace.add_usage(usage)
+            llm_span.set_attribute("total_tokens", usage.get("total_tokens", 0))
             token_cost = usage.get("cost_usd")
             if token_cost is not None:
                 self.metrics.record_token_cost(token_cost, stage="llm_call", platform=platform)
                 self.metrics.record_token_cost(token_cost, stage="e2e", platform=platform)
+            if route:
+                self._record_route_usage(route, usage, platform=platform)
 
             strategy_name = thought_entry.get("strategy", "balanced")
             if strategy_name == "harsh_sarcasm":
@@ -207,14 +258,17 @@ class NotyBot:
             else:
                 self.mood_manager.update_on_event("interesting_topic")
 
-            processing_result = self.response_processor.process(
-                llm_response,
-                user_id=user_id,
-                chat_id=chat_id,
-                is_private=bool(event_data.get("is_private", False)),
-                user_role=str(event_data.get("user_role", payload.get("user_role", "user"))),
-                persona_profile=persona_slice,
-            )
+            with self.tracer.span("response_processing"), self.metrics.time_block(
+                "response_processing_seconds", stage="response_processing", platform=platform, trace=trace
+            ):
+                processing_result = self.response_processor.process(
+                    llm_response,
+                    user_id=user_id,
+                    chat_id=chat_id,
+                    is_private=bool(event_data.get("is_private", False)),
+                    user_role=str(event_data.get("user_role", payload.get("user_role", "user"))),
+                    persona_profile=persona_slice,
+                )
             if alias_result and alias_result.should_ask_confirmation and processing_result.text:
                 processing_result.text = (
                     f"{processing_result.text}\n\n"
@@ -231,33 +285,37 @@ class NotyBot:
 
             mood_after = self.mood_manager.get_current_state()
             response_text = processing_result.text
-            self._log_interaction(
-                event_data,
-                responded=True,
-                response_text=response_text,
-                mood_before=mood_state["mood"],
-                mood_after=mood_after["mood"],
-                tools_used=processing_result.tools_used,
-                style_match_score=processing_result.style_match_score,
-                sarcasm_intensity=processing_result.sarcasm_intensity,
-                persona_confidence=processing_result.persona_confidence,
-            )
+            with self.tracer.span("logging"):
+                self._log_interaction(
+                    event_data,
+                    responded=True,
+                    response_text=response_text,
+                    mood_before=mood_state["mood"],
+                    mood_after=mood_after["mood"],
+                    tools_used=processing_result.tools_used,
+                    style_match_score=processing_result.style_match_score,
+                    sarcasm_intensity=processing_result.sarcasm_intensity,
+                    persona_confidence=processing_result.persona_confidence,
+                )
 
             outcome = payload.get("interaction_outcome", processing_result.outcome)
             should_update_memory = processing_result.status == "success"
             if should_update_memory:
-                self._update_memory_after_response(
-                    event_data,
-                    response_text=response_text,
-                    outcome=outcome,
-                    tone_used=strategy_name,
-                    thought_quality=thought_entry.get("quality_score", 0.0),
-                )
+                with self.tracer.span("memory_update"), self.metrics.time_block(
+                    "memory_update_seconds", stage="memory_update", platform=platform, trace=trace
+                ):
+                    self._update_memory_after_response(
+                        event_data,
+                        response_text=response_text,
+                        outcome=outcome,
+                        tone_used=strategy_name,
+                        thought_quality=thought_entry.get("quality_score", 0.0),
+                    )
 
             recommendation = self._adapt_behavior_after_response(
                 event=event_data,
                 outcome=outcome,
-                filter_stats=self.message_handler.get_filter_stats(),
+                filter_stats=self._filter_stats(),
             )
 
             result = {
@@ -266,9 +324,19 @@ class NotyBot:
                 "usage": llm_response.get("usage", {}),
                 "finish_reason": llm_response.get("finish_reason"),
                 "tool_results": processing_result.tool_results,
-                "metrics": self.metrics.snapshot(),
-                "filter_stats": self.message_handler.get_filter_stats(),
+                "trace": trace.to_dict(),
                 "adaptation": recommendation,
+                # Для офлайн-обучения модели реакции и сравнения веток A/B по журналам.
+                "decision": (
+                    {"forced": True}
+                    if decision is None
+                    else {"variant": getattr(decision, "variant", "pipeline"), "reason": decision.reason, "score": round(decision.score, 4)}
+                ),
+                "route": (
+                    {"tier": route.tier, "reason": route.reason, "model": route.response_model, "monologue": route.run_monologue}
+                    if route
+                    else None
+                ),
                 "persona_metrics": {
                     "style_match_score": processing_result.style_match_score,
                     "sarcasm_intensity": processing_result.sarcasm_intensity,
@@ -278,9 +346,37 @@ class NotyBot:
                     "alias_rejected_count": len(alias_result.rejected_aliases) if alias_result else 0,
                 },
             }
-            self.interaction_logger.log_outgoing(event_data, result)
+            if self.result_mode == "full":
+                result.update(self.metrics_snapshot())
+            with self.tracer.span("logging"):
+                self.interaction_logger.log_outgoing(event_data, result)
             return result
 
+    def _log_ignored(self, event_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+        with self.tracer.span("logging"):
+            self._log_interaction(event_data, responded=False, response_text="", tools_used=[])
+            self.interaction_logger.log_outgoing(event_data, result)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Полный снимок метрик и статистики фильтров по запросу (не в каждом ответе)."""
+        return {"metrics": self.metrics.snapshot(), "filter_stats": self.message_handler.get_filter_stats()}
+
+    def _filter_stats(self) -> Dict[str, Any]:
+        try:
+            return self.message_handler.get_filter_stats(include_metrics=False)
+        except TypeError:
+            return self.message_handler.get_filter_stats()
+
+    def _record_route_usage(self, route: ModelRoute, usage: Mapping[str, Any], platform: str) -> None:
+        try:
+            total_tokens = int(usage.get("total_tokens", 0) or 0)
+        except (TypeError, ValueError):
+            total_tokens = 0
+        if total_tokens:
+            self.metrics.inc(f"route_{route.tier}_tokens", value=total_tokens)
+        if usage.get("cost_usd") is not None:
+            self.metrics.record_token_cost(usage["cost_usd"], stage=f"route_{route.tier}", platform=platform)
+
     @staticmethod
     def _build_strategy_hints(event: Mapping[str, Any]) -> Dict[str, Any]:
         hints: Dict[str, Any] = {}
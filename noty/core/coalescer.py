@@ -0,0 +1,233 @@
+"""Склейка всплесков сообщений перед ``NotyBot.handle_message``.
+
+В активных чатах люди пишут 5–10 коротких сообщений за несколько секунд. Сообщения одного
+scope копятся, пока чат молчит ``window_seconds`` (debounce), но не дольше ``max_wait_seconds``
+с первого сообщения и не больше ``max_messages`` штук. Затем бот один раз получает склеенный
+всплеск: одно решение о реакции и максимум один ответ. Пока всплеск scope обрабатывается,
+новые сообщения этого scope копятся в следующий; заполненный всплеск встаёт в очередь scope,
+а сообщения идут в новый — порядок внутри чата сохраняется, размер всплеска не превышает
+``max_messages``.
+
+Всего в коалесцере не больше ``max_pending`` сообщений (ждущих и обрабатываемых): дальше
+``submit`` ждёт освобождения места, так что backpressure транспорта не теряется.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List, Mapping
+
+from noty.core.events import build_scope
+
+logger = logging.getLogger(__name__)
+
+FLUSH_REASONS = ("window", "max_wait", "max_messages", "shutdown")
+
+
+@dataclass
+class _Burst:
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    first_at: float = 0.0
+    deadline: float = 0.0
+    reason: str = "window"
+
+
+def merge_burst(events: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Одно событие из всплеска: поля последнего сообщения, тексты подряд.
+
+    Если писали разные люди, строки подписываются именами, чтобы LLM видела, кто что сказал.
+    """
+    last = dict(events[-1])
+    if len(events) == 1:
+        return last
+    speakers = {event.get("user_id") for event in events}
+    if len(speakers) == 1:
+        last["text"] = "\n".join(str(event.get("text", "")) for event in events)
+    else:
+        last["text"] = "\n".join(f"{event.get('username') or event.get('user_id')}: {event.get('text', '')}" for event in events)
+    last["force_respond"] = any(bool(event.get("force_respond")) for event in events)
+    last["coalesced_count"] = len(events)
+    last["coalesced_event_ids"] = [event.get("raw_event_id") for event in events]
+    return last
+
+
+class MessageCoalescer:
+    def __init__(
+        self,
+        handle: Callable[[Dict[str, Any]], Dict[str, Any]],
+        on_result: Callable[[Dict[str, Any], Dict[str, Any]], Any] | None = None,
+        window_seconds: float = 1.5,
+        max_wait_seconds: float = 6.0,
+        max_messages: int = 10,
+        max_pending: int = 256,
+        workers: int = 4,
+        metrics: Any | None = None,
+        clock: Callable[[], float] = monotonic,
+        tick_seconds: float = 0.05,
+    ):
+        self.handle = handle
+        self.on_result = on_result
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max(max_wait_seconds, window_seconds)
+        self.max_messages = max(1, max_messages)
+        self.max_pending = max(self.max_messages, max_pending)
+        self.workers = max(1, workers)
+        self.metrics = metrics
+        self.clock = clock
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self._has_room = threading.Condition(self._lock)
+        self._pending = 0
+        # Очередь всплесков scope: последний принимает сообщения, предыдущие уже заполнены.
+        self._bursts: Dict[str, Deque[_Burst]] = {}
+        self._in_flight: set[str] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._stop = threading.Event()
+        self._ticker: threading.Thread | None = None
+        self._stats: Dict[str, Any] = {
+            "messages": 0,
+            "bursts": 0,
+            "merged_messages": 0,
+            "max_burst_size": 0,
+            "backpressure_waits": 0,
+            "rejected": 0,
+            "flush_reasons": {reason: 0 for reason in FLUSH_REASONS},
+        }
+
+    @staticmethod
+    def scope_of(event: Mapping[str, Any]) -> str:
+        return str(event.get("scope") or build_scope(str(event.get("platform", "unknown")), int(event["chat_id"])))
+
+    def submit(self, event: Mapping[str, Any], block: bool = True) -> bool:
+        """Добавляет сообщение во всплеск scope.
+
+        False — места нет, а ждать нельзя (``block=False`` или коалесцер не запущен), либо коалесцер остановлен.
+        """
+        payload = event.to_dict() if hasattr(event, "to_dict") else dict(event)
+        scope = self.scope_of(payload)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                # Без start() место освобождает только явный flush_due — ждать некому.
+                if not block or self._executor is None:
+                    self._stats["rejected"] += 1
+                    return False
+                self._stats["backpressure_waits"] += 1
+                while self._pending >= self.max_pending:
+                    if self._stop.is_set():
+                        self._stats["rejected"] += 1
+                        return False
+                    self._has_room.wait(0.1)
+            now = self.clock()
+            self._pending += 1
+            self._stats["messages"] += 1
+            queued = self._bursts.setdefault(scope, deque())
+            if not queued or len(queued[-1].events) >= self.max_messages:
+                queued.append(_Burst(first_at=now))
+            burst = queued[-1]
+            burst.events.append(payload)
+            if len(burst.events) >= self.max_messages:
+                burst.deadline, burst.reason = now, "max_messages"
+            elif now + self.window_seconds >= burst.first_at + self.max_wait_seconds:
+                burst.deadline, burst.reason = burst.first_at + self.max_wait_seconds, "max_wait"
+            else:
+                burst.deadline, burst.reason = now + self.window_seconds, "window"
+        if burst.reason == "max_messages":
+            self.flush_due(now)
+        return True
+
+    def flush_due(self, now: float | None = None) -> int:
+        """Отправляет в обработку все созревшие всплески (кроме scope, у которых предыдущий ещё в работе)."""
+        current = self.clock() if now is None else now
+        with self._lock:
+            ready = [scope for scope, queued in self._bursts.items() if queued[0].deadline <= current and scope not in self._in_flight]
+            bursts = [(scope, self._take(scope)) for scope in ready]
+        for scope, burst in bursts:
+            self._dispatch(scope, burst)
+        return len(bursts)
+
+    def _take(self, scope: str, reason: str | None = None) -> _Burst:
+        queued = self._bursts[scope]
+        burst = queued.popleft()
+        if not queued:
+            del self._bursts[scope]
+        self._in_flight.add(scope)
+        size = len(burst.events)
+        self._stats["bursts"] += 1
+        self._stats["merged_messages"] += size - 1
+        self._stats["max_burst_size"] = max(self._stats["max_burst_size"], size)
+        self._stats["flush_reasons"][reason or burst.reason] += 1
+        return burst
+
+    def _dispatch(self, scope: str, burst: _Burst) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("coalesce_bursts", scope=scope)
+            self.metrics.inc("coalesce_merged_messages", len(burst.events) - 1)
+        if self._executor is None:
+            self._run(scope, burst)
+        else:
+            self._executor.submit(self._run, scope, burst)
+
+    def _run(self, scope: str, burst: _Burst) -> None:
+        merged = merge_burst(burst.events)
+        try:
+            result = self.handle(merged)
+            if self.on_result is not None:
+                self.on_result(merged, result)
+        except Exception as exc:  # noqa: BLE001 - ошибка одного всплеска не должна останавливать остальные scope
+            logger.exception("Ошибка обработки всплеска scope=%s: %s", scope, exc)
+        finally:
+            with self._lock:
+                self._in_flight.discard(scope)
+                self._pending -= len(burst.events)
+                self._has_room.notify_all()
+
+    def _tick(self) -> None:
+        while not self._stop.wait(self.tick_seconds):
+            self.flush_due()
+
+    def start(self) -> "MessageCoalescer":
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="noty-coalesce")
+        self._ticker = threading.Thread(target=self._tick, daemon=True, name="noty-coalesce-ticker")
+        self._ticker.start()
+        return self
+
+    def stop(self) -> None:
+        """Досрочно отправляет накопленное и дожидается обработки."""
+        self._stop.set()
+        if self._ticker:
+            self._ticker.join(timeout=5)
+            self._ticker = None
+        with self._lock:
+            bursts = [(scope, self._take(scope, reason="shutdown")) for scope in list(self._bursts) if scope not in self._in_flight]
+        for scope, burst in bursts:
+            self._dispatch(scope, burst)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        while True:
+            with self._lock:
+                leftovers = [(scope, self._take(scope, reason="shutdown")) for scope in list(self._bursts)]
+            if not leftovers:
+                break
+            for scope, burst in leftovers:
+                self._run(scope, burst)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            bursts = self._stats["bursts"]
+            handled = bursts + self._stats["merged_messages"]
+            return {
+                **self._stats,
+                "flush_reasons": dict(self._stats["flush_reasons"]),
+                "avg_burst_size": round(handled / bursts, 3) if bursts else 0.0,
+                "merged_ratio": round(self._stats["merged_messages"] / handled, 4) if handled else 0.0,
+                "pending_scopes": len(self._bursts),
+                "pending_bursts": sum(len(queued) for queued in self._bursts.values()),
+                "pending_messages": self._pending,
+            }
@@ -108,7 +108,8 @@ class DynamicContextBuilder:
                 sources["recent"] += 1
 
         past_messages = self._db_call(self.db.get_messages_range, platform, chat_id, days_ago=7, exclude_recent=5)
-        if past_messages:
+        # Пока модель прогревается, похожие старые сообщения не подбираются — только recent.
+        if past_messages and getattr(self.embedder, "ready", True):
             msg_texts = [m["text"] for m in past_messages]
             current_emb = self.embedder.encoder.encode(current_message)
             similarities = []
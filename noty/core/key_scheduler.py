@@ -0,0 +1,201 @@
+"""Планировщик API-ключей: EWMA latency/error-rate, circuit breaker, Retry-After."""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+@dataclass
+class KeyHealth:
+    """Ограниченное по памяти состояние одного ключа."""
+
+    calls: int = 0
+    errors: int = 0
+    ewma_latency_ms: float = 0.0
+    ewma_error_rate: float = 0.0
+    consecutive_failures: int = 0
+    in_flight: int = 0
+    state: str = CIRCUIT_CLOSED
+    open_until: float = 0.0
+    open_count: int = 0
+    probe_in_flight: bool = False
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "ewma_latency_ms": round(self.ewma_latency_ms, 2),
+            "error_rate": round(self.ewma_error_rate, 4),
+            "in_flight": self.in_flight,
+            "state": self.state,
+            "reopens_in_seconds": round(max(0.0, self.open_until - now), 2) if self.state == CIRCUIT_OPEN else 0.0,
+        }
+
+
+class KeyScheduler:
+    """Потокобезопасный выбор ключа по взвешенной наименьшей задержке.
+
+    Ключ с ошибками подряд (или с 429) уходит в ``open`` до истечения cooldown/Retry-After,
+    затем пропускает ровно одну пробу в ``half_open``: успех закрывает цепь, провал
+    открывает её снова с удвоенным cooldown.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        ewma_alpha: float = 0.3,
+        failure_threshold: int = 3,
+        base_cooldown_seconds: float = 5.0,
+        max_cooldown_seconds: float = 300.0,
+        rate_limit_cooldown_seconds: float = 30.0,
+        error_penalty: float = 4.0,
+        clock: Callable[[], float] = monotonic,
+        latency_window: int = 128,
+    ):
+        self.keys = list(keys)
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown_seconds = base_cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+        self.error_penalty = error_penalty
+        self.clock = clock
+        self.health: Dict[str, KeyHealth] = {key: KeyHealth() for key in self.keys}
+        self.failed_keys: set[str] = set()
+        self._recent_latencies_ms: deque[float] = deque(maxlen=latency_window)
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _score(self, health: KeyHealth) -> float:
+        return (health.ewma_latency_ms + 1.0) * (1.0 + health.in_flight) * (1.0 + self.error_penalty * health.ewma_error_rate)
+
+    def _is_available(self, health: KeyHealth, now: float) -> bool:
+        if health.state == CIRCUIT_OPEN:
+            if now < health.open_until:
+                return False
+            health.state = CIRCUIT_HALF_OPEN
+        if health.state == CIRCUIT_HALF_OPEN:
+            return not health.probe_in_flight
+        return True
+
+    def has_available(self) -> bool:
+        """Есть ли ключ с закрытой цепью или готовый к half-open пробе (без побочных эффектов)."""
+        with self._lock:
+            now = self.clock()
+            for key, health in self.health.items():
+                if key in self.failed_keys:
+                    continue
+                if health.state == CIRCUIT_CLOSED:
+                    return True
+                if health.state == CIRCUIT_OPEN and now >= health.open_until:
+                    return True
+                if health.state == CIRCUIT_HALF_OPEN and not health.probe_in_flight:
+                    return True
+            return False
+
+    def acquire(self, exclude: Optional[set[str]] = None) -> Optional[str]:
+        """Выбирает ключ и помечает его занятым; вызывающий обязан вызвать ``release``."""
+        if not self.keys:
+            return None
+        with self._lock:
+            now = self.clock()
+            excluded = exclude or set()
+            total = len(self.keys)
+            candidates = [
+                (self._score(self.health[key]), (idx - self._cursor) % total, key)
+                for idx, key in enumerate(self.keys)
+                if key not in self.failed_keys and key not in excluded and self._is_available(self.health[key], now)
+            ]
+            if not candidates:
+                fallback = [key for key in self.keys if key not in excluded]
+                if not fallback:
+                    return None
+                # Навсегда отказавший ключ (401/403) берём, только если других не осталось.
+                healthy = [key for key in fallback if key not in self.failed_keys]
+                if healthy:
+                    fallback = healthy
+                else:
+                    self.failed_keys.clear()
+                key = min(fallback, key=lambda item: self.health[item].open_until)
+                if self.health[key].state == CIRCUIT_OPEN:
+                    self.health[key].state = CIRCUIT_HALF_OPEN
+            else:
+                key = min(candidates)[2]
+            self._cursor = (self._cursor + 1) % total
+            health = self.health[key]
+            health.in_flight += 1
+            if health.state == CIRCUIT_HALF_OPEN:
+                health.probe_in_flight = True
+            return key
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            health = self.health[key]
+            health.in_flight = max(0, health.in_flight - 1)
+            if health.in_flight == 0:
+                health.probe_in_flight = False
+
+    def record_success(self, key: str, latency_ms: float) -> None:
+        with self._lock:
+            health = self.health[key]
+            health.calls += 1
+            self._recent_latencies_ms.append(latency_ms)
+            if health.ewma_latency_ms == 0.0:
+                health.ewma_latency_ms = latency_ms
+            else:
+                health.ewma_latency_ms += self.ewma_alpha * (latency_ms - health.ewma_latency_ms)
+            health.ewma_error_rate *= 1.0 - self.ewma_alpha
+            health.consecutive_failures = 0
+            health.probe_in_flight = False
+            if health.state != CIRCUIT_CLOSED:
+                health.state = CIRCUIT_CLOSED
+                health.open_count = 0
+
+    def record_failure(self, key: str, retry_after_seconds: float | None = None, permanent: bool = False) -> None:
+        with self._lock:
+            health = self.health[key]
+            health.calls += 1
+            health.errors += 1
+            health.ewma_error_rate += self.ewma_alpha * (1.0 - health.ewma_error_rate)
+            health.consecutive_failures += 1
+            was_probe = health.probe_in_flight
+            health.probe_in_flight = False
+            if permanent:
+                self.failed_keys.add(key)
+                return
+            if retry_after_seconds is not None:
+                self._open(health, max(0.0, retry_after_seconds))
+            elif was_probe or health.consecutive_failures >= self.failure_threshold:
+                cooldown = self.base_cooldown_seconds * (2**health.open_count)
+                self._open(health, min(cooldown, self.max_cooldown_seconds))
+
+    def _open(self, health: KeyHealth, cooldown_seconds: float) -> None:
+        health.state = CIRCUIT_OPEN
+        health.open_until = self.clock() + cooldown_seconds
+        health.open_count += 1
+
+    def latency_quantile_ms(self, quantile: float = 0.95) -> float | None:
+        """Квантиль задержки по последним успешным вызовам всех ключей (окно фиксированного размера)."""
+        with self._lock:
+            if not self._recent_latencies_ms:
+                return None
+            ordered = sorted(self._recent_latencies_ms)
+        idx = min(len(ordered) - 1, max(0, int(round(quantile * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def open_keys(self) -> List[str]:
+        with self._lock:
+            return [key for key, health in self.health.items() if health.state == CIRCUIT_OPEN]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = self.clock()
+            return {key: health.snapshot(now) for key, health in self.health.items()}
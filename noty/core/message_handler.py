@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Dict
 
 from noty.core.context_manager import DynamicContextBuilder
 from noty.filters.embedding_filter import EmbeddingFilter
 from noty.filters.heuristic_filter import HeuristicFilter
+from noty.filters.interest_profiles import DEFAULT_PROFILE
 from noty.filters.reaction_decider import ReactionDecision, ReactionDecider
+from noty.filters.reaction_model import ReactionModel, ab_variant, reaction_features
 from noty.prompts.prompt_builder import ModularPromptBuilder
 from noty.transport.types import IncomingEvent, normalize_incoming_event
 from noty.utils.metrics import MetricsCollector
@@ -22,13 +25,23 @@ class MessageHandler:
         embedding_filter: EmbeddingFilter,
         reaction_decider: ReactionDecider | None = None,
         metrics: MetricsCollector | None = None,
+        heuristic_only_score: float = 0.4,
+        reaction_model: ReactionModel | None = None,
+        model_traffic: float = 0.0,
     ):
         self.context_builder = context_builder
         self.prompt_builder = prompt_builder
         self.heuristic_filter = heuristic_filter
         self.embedding_filter = embedding_filter
         self.reaction_decider = reaction_decider or ReactionDecider()
+        # Отдельный decider на профиль интересов со своими target_rate/порогами (состояние чатов — внутри decider).
+        self.profile_deciders: Dict[str, ReactionDecider] = {}
         self.metrics = metrics or MetricsCollector()
+        # Псевдо-оценка сообщения, прошедшего эвристику, пока embeddings не готовы.
+        self.heuristic_only_score = heuristic_only_score
+        # A/B: доля чатов (стабильно по scope), где решает обученная модель вместо эвристик и сэмплирования.
+        self.reaction_model = reaction_model
+        self.model_traffic = model_traffic
 
     def should_react(self, message_text: str) -> bool:
         return self.decide_reaction(message_text).should_respond
@@ -37,24 +50,85 @@ class MessageHandler:
         normalized = normalize_incoming_event(event)
         return self.should_react(normalized.text)
 
+    def decider_for(self, scope: str | None) -> ReactionDecider:
+        profiles = getattr(self.embedding_filter, "profiles", None)
+        profile = profiles.profile_for(scope) if profiles is not None else None
+        if profile is None or profile.name == DEFAULT_PROFILE:
+            return self.reaction_decider
+        decider = self.profile_deciders.get(profile.name)
+        if decider is None:
+            decider = self.profile_deciders.setdefault(profile.name, self.reaction_decider.derive(**profile.decider_kwargs()))
+        return decider
+
     def decide_reaction(self, message_text: str, scope: str | None = None) -> ReactionDecision:
         with self.metrics.time_block("filter_pipeline_seconds", stage="filter_pipeline", platform=scope.split(":", 1)[0] if scope else None):
-            heuristic_passed = self.heuristic_filter.should_check_embeddings(message_text)
             self.metrics.inc("messages_total", scope=scope)
+            decider = self.decider_for(scope)
+            if self.reaction_model is None:
+                return self._decide_by_pipeline(message_text, scope, decider)
 
-            if not heuristic_passed:
-                self.metrics.inc("heuristic_dropped", scope=scope)
-                return ReactionDecision(False, 0.0, 1.0, 0.0, "heuristic_drop")
+            decision = None
+            if ab_variant(scope, self.model_traffic) == "model":
+                decision = self._decide_by_model(message_text, scope, decider)
+            if decision is None:
+                decision = self._decide_by_pipeline(message_text, scope, decider)
+            self.metrics.inc(f"ab_{decision.variant}_decisions", scope=scope)
+            if decision.should_respond:
+                self.metrics.inc(f"ab_{decision.variant}_responded", scope=scope)
+            return decision
 
-            is_interesting, score, _topic = self.embedding_filter.is_interesting(message_text, return_score=True)
-            if not is_interesting:
-                self.metrics.inc("embedding_dropped", scope=scope)
+    def _decide_by_pipeline(self, message_text: str, scope: str | None, decider: ReactionDecider) -> ReactionDecision:
+        heuristic_passed = self.heuristic_filter.should_check_embeddings(message_text)
+        if not heuristic_passed:
+            self.metrics.inc("heuristic_dropped", scope=scope)
+            return ReactionDecision(False, 0.0, 1.0, 0.0, "heuristic_drop")
 
-            heuristic_boost = 0.1 if heuristic_passed else 0.0
-            decision = self.reaction_decider.decide(score, heuristic_boost=heuristic_boost)
+        if not getattr(self.embedding_filter, "ready", True):
+            # Модель ещё прогревается: решаем по эвристике, калибровка частоты остаётся за decider.
+            self.metrics.inc("heuristic_only", scope=scope)
+            decision = decider.decide(self.heuristic_only_score, heuristic_boost=0.1, scope=scope)
+            decision.reason = f"heuristic_only:{decision.reason}"
             self.metrics.inc("responded_by_decider" if decision.should_respond else "randomized_drop", scope=scope)
             return decision
 
+        is_interesting, score, topic = self.embedding_filter.is_interesting(message_text, return_score=True, scope=scope)
+        if not is_interesting:
+            self.metrics.inc("embedding_dropped", scope=scope)
+
+        heuristic_boost = 0.1 if heuristic_passed else 0.0
+        decision = decider.decide(score, heuristic_boost=heuristic_boost, scope=scope)
+        decision.topic = topic
+        self.metrics.inc("responded_by_decider" if decision.should_respond else "randomized_drop", scope=scope)
+        return decision
+
+    def _decide_by_model(self, message_text: str, scope: str | None, decider: ReactionDecider) -> ReactionDecision | None:
+        """Ветка "model" A/B: без случайных гейтов; None — модель неприменима, решает пайплайн."""
+        if not getattr(self.embedding_filter, "ready", True):
+            return None
+        flags = self.heuristic_filter.flags(message_text)
+        if flags["short"]:
+            return ReactionDecision(False, 0.0, 1.0, 0.0, "heuristic_drop", variant="model")
+        _, topic_score, topic = self.embedding_filter.is_interesting(message_text, return_score=True, scope=scope)
+        vector = self.embedding_filter.message_vectors([message_text])[0]
+        rate, weight = decider.scope_state(scope)
+        now = datetime.now()
+        features = reaction_features(vector, topic_score, flags, rate, weight, hour=now.hour + now.minute / 60.0)
+        if features.shape[0] != self.reaction_model.n_features:
+            self.metrics.inc("reaction_model_mismatch", scope=scope)
+            return None
+        probability = self.reaction_model.probability(features)
+        should = probability >= self.reaction_model.threshold
+        decider.record(scope, should)
+        return ReactionDecision(
+            should_respond=should,
+            score=probability,
+            threshold=self.reaction_model.threshold,
+            sampled_probability=probability,
+            reason="model_in" if should else "model_out",
+            topic=topic,
+            variant="model",
+        )
+
     def prepare_prompt(
         self,
         platform: str,
@@ -91,5 +165,14 @@ class MessageHandler:
             environment_context=environment_context,
         )
 
-    def get_filter_stats(self) -> Dict[str, Any]:
-        return {"decider": self.reaction_decider.stats(), "metrics": self.metrics.snapshot()}
+    def flush_decider_state(self) -> int:
+        """Сбрасывает состояние decider-ов по чатам в их хранилище (при остановке процесса)."""
+        return sum(decider.flush() for decider in [self.reaction_decider, *self.profile_deciders.values()])
+
+    def get_filter_stats(self, include_metrics: bool = True) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"decider": self.reaction_decider.stats()}
+        if self.profile_deciders:
+            stats["profile_deciders"] = {name: decider.stats() for name, decider in self.profile_deciders.items()}
+        if include_metrics:
+            stats["metrics"] = self.metrics.snapshot()
+        return stats
@@ -0,0 +1,90 @@
+"""Маршрутизация запросов по тирам моделей: skip/8B/70B."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping
+
+
+@dataclass
+class ModelRoute:
+    tier: str
+    run_monologue: bool
+    monologue_cheap: bool
+    response_model: str
+    reason: str
+
+
+@dataclass
+class ModelRouter:
+    """Дешёвый пре-классификатор: длина, топик, стратегия и отношение -> тир модели."""
+
+    cheap_model: str = "meta-llama/llama-3.1-8b-instruct"
+    response_model: str = "meta-llama/llama-3.1-70b-instruct"
+    trivial_max_chars: int = 12
+    banter_max_chars: int = 120
+    min_deep_relationship: int = -3
+    deep_topic_markers: tuple[str, ...] = ("философ", "техническ", "экзистенц", "политик")
+    deep_question_markers: tuple[str, ...] = ("почему", "зачем", "объясни", "как работает", "в чём смысл", "в чем смысл")
+    cheap_strategies: tuple[str, ...] = ("dry_brief", "conservative", "harsh_sarcasm")
+    trivial_phrases: frozenset[str] = field(
+        default_factory=lambda: frozenset({"привет", "ку", "хай", "ок", "окей", "ага", "да", "нет", "спс", "спасибо", "лол", "хах", "ахах"})
+    )
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "ModelRouter":
+        bot_cfg = config.get("bot", {}) or {}
+        routing_cfg = config.get("routing", {}) or {}
+        kwargs: Dict[str, Any] = {
+            "cheap_model": bot_cfg.get("cheap_thought_model", cls.cheap_model),
+            "response_model": bot_cfg.get("response_model", cls.response_model),
+        }
+        for key in ("trivial_max_chars", "banter_max_chars", "min_deep_relationship"):
+            if key in routing_cfg:
+                kwargs[key] = int(routing_cfg[key])
+        for key in ("deep_topic_markers", "deep_question_markers", "cheap_strategies"):
+            if key in routing_cfg:
+                kwargs[key] = tuple(str(x).lower() for x in routing_cfg[key])
+        if "trivial_phrases" in routing_cfg:
+            kwargs["trivial_phrases"] = frozenset(str(x).lower() for x in routing_cfg["trivial_phrases"])
+        return cls(**kwargs)
+
+    @staticmethod
+    def _relationship_score(relationship: Mapping[str, Any] | None) -> int:
+        if not relationship:
+            return 0
+        return int(relationship.get("relationship_score", relationship.get("score", 0)) or 0)
+
+    def _is_trivial(self, text: str) -> bool:
+        normalized = text.lower().strip(" !.,?)(")
+        return not normalized or normalized in self.trivial_phrases or (len(normalized) <= self.trivial_max_chars and "?" not in text)
+
+    def _is_deep(self, text: str, topic: str | None) -> bool:
+        lowered = text.lower()
+        topic_lowered = (topic or "").lower()
+        if any(marker in topic_lowered for marker in self.deep_topic_markers):
+            return True
+        if len(lowered) > self.banter_max_chars:
+            return True
+        return "?" in lowered and any(marker in lowered for marker in self.deep_question_markers)
+
+    def route(
+        self,
+        text: str,
+        topic: str | None = None,
+        relationship: Mapping[str, Any] | None = None,
+    ) -> ModelRoute:
+        """Предварительный маршрут до монолога (стратегия ещё неизвестна)."""
+        if self._is_trivial(text):
+            return ModelRoute("trivial", False, True, self.cheap_model, "short_or_phatic")
+        if self._relationship_score(relationship) < self.min_deep_relationship:
+            return ModelRoute("banter", True, True, self.cheap_model, "low_relationship")
+        if self._is_deep(text, topic):
+            return ModelRoute("deep", True, True, self.response_model, "deep_question_or_topic")
+        return ModelRoute("banter", True, True, self.cheap_model, "short_banter")
+
+    def refine(self, route: ModelRoute, strategy: str | None) -> ModelRoute:
+        """Уточняет маршрут после монолога: «дешёвые» стратегии не требуют 70B."""
+        if route.tier == "deep" and strategy in self.cheap_strategies:
+            return ModelRoute("banter", route.run_monologue, route.monologue_cheap, self.cheap_model, f"strategy_{strategy}")
+        return route
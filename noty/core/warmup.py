@@ -0,0 +1,111 @@
+"""Фоновая загрузка моделей на старте и признак готовности бота.
+
+``build_bot`` больше не ждёт SentenceTransformer: компоненты грузятся в своих потоках, после
+загрузки прогоняются пробные батчи. Пока ``ready`` ложно, MessageHandler решает о реакции
+только по эвристикам, а транспорт при ``gate_transports`` может дождаться ``wait_ready``.
+Упавший компонент не делает бота готовым — работа продолжается в эвристическом режиме.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Component:
+    name: str
+    load: Callable[[], Any]
+    state: str = "pending"
+    seconds: float = 0.0
+    error: str | None = None
+
+
+class ModelWarmup:
+    def __init__(self, metrics: Any | None = None):
+        self.metrics = metrics
+        self._components: Dict[str, _Component] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._ready = threading.Event()
+
+    def add(self, name: str, load: Callable[[], Any]) -> "ModelWarmup":
+        self._components[name] = _Component(name=name, load=load)
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> "ModelWarmup":
+        if not self._components:
+            self._ready.set()
+        for component in self._components.values():
+            thread = threading.Thread(target=self._run, args=(component,), daemon=True, name=f"noty-warmup-{component.name}")
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def run(self) -> bool:
+        """Синхронный вариант: грузит всё в текущем потоке (скрипты, тесты)."""
+        for component in self._components.values():
+            self._run(component)
+        return self.ready
+
+    def wait_ready(self, timeout_seconds: float | None = None) -> bool:
+        return self._ready.wait(timeout_seconds)
+
+    def wait_finished(self, timeout_seconds: float | None = None) -> bool:
+        """Ждёт завершения всех загрузок, включая неудачные."""
+        with self._done:
+            return self._done.wait_for(
+                lambda: all(item.state in ("ready", "failed") for item in self._components.values()),
+                timeout=timeout_seconds,
+            )
+
+    def _run(self, component: _Component) -> None:
+        with self._lock:
+            component.state = "loading"
+        started = time.perf_counter()
+        try:
+            component.load()
+        except Exception as exc:  # noqa: BLE001 - без модели бот продолжает работать на эвристиках
+            state, error = "failed", f"{type(exc).__name__}: {exc}"
+            logger.exception("Прогрев %s не удался: %s", component.name, exc)
+        else:
+            state, error = "ready", None
+        elapsed = time.perf_counter() - started
+        with self._done:
+            component.state, component.error, component.seconds = state, error, elapsed
+            if all(item.state == "ready" for item in self._components.values()):
+                self._ready.set()
+            self._done.notify_all()
+        if self.metrics is not None:
+            self.metrics.observe("warmup_seconds", elapsed, stage=component.name)
+        logger.info("Прогрев %s: %s за %.2fs", component.name, state, elapsed)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self._ready.is_set(),
+                "components": {
+                    item.name: {"state": item.state, "seconds": round(item.seconds, 3), "error": item.error}
+                    for item in self._components.values()
+                },
+            }
+
+
+def embedding_warmup(embedding_filter: Any, batches: int = 2) -> Callable[[], Any]:
+    """Загрузка модели EmbeddingFilter и пробные батчи."""
+
+    def load() -> Any:
+        embedding_filter.load()
+        return embedding_filter.warmup(batches=batches)
+
+    return load
@@ -4,15 +4,17 @@ from __future__ import annotations
 
 import logging
 import os
-import pickle
+import threading
 import time
 import warnings
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from .encoders import EncoderBackend, OnnxEncoderBackend, SentenceTransformerBackend
+from .interest_profiles import InterestProfile, InterestProfileRegistry
 from .interest_vectors import INTEREST_TOPICS
+from .vector_cache import InterestVectorStore
 
 
 os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS_WARNING", "1")
@@ -26,41 +28,93 @@ warnings.filterwarnings(
 )
 
 
+WARMUP_TEXTS = (
+    "привет, как дела?",
+    "почему код падает на проде",
+    "что думаешь про философию стоиков",
+    "ноти, расскажи что-нибудь",
+)
+
+
 class EmbeddingFilter:
     def __init__(
         self,
         model_name: str = "intfloat/multilingual-e5-base",
         cache_path: str = "./noty/data/embeddings_cache",
-        encoder: SentenceTransformer | None = None,
+        encoder: EncoderBackend | None = None,
+        defer_load: bool = False,
+        profiles: InterestProfileRegistry | None = None,
     ):
+        """``encoder`` — бэкенд из ``noty.filters.encoders`` (по умолчанию PyTorch sentence-transformers)
+        или любой объект с ``encode`` в стиле SentenceTransformer.
+
+        ``defer_load=True``: модель и векторы интересов грузит позже ``load()`` (обычно ModelWarmup в фоне).
+        ``profiles`` — темы и пороги по чатам; без них все чаты оцениваются по ``INTEREST_TOPICS``.
+        """
         self.logger = logging.getLogger(__name__)
-        started_at = time.perf_counter()
-        self.encoder = encoder or SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.encoder = encoder
         self.cache_path = cache_path
         os.makedirs(cache_path, exist_ok=True)
         self.interest_topics = INTEREST_TOPICS
-        self.interest_vectors = self._load_or_create_interest_vectors()
+        self.profiles = profiles or InterestProfileRegistry()
+        self.interest_vectors: np.ndarray | None = None
+        self.vector_store: InterestVectorStore | None = None
         self._message_vector_cache: Dict[str, np.ndarray] = {}
         self.cache_hits = 0
         self.cache_misses = 0
+        self._ready = threading.Event()
+        self._load_lock = threading.Lock()
+        if not defer_load:
+            self.load()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def load(self) -> None:
+        """Загрузка модели и векторов интересов; повторный вызов ничего не делает."""
+        with self._load_lock:
+            if self._ready.is_set():
+                return
+            started_at = time.perf_counter()
+            if self.encoder is None:
+                self.encoder = SentenceTransformerBackend(self.model_name)
+            # Только свои бэкенды: у SentenceTransformer ``load`` — staticmethod с обязательным путём.
+            if isinstance(self.encoder, (SentenceTransformerBackend, OnnxEncoderBackend)):
+                self.encoder.load()
+            self.interest_vectors = self._load_or_create_interest_vectors()
+            self.profiles.compile(self.vector_store.get)
+            self._ready.set()
         self.logger.info(
             "EmbeddingFilter initialized: model=%s cache_path=%s startup_ms=%s hf_token=%s",
-            model_name,
-            cache_path,
+            getattr(self.encoder, "model_id", self.model_name),
+            self.cache_path,
             round((time.perf_counter() - started_at) * 1000, 2),
             "configured" if os.getenv("HF_TOKEN") else "missing",
         )
 
+    def warmup(self, batches: int = 2, texts: Iterable[str] = WARMUP_TEXTS) -> float:
+        """Прогон пробных батчей мимо кэша: первый реальный запрос не платит за инициализацию ядер."""
+        self.load()
+        sample = list(texts)
+        started_at = time.perf_counter()
+        for _ in range(max(0, batches)):
+            self.encoder.encode(sample, convert_to_numpy=True)
+        return time.perf_counter() - started_at
+
     def _load_or_create_interest_vectors(self) -> np.ndarray:
-        cache_file = os.path.join(self.cache_path, "interest_vectors.pkl")
-        if os.path.exists(cache_file):
-            with open(cache_file, "rb") as file:
-                return pickle.load(file)
+        self.vector_store = InterestVectorStore(
+            self.cache_path,
+            model_id=getattr(self.encoder, "model_id", self.model_name),
+            encode=lambda topics: self.encoder.encode(topics, convert_to_numpy=True),
+        )
+        return self.vector_store.get(self.interest_topics)
 
-        vectors = self.encoder.encode(self.interest_topics, convert_to_numpy=True, show_progress_bar=True)
-        with open(cache_file, "wb") as file:
-            pickle.dump(vectors, file)
-        return vectors
+    def topic_vectors(self, topics: Sequence[str]) -> np.ndarray:
+        """Векторы произвольного набора тем (например, интересов конкретного чата) из того же кэша."""
+        self.load()
+        return self.vector_store.get(topics)
 
     def _vectorize_messages(self, messages: Iterable[str]) -> Dict[str, np.ndarray]:
         unique_messages = list(dict.fromkeys(messages))
@@ -81,36 +135,48 @@ class EmbeddingFilter:
             result[message] = self._message_vector_cache[message]
         return result
 
-    def _best_topic_similarity(self, msg_vector: np.ndarray) -> Tuple[str, float]:
-        similarities = []
-        for i, interest_vec in enumerate(self.interest_vectors):
-            sim = np.dot(msg_vector, interest_vec) / (
-                np.linalg.norm(msg_vector) * np.linalg.norm(interest_vec)
-            )
-            similarities.append((self.interest_topics[i], sim))
-        return max(similarities, key=lambda x: x[1])
+    def message_vectors(self, messages: Sequence[str]) -> np.ndarray:
+        """Эмбеддинги сообщений в исходном порядке (через общий кэш сообщений)."""
+        vectors = self._vectorize_messages(messages)
+        return np.stack([vectors[message] for message in messages])
+
+    def _best_topic_similarity(self, msg_vector: np.ndarray, profile: InterestProfile | None = None) -> Tuple[str, float]:
+        topics, scores = self.profiles.best_topics(msg_vector, profile or self.profiles.profile_for(None))
+        return topics[0], float(scores[0])
 
     def is_interesting(
         self,
         message: str,
-        threshold: float = 0.4,
+        threshold: float | None = None,
         return_score: bool = False,
+        scope: str | None = None,
     ) -> bool | Tuple[bool, float, str]:
+        """``threshold=None`` — порог профиля чата ``scope`` (0.4 по умолчанию)."""
+        profile = self.profiles.profile_for(scope)
         msg_vector = self._vectorize_messages([message])[message]
-        best_topic, best_score = self._best_topic_similarity(msg_vector)
-        is_interesting = best_score > threshold
+        best_topic, best_score = self._best_topic_similarity(msg_vector, profile)
+        is_interesting = best_score > (profile.threshold if threshold is None else threshold)
         if return_score:
-            return is_interesting, float(best_score), best_topic
+            return is_interesting, best_score, best_topic
         return is_interesting
 
-    def batch_filter(self, messages: List[str], threshold: float = 0.4) -> List[Tuple[int, str, float, str]]:
-        results: List[Tuple[int, str, float, str]] = []
+    def batch_filter(
+        self,
+        messages: List[str],
+        threshold: float | None = None,
+        scope: str | None = None,
+    ) -> List[Tuple[int, str, float, str]]:
+        if not messages:
+            return []
+        profile = self.profiles.profile_for(scope)
+        threshold = profile.threshold if threshold is None else threshold
         vectors = self._vectorize_messages(messages)
-        for i, msg in enumerate(messages):
-            best_topic, best_score = self._best_topic_similarity(vectors[msg])
-            if best_score > threshold:
-                results.append((i, msg, float(best_score), best_topic))
-        return results
+        topics, scores = self.profiles.best_topics(np.stack([vectors[msg] for msg in messages]), profile)
+        return [
+            (i, msg, float(scores[i]), topics[i])
+            for i, msg in enumerate(messages)
+            if scores[i] > threshold
+        ]
 
     def cache_stats(self) -> Dict[str, float]:
         total = self.cache_hits + self.cache_misses
@@ -0,0 +1,218 @@
+"""Бэкенды encoder-а для EmbeddingFilter и DynamicContextBuilder.
+
+Контракт повторяет ``SentenceTransformer.encode``: строка -> вектор (1-D), список -> матрица.
+Бэкенды грузят модель лениво (при первом ``encode`` или явном ``load``), поэтому их можно
+создавать в ``build_bot`` и прогревать в фоне через ModelWarmup.
+
+- ``sentence_transformers`` — PyTorch, эталон качества;
+- ``onnx`` — ONNX Runtime на CPU: граф, экспортированный из той же модели, с int8 dynamic
+  quantization весов и настраиваемым числом потоков. Экспорт — ``export_onnx_model``
+  (нужны torch и transformers), рантайм — только ``onnxruntime`` и ``tokenizers``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, List, Mapping, Protocol, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "intfloat/multilingual-e5-base"
+ENCODER_BACKENDS = ("sentence_transformers", "onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+
+
+class EncoderBackend(Protocol):
+    model_id: str
+
+    def load(self) -> None:
+        ...
+
+    def encode(self, texts: str | Sequence[str], convert_to_numpy: bool = True, **kwargs: Any) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerBackend:
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, device: str | None = None, threads: int | None = None):
+        self.model_name = model_name
+        self.device = device
+        self.threads = threads
+        self.model_id = model_name
+        self._model: Any | None = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self._model is not None:
+                return
+            # sentence_transformers тянет torch и transformers (секунды импорта) — только когда модель реально нужна.
+            from sentence_transformers import SentenceTransformer
+
+            if self.threads:
+                import torch
+
+                torch.set_num_threads(self.threads)
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+
+    def encode(self, texts: str | Sequence[str], convert_to_numpy: bool = True, **kwargs: Any) -> np.ndarray:
+        self.load()
+        kwargs.setdefault("show_progress_bar", False)
+        return self._model.encode(texts, convert_to_numpy=convert_to_numpy, **kwargs)
+
+
+class OnnxEncoderBackend:
+    """Mean pooling по attention mask + L2-нормализация — как у sentence-transformers для e5."""
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_name: str = DEFAULT_MODEL_NAME,
+        quantized: bool = True,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+        batch_size: int = 32,
+        max_length: int = 512,
+        normalize: bool = True,
+    ):
+        self.model_dir = Path(model_dir)
+        self.model_name = model_name
+        self.quantized = quantized
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.normalize = normalize
+        self.model_id = f"{model_name}@onnx-{'int8' if quantized else 'fp32'}"
+        self._session: Any | None = None
+        self._tokenizer: Any | None = None
+        self._input_names: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def model_path(self) -> Path:
+        return self.model_dir / (ONNX_QUANTIZED_MODEL_FILE if self.quantized else ONNX_MODEL_FILE)
+
+    def load(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+            except ImportError as exc:
+                raise RuntimeError("Для embedding.backend=onnx установи onnxruntime и tokenizers") from exc
+            if not self.model_path.exists():
+                raise FileNotFoundError(
+                    f"Нет ONNX-модели {self.model_path}. Экспорт: python -m noty.cli encoder-export --output {self.model_dir}"
+                )
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            # 0 — решает onnxruntime (по числу ядер).
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = self.inter_op_threads
+            session = ort.InferenceSession(str(self.model_path), sess_options=options, providers=["CPUExecutionProvider"])
+            tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+            self._input_names = {item.name for item in session.get_inputs()}
+            self._tokenizer, self._session = tokenizer, session
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([item.ids for item in encodings], dtype=np.int64)
+        attention_mask = np.array([item.attention_mask for item in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self._session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: str | Sequence[str], convert_to_numpy: bool = True, **_: Any) -> np.ndarray:
+        self.load()
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Батчи из текстов близкой длины — меньше паддинга; порядок результата исходный.
+        order = sorted(range(len(items)), key=lambda idx: len(items[idx]))
+        result: List[np.ndarray | None] = [None] * len(items)
+        for start in range(0, len(order), self.batch_size):
+            chunk = order[start : start + self.batch_size]
+            for idx, vector in zip(chunk, self._encode_batch([items[idx] for idx in chunk])):
+                result[idx] = vector
+        matrix = np.stack(result)  # type: ignore[arg-type]
+        return matrix[0] if single else matrix
+
+
+def build_encoder(config: Mapping[str, Any] | None = None) -> EncoderBackend:
+    """Бэкенд из секции ``embedding`` bot_config.yaml."""
+    cfg = dict(config or {})
+    backend = cfg.get("backend", "sentence_transformers")
+    model_name = cfg.get("model_name", DEFAULT_MODEL_NAME)
+    if backend == "sentence_transformers":
+        return SentenceTransformerBackend(model_name, device=cfg.get("device"), threads=int(cfg.get("threads", 0) or 0) or None)
+    if backend == "onnx":
+        onnx_cfg = cfg.get("onnx", {}) or {}
+        return OnnxEncoderBackend(
+            model_dir=onnx_cfg.get("model_dir", f"./noty/data/onnx/{model_name.rsplit('/', 1)[-1]}"),
+            model_name=model_name,
+            quantized=bool(onnx_cfg.get("quantized", True)),
+            intra_op_threads=int(onnx_cfg.get("intra_op_threads", 0)),
+            inter_op_threads=int(onnx_cfg.get("inter_op_threads", 1)),
+            batch_size=int(onnx_cfg.get("batch_size", 32)),
+        )
+    raise ValueError(f"Неизвестный embedding backend: {backend} (доступны: {', '.join(ENCODER_BACKENDS)})")
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True, opset: int = 17) -> Path:
+    """Экспорт transformer-части модели в ONNX и (опционально) int8 dynamic quantization весов.
+
+    Разовая офлайн-операция: требует torch, transformers и onnxruntime. В рантайме бота
+    они не нужны — только ``onnxruntime`` и ``tokenizers``.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    target = Path(output_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(str(target))
+    sample = tokenizer(["query: пример", "passage: пример подлиннее"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    fp32_path = target / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    if not quantize:
+        return fp32_path
+    int8_path = target / ONNX_QUANTIZED_MODEL_FILE
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    logger.info(
+        "ONNX экспорт %s: fp32=%.1fMB int8=%.1fMB",
+        model_name,
+        os.path.getsize(fp32_path) / 2**20,
+        os.path.getsize(int8_path) / 2**20,
+    )
+    return int8_path
+
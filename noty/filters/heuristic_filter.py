@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import math
 import random
 import re
+from typing import Dict
 
 
 class HeuristicFilter:
@@ -22,6 +24,17 @@ class HeuristicFilter:
             "спор",
         }
 
+    def flags(self, message: str) -> Dict[str, float]:
+        """Детерминированные признаки эвристики (без случайного пропуска) — для обучаемой модели реакции."""
+        text = message.lower().strip()
+        return {
+            "mention": float("noty" in text or "ноти" in text),
+            "keyword": float(any(word in text for word in self.keywords)),
+            "question": float(text.endswith("?")),
+            "short": float(len(text) < 3),
+            "log_length": math.log1p(len(text)),
+        }
+
     def should_check_embeddings(self, message: str) -> bool:
         text = message.lower().strip()
         if not text:
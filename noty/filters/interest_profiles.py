@@ -0,0 +1,172 @@
+"""Профили интересов по чатам: свои темы и пороги для разных scope.
+
+Профили описываются в ``chat_config.yaml`` (секция ``interest_profiles``) и привязываются
+к scope точным значением (``telegram:-100123``) или маской (``vk:*``); тред ``vk:1:7``
+наследует профиль чата ``vk:1``. Неописанные чаты получают профиль ``default``.
+
+Все темы всех профилей хранятся одной нормализованной float32-матрицей (общие темы —
+одной строкой), профиль — это массив индексов строк. Оценка сообщения — одно умножение
+матрицы на вектор, одинаковое для всех профилей.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from .interest_vectors import INTEREST_TOPICS
+
+DEFAULT_PROFILE = "default"
+
+
+@dataclass
+class InterestProfile:
+    name: str
+    topics: Tuple[str, ...] = tuple(INTEREST_TOPICS)
+    threshold: float = 0.4
+    scopes: Tuple[str, ...] = ()
+    # Параметры ReactionDecider профиля; None — как у общего decider-а.
+    target_rate: float | None = None
+    min_threshold: float | None = None
+    max_threshold: float | None = None
+
+    def decider_kwargs(self) -> Dict[str, float]:
+        values = {"target_rate": self.target_rate, "min_threshold": self.min_threshold, "max_threshold": self.max_threshold}
+        return {key: float(value) for key, value in values.items() if value is not None}
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+class InterestProfileRegistry:
+    """Реестр профилей: разрешение scope -> профиль и общая матрица тем."""
+
+    _MAX_RESOLVED = 4096
+
+    def __init__(self, profiles: Iterable[InterestProfile] = ()):
+        self.profiles: Dict[str, InterestProfile] = {DEFAULT_PROFILE: InterestProfile(DEFAULT_PROFILE)}
+        for profile in profiles:
+            self.profiles[profile.name] = profile
+        self._exact: Dict[str, str] = {}
+        self._patterns: List[Tuple[str, str]] = []
+        for profile in self.profiles.values():
+            for pattern in profile.scopes:
+                if any(ch in pattern for ch in "*?["):
+                    self._patterns.append((pattern, profile.name))
+                else:
+                    self._exact[pattern] = profile.name
+        self._resolved: Dict[str, str] = {}
+        self.topics: List[str] = []
+        self.matrix: np.ndarray | None = None
+        self._rows: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any] | None, default_topics: Sequence[str] = INTEREST_TOPICS) -> "InterestProfileRegistry":
+        """Профили из секции ``interest_profiles``; профиль без ``topics`` берёт темы ``default``."""
+        cfg = dict(config or {})
+        base_cfg = dict(cfg.get(DEFAULT_PROFILE) or {})
+        base_topics = tuple(base_cfg.get("topics") or default_topics)
+        base_threshold = float(base_cfg.get("threshold", 0.4))
+        profiles = []
+        for name, raw in cfg.items():
+            raw = dict(raw or {})
+            scopes = raw.get("scopes") or []
+            profiles.append(
+                InterestProfile(
+                    name=str(name),
+                    topics=tuple(raw.get("topics") or base_topics),
+                    threshold=float(raw.get("threshold", base_threshold)),
+                    scopes=tuple(str(scope) for scope in ([scopes] if isinstance(scopes, str) else scopes)),
+                    target_rate=raw.get("target_rate"),
+                    min_threshold=raw.get("min_threshold"),
+                    max_threshold=raw.get("max_threshold"),
+                )
+            )
+        if DEFAULT_PROFILE not in cfg:
+            profiles.append(InterestProfile(DEFAULT_PROFILE, topics=base_topics, threshold=base_threshold))
+        return cls(profiles)
+
+    @property
+    def compiled(self) -> bool:
+        return self.matrix is not None
+
+    def _resolve(self, scope: str) -> str:
+        name = self._exact.get(scope)
+        if name is None:
+            # platform:chat:thread -> platform:chat
+            parts = scope.split(":")
+            if len(parts) > 2:
+                name = self._exact.get(":".join(parts[:2]))
+        if name is None:
+            name = next((profile for pattern, profile in self._patterns if fnmatch.fnmatchcase(scope, pattern)), DEFAULT_PROFILE)
+        return name
+
+    def profile_for(self, scope: str | None) -> InterestProfile:
+        if not scope:
+            return self.profiles[DEFAULT_PROFILE]
+        name = self._resolved.get(scope)
+        if name is None:
+            if len(self._resolved) >= self._MAX_RESOLVED:
+                self._resolved.clear()
+            name = self._resolve(scope)
+            self._resolved[scope] = name
+        return self.profiles[name]
+
+    def compile(self, topic_vectors: Callable[[Sequence[str]], np.ndarray]) -> None:
+        """Собирает общую матрицу: векторы каждого профиля берутся из кэша ``topic_vectors``."""
+        index: Dict[str, int] = {}
+        rows: List[np.ndarray] = []
+        profile_rows: Dict[str, np.ndarray] = {}
+        for profile in self.profiles.values():
+            vectors = np.atleast_2d(np.asarray(topic_vectors(list(profile.topics))))
+            ids = []
+            for topic, vector in zip(profile.topics, vectors):
+                if topic not in index:
+                    index[topic] = len(rows)
+                    rows.append(vector)
+                ids.append(index[topic])
+            profile_rows[profile.name] = np.asarray(ids, dtype=np.intp)
+        self.topics = list(index)
+        self.matrix = _normalize_rows(np.stack(rows))
+        self._rows = profile_rows
+
+    def best_topics(self, vectors: np.ndarray, profile: InterestProfile) -> Tuple[List[str], np.ndarray]:
+        """Лучшая тема профиля и косинус для каждой строки ``vectors``."""
+        rows = self._rows[profile.name]
+        scores = _normalize_rows(vectors) @ self.matrix[rows].T
+        best = scores.argmax(axis=1)
+        return [self.topics[rows[idx]] for idx in best], scores[np.arange(len(best)), best]
+
+
+def learn_topics(texts: Sequence[str], vectors: np.ndarray, k: int = 6, iterations: int = 25, seed: int = 0) -> List[str]:
+    """Темы чата по истории: k-means по косинусу, тема — реальное сообщение ближе всех к центру кластера.
+
+    Крупные кластеры идут первыми; результат вставляется в ``topics`` профиля.
+    """
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return []
+    positions = {text: idx for idx, text in enumerate(texts)}
+    points = _normalize_rows(np.asarray(vectors)[[positions[text] for text in unique]])
+    k = max(1, min(k, len(unique)))
+    rng = np.random.default_rng(seed)
+    centers = points[rng.choice(len(points), size=k, replace=False)]
+    for _ in range(iterations):
+        labels = (points @ centers.T).argmax(axis=1)
+        updated = np.stack([points[labels == idx].mean(axis=0) if np.any(labels == idx) else centers[idx] for idx in range(k)])
+        updated = _normalize_rows(updated)
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+    labels = (points @ centers.T).argmax(axis=1)
+    topics = []
+    for idx in np.argsort(-np.bincount(labels, minlength=k)):
+        members = np.flatnonzero(labels == idx)
+        if len(members):
+            topics.append(unique[members[(points[members] @ centers[idx]).argmax()]])
+    return topics
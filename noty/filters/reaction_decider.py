@@ -2,9 +2,15 @@
 
 from __future__ import annotations
 
+import math
 import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Tuple
 
 
 @dataclass
@@ -14,51 +20,239 @@ class ReactionDecision:
     threshold: float
     sampled_probability: float
     reason: str
+    topic: str | None = None
+    # Ветка A/B: "pipeline" (эвристика + embeddings + сэмплирование) или "model" (обученная модель).
+    variant: str = "pipeline"
+
+
+@dataclass(slots=True)
+class ScopeRate:
+    """EWMA доли ответов чата: ``weight`` — эффективное число решений, затухает с полураспадом."""
+
+    rate: float = 0.0
+    weight: float = 0.0
+    updated_at: float = 0.0
+    dirty: bool = False
+
+    def decayed_weight(self, now: float, half_life_seconds: float) -> float:
+        if self.weight <= 0.0 or half_life_seconds <= 0:
+            return self.weight
+        return self.weight * math.exp2(-max(0.0, now - self.updated_at) / half_life_seconds)
+
+    def observe(self, responded: bool, now: float, half_life_seconds: float) -> None:
+        weight = self.decayed_weight(now, half_life_seconds)
+        self.rate = (self.rate * weight + (1.0 if responded else 0.0)) / (weight + 1.0)
+        self.weight = weight + 1.0
+        self.updated_at = now
+        self.dirty = True
+
+
+class DeciderStateStore:
+    """Состояние ReactionDecider по scope в SQLite: одна строка на чат, upsert порциями."""
+
+    def __init__(self, db_path: str = "./noty/data/reaction_state.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Decider зовут из воркеров runtime: одно соединение под своим lock-ом.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reaction_scope_state (
+                    scope TEXT PRIMARY KEY,
+                    rate REAL NOT NULL,
+                    weight REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def load(self, scope: str) -> ScopeRate | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rate, weight, updated_at FROM reaction_scope_state WHERE scope=?", (scope,)
+            ).fetchone()
+        return ScopeRate(*row) if row else None
+
+    def save(self, states: Iterable[Tuple[str, ScopeRate]]) -> int:
+        rows = [(scope, state.rate, state.weight, state.updated_at) for scope, state in states]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO reaction_scope_state (scope, rate, weight, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(scope) DO UPDATE SET rate=excluded.rate, weight=excluded.weight, updated_at=excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
 
 class ReactionDecider:
-    def __init__(self, target_rate: float = 0.2, min_threshold: float = 0.35, max_threshold: float = 0.8):
+    """Адаптивный порог по доле ответов — отдельно для каждого scope.
+
+    Состояние чата — ``ScopeRate`` (EWMA с затуханием по времени) в LRU на ``max_scopes``
+    записей: порог считается за O(1) и не зависит от трафика в других чатах. С ``store``
+    изменённые записи раз в ``flush_interval_seconds`` (и при вытеснении из LRU) уходят в SQLite,
+    а после рестарта чат продолжает со своего состояния. Решения без scope идут в общий ключ.
+    """
+
+    GLOBAL_SCOPE = "*"
+
+    def __init__(
+        self,
+        target_rate: float = 0.2,
+        min_threshold: float = 0.35,
+        max_threshold: float = 0.8,
+        half_life_seconds: float = 3600.0,
+        prior_weight: float = 1.0,
+        max_scopes: int = 10000,
+        store: DeciderStateStore | None = None,
+        flush_interval_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
         self.target_rate = target_rate
         self.min_threshold = min_threshold
         self.max_threshold = max_threshold
+        self.half_life_seconds = half_life_seconds
+        # Псевдо-решения с долей target_rate: по мере затухания истории порог возвращается к нейтральному.
+        self.prior_weight = prior_weight
+        self.max_scopes = max(1, max_scopes)
+        self.store = store
+        self.flush_interval_seconds = flush_interval_seconds
+        self.clock = clock
+        self._states: "OrderedDict[str, ScopeRate]" = OrderedDict()
+        self._evicted: Dict[str, ScopeRate] = {}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
         self._seen = 0
         self._responded = 0
 
-    def _adaptive_threshold(self) -> float:
-        if self._seen == 0:
+    def derive(self, **overrides: float) -> "ReactionDecider":
+        """Decider с другими target_rate/порогами, но тем же затуханием, LRU и хранилищем."""
+        params = {
+            "target_rate": self.target_rate,
+            "min_threshold": self.min_threshold,
+            "max_threshold": self.max_threshold,
+            "half_life_seconds": self.half_life_seconds,
+            "prior_weight": self.prior_weight,
+            "max_scopes": self.max_scopes,
+            "store": self.store,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "clock": self.clock,
+        }
+        params.update(overrides)
+        return ReactionDecider(**params)
+
+    def _state(self, scope: str) -> ScopeRate:
+        state = self._states.get(scope)
+        if state is not None:
+            self._states.move_to_end(scope)
+            return state
+        state = self._evicted.pop(scope, None)
+        if state is None and self.store is not None:
+            state = self.store.load(scope)
+        state = state or ScopeRate()
+        self._states[scope] = state
+        if len(self._states) > self.max_scopes:
+            old_scope, old_state = self._states.popitem(last=False)
+            if old_state.dirty and self.store is not None:
+                self._evicted[old_scope] = old_state
+        return state
+
+    def _threshold_for(self, state: ScopeRate, now: float) -> float:
+        weight = state.decayed_weight(now, self.half_life_seconds)
+        if weight <= 0.0:
             return 0.5
-        current_rate = self._responded / self._seen
+        current_rate = (state.rate * weight + self.target_rate * self.prior_weight) / (weight + self.prior_weight)
         drift = current_rate - self.target_rate
         adjusted = 0.5 + drift * 0.6
         return max(self.min_threshold, min(self.max_threshold, adjusted))
 
-    def decide(self, semantic_score: float, heuristic_boost: float = 0.0) -> ReactionDecision:
-        self._seen += 1
-        threshold = self._adaptive_threshold()
+    def threshold(self, scope: str | None = None) -> float:
+        with self._lock:
+            return self._threshold_for(self._state(scope or self.GLOBAL_SCOPE), self.clock())
 
+    def decide(self, semantic_score: float, heuristic_boost: float = 0.0, scope: str | None = None) -> ReactionDecision:
+        now = self.clock()
         calibrated_score = min(1.0, max(0.0, semantic_score + heuristic_boost))
-        if calibrated_score < threshold:
-            return ReactionDecision(False, calibrated_score, threshold, 0.0, "below_threshold")
-
-        probability = min(1.0, 0.4 + calibrated_score * 0.6)
-        sampled = random.random()
-        should = sampled < probability
-        if should:
-            self._responded += 1
+        with self._lock:
+            state = self._state(scope or self.GLOBAL_SCOPE)
+            threshold = self._threshold_for(state, now)
+            if calibrated_score < threshold:
+                should, probability, reason = False, 0.0, "below_threshold"
+            else:
+                probability = min(1.0, 0.4 + calibrated_score * 0.6)
+                should = random.random() < probability
+                reason = "sampled_in" if should else "sampled_out"
+            self._observe(state, should, now)
+            due = self._flush_due(now)
+        if due:
+            self.flush()
         return ReactionDecision(
             should_respond=should,
             score=calibrated_score,
             threshold=threshold,
             sampled_probability=probability,
-            reason="sampled_in" if should else "sampled_out",
+            reason=reason,
         )
 
-    def stats(self) -> Dict[str, float]:
+    def _observe(self, state: ScopeRate, responded: bool, now: float) -> None:
+        state.observe(responded, now, self.half_life_seconds)
+        self._seen += 1
+        self._responded += int(responded)
+
+    def _flush_due(self, now: float) -> bool:
+        return self.store is not None and now - self._last_flush >= self.flush_interval_seconds
+
+    def scope_state(self, scope: str | None) -> Tuple[float, float]:
+        """(EWMA доля ответов, затухший вес) чата — признаки для обучаемой модели реакции."""
+        now = self.clock()
+        with self._lock:
+            state = self._state(scope or self.GLOBAL_SCOPE)
+            return state.rate, state.decayed_weight(now, self.half_life_seconds)
+
+    def record(self, scope: str | None, responded: bool) -> None:
+        """Учитывает решение, принятое в обход ``decide`` (например, моделью A/B-ветки)."""
+        now = self.clock()
+        with self._lock:
+            self._observe(self._state(scope or self.GLOBAL_SCOPE), responded, now)
+            due = self._flush_due(now)
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Записывает изменённые состояния в ``store``; возвращает число строк."""
+        if self.store is None:
+            return 0
+        with self._lock:
+            self._last_flush = self.clock()
+            pending = [(scope, state) for scope, state in self._states.items() if state.dirty]
+            pending.extend(self._evicted.items())
+            snapshot = [(scope, ScopeRate(state.rate, state.weight, state.updated_at)) for scope, state in pending]
+            for _, state in pending:
+                state.dirty = False
+            self._evicted = {}
+        return self.store.save(snapshot)
+
+    def stats(self, scope: str | None = None) -> Dict[str, float]:
+        """Без scope — общие счётчики за время жизни процесса и порог решений без scope."""
         response_rate = (self._responded / self._seen) if self._seen else 0.0
-        return {
+        stats = {
             "seen": float(self._seen),
             "responded": float(self._responded),
             "response_rate": round(response_rate, 4),
             "target_rate": self.target_rate,
-            "adaptive_threshold": round(self._adaptive_threshold(), 4),
+            "adaptive_threshold": round(self.threshold(scope), 4),
+            "tracked_scopes": float(len(self._states)),
         }
+        if scope is not None:
+            with self._lock:
+                state = self._state(scope)
+                stats["scope_rate"] = round(state.rate, 4)
+                stats["scope_weight"] = round(state.decayed_weight(self.clock(), self.half_life_seconds), 4)
+        return stats
@@ -0,0 +1,147 @@
+"""Обучаемая модель реакции: логистическая регрессия поверх эмбеддинга и дешёвых признаков.
+
+Обучение — офлайн по журналам взаимодействий (``noty.filters.reaction_training``,
+``python -m noty.cli reaction-train``). В рантайме только NumPy: стандартизация свёрнута
+в веса при загрузке, оценка сообщения — одно скалярное произведение и сигмоида.
+Файл модели — ``.npz`` без pickle: массивы весов + JSON с метаданными.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+FEATURE_VERSION = 1
+BASE_FEATURES = (
+    "topic_score",
+    "mention",
+    "keyword",
+    "question",
+    "short",
+    "log_length",
+    "scope_rate",
+    "scope_activity",
+    "hour_sin",
+    "hour_cos",
+)
+
+
+def reaction_features(
+    vector: np.ndarray,
+    topic_score: float,
+    flags: Mapping[str, float],
+    scope_rate: float,
+    scope_weight: float,
+    hour: float,
+) -> np.ndarray:
+    """Вектор признаков в порядке ``BASE_FEATURES`` + нормализованный эмбеддинг сообщения.
+
+    Один и тот же код строит признаки при обучении (по журналам) и в рантайме.
+    """
+    angle = 2.0 * math.pi * (hour % 24.0) / 24.0
+    base = np.array(
+        [
+            topic_score,
+            flags.get("mention", 0.0),
+            flags.get("keyword", 0.0),
+            flags.get("question", 0.0),
+            flags.get("short", 0.0),
+            flags.get("log_length", 0.0),
+            scope_rate,
+            math.log1p(max(0.0, scope_weight)),
+            math.sin(angle),
+            math.cos(angle),
+        ],
+        dtype=np.float32,
+    )
+    embedding = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(embedding))
+    return np.concatenate([base, embedding / norm if norm > 0 else embedding])
+
+
+@dataclass
+class ReactionModel:
+    """Логистическая регрессия; ``mean``/``scale`` — стандартизация признаков с обучения."""
+
+    weights: np.ndarray
+    bias: float
+    mean: np.ndarray
+    scale: np.ndarray
+    threshold: float = 0.5
+    encoder_id: str = ""
+    feature_version: int = FEATURE_VERSION
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.weights = np.asarray(self.weights, dtype=np.float32)
+        self.mean = np.asarray(self.mean, dtype=np.float32)
+        self.scale = np.asarray(self.scale, dtype=np.float32)
+        # (x - mean) / scale @ w + b  ==  x @ (w / scale) + (b - mean @ (w / scale))
+        self._w = self.weights / self.scale
+        self._b = float(self.bias - self.mean @ self._w)
+
+    @property
+    def n_features(self) -> int:
+        return int(self.weights.shape[0])
+
+    def logits(self, features: np.ndarray) -> np.ndarray:
+        return np.asarray(features, dtype=np.float32) @ self._w + self._b
+
+    def probability(self, features: np.ndarray) -> float:
+        z = float(np.dot(features, self._w)) + self._b
+        # exp(-z) не переполняется при сильно отрицательном z.
+        return 1.0 / (1.0 + math.exp(-z)) if z >= 0 else math.exp(z) / (1.0 + math.exp(z))
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-np.clip(self.logits(np.atleast_2d(features)), -50.0, 50.0)))
+
+    def save(self, path: str | Path) -> Path:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "bias": self.bias,
+            "threshold": self.threshold,
+            "encoder_id": self.encoder_id,
+            "feature_version": self.feature_version,
+            "base_features": list(BASE_FEATURES),
+            "metrics": self.metrics,
+        }
+        tmp_path = target.with_name(target.name + ".tmp")
+        with tmp_path.open("wb") as fh:
+            np.savez(fh, weights=self.weights, mean=self.mean, scale=self.scale, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+        os.replace(tmp_path, target)
+        return target
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ReactionModel":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("feature_version") != FEATURE_VERSION:
+                raise ValueError(f"{path}: модель собрана для признаков v{meta.get('feature_version')}, нужна v{FEATURE_VERSION}")
+            return cls(
+                weights=data["weights"],
+                bias=float(meta["bias"]),
+                mean=data["mean"],
+                scale=data["scale"],
+                threshold=float(meta.get("threshold", 0.5)),
+                encoder_id=str(meta.get("encoder_id", "")),
+                metrics=meta.get("metrics", {}),
+            )
+
+
+def ab_variant(scope: str | None, traffic: float, salt: str = "") -> str:
+    """Стабильное A/B-назначение по scope: чат всё время в одной ветке (``model`` или ``pipeline``)."""
+    if traffic <= 0.0:
+        return "pipeline"
+    if traffic >= 1.0:
+        return "model"
+    bucket = zlib.crc32(f"{salt}{scope or ''}".encode("utf-8")) % 10000
+    return "model" if bucket < traffic * 10000 else "pipeline"
+
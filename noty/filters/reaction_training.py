@@ -0,0 +1,278 @@
+"""Офлайн-обучение модели реакции по журналам InteractionJSONLLogger.
+
+Пары incoming/outgoing склеиваются по ``raw_event_id``. Разметка:
+
+- ответ по ``force_respond`` — 1 (пользователь явно ждал ответа);
+- ответ — 1, если взаимодействие одобрено адаптацией (``adaptation.approved``: outcome=success,
+  без отката персоны), иначе 0;
+- проигнорированное сообщение — 0 с весом ``ignored_weight``: исход не наблюдался, поэтому
+  такие примеры влияют на модель слабее;
+- отказы политики (``private_chat_uninteresting``) и ошибки обработки в обучение не попадают.
+
+Признаки считаются тем же ``reaction_features``, что и в рантайме; состояние чата
+(EWMA доли ответов) воспроизводится проигрыванием журнала по времени через ``ScopeRate``.
+Как и в рантайме, в состояние попадают только решения decider-а: без отсева эвристикой,
+отказов политики и ``force_respond``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .reaction_decider import ScopeRate
+from .reaction_model import ReactionModel, reaction_features
+
+# Отказы до ReactionDecider: ни decide, ни record для них не вызываются.
+PRE_DECIDER_REASONS = frozenset({"heuristic_drop", "private_chat_uninteresting"})
+# Отказы политики бота, а не наблюдаемый исход сообщения.
+POLICY_REASONS = frozenset({"private_chat_uninteresting"})
+
+
+@dataclass
+class DecisionSample:
+    timestamp: datetime
+    scope: str
+    text: str
+    status: str
+    reason: str = ""
+    forced: bool = False
+    approved: bool | None = None
+    variant: str = "pipeline"
+
+    @property
+    def responded(self) -> bool:
+        return self.status == "responded"
+
+    @property
+    def observed_by_decider(self) -> bool:
+        """Учёл ли рантайм-decider это решение в EWMA доли ответов чата."""
+        if self.forced or self.reason in PRE_DECIDER_REASONS:
+            return False
+        return self.status in ("ignored", "responded")
+
+
+def load_decision_samples(path: str | Path) -> List[DecisionSample]:
+    """Решения из JSONL (файл или каталог дневных файлов), по времени входящего сообщения."""
+    source = Path(path)
+    files = sorted(source.glob("*.jsonl")) if source.is_dir() else [source]
+    incoming: Dict[str, Dict[str, Any]] = {}
+    samples: List[DecisionSample] = []
+    for file in files:
+        with file.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                event = entry.get("event") or {}
+                key = str(event.get("raw_event_id") or "")
+                if not key or "scope" not in event:
+                    continue
+                if entry.get("direction") == "incoming":
+                    incoming[key] = entry
+                    continue
+                source_entry = incoming.pop(key, None)
+                payload = entry.get("payload") or {}
+                if source_entry is None or "status" not in payload:
+                    continue
+                decision = payload.get("decision") or {}
+                adaptation = payload.get("adaptation") or {}
+                samples.append(
+                    DecisionSample(
+                        timestamp=datetime.fromisoformat(source_entry["timestamp"]),
+                        scope=str(event["scope"]),
+                        text=str(event.get("text", "")),
+                        status=str(payload["status"]),
+                        reason=str(payload.get("reason") or decision.get("reason") or ""),
+                        forced=bool(decision.get("forced", False)),
+                        approved=adaptation.get("approved") if adaptation else None,
+                        variant=str(payload.get("variant") or decision.get("variant") or "pipeline"),
+                    )
+                )
+    samples.sort(key=lambda sample: sample.timestamp)
+    return samples
+
+
+def label_sample(sample: DecisionSample, ignored_weight: float = 0.25) -> Tuple[float, float] | None:
+    """(метка, вес) или None, если пример не годится для обучения."""
+    if sample.reason in POLICY_REASONS:
+        return None
+    if sample.status == "ignored":
+        return 0.0, ignored_weight
+    if not sample.responded:
+        return None
+    if sample.forced:
+        return 1.0, 1.0
+    return (1.0 if sample.approved is not False else 0.0), 1.0
+
+
+def build_training_set(
+    samples: Sequence[DecisionSample],
+    embedding_filter: Any,
+    heuristic_filter: Any,
+    half_life_seconds: float = 3600.0,
+    ignored_weight: float = 0.25,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Матрица признаков X, метки y и веса w; ``samples`` должны идти по времени."""
+    labels = [label_sample(sample, ignored_weight) if sample.text.strip() else None for sample in samples]
+    labeled = [sample for sample, label in zip(samples, labels) if label is not None]
+    if not labeled:
+        return np.zeros((0, 0), dtype=np.float32), np.zeros(0), np.zeros(0)
+
+    texts = [sample.text for sample in labeled]
+    vectors = embedding_filter.message_vectors(texts)
+    profiles = embedding_filter.profiles
+    topic_scores = np.zeros(len(labeled), dtype=np.float32)
+    by_profile: Dict[str, List[int]] = {}
+    for idx, sample in enumerate(labeled):
+        by_profile.setdefault(profiles.profile_for(sample.scope).name, []).append(idx)
+    for name, indices in by_profile.items():
+        _, scores = profiles.best_topics(vectors[indices], profiles.profiles[name])
+        topic_scores[indices] = scores
+
+    # Состояние чата на момент решения — до учёта самого решения, как в рантайме. Проигрываются
+    # все решения decider-а, в том числе не попавшие в обучение.
+    states: Dict[str, ScopeRate] = {}
+    rows, targets, weights = [], [], []
+    for sample, label in zip(samples, labels):
+        state = states.setdefault(sample.scope, ScopeRate())
+        now = sample.timestamp.timestamp()
+        if label is not None:
+            idx = len(rows)
+            rows.append(
+                reaction_features(
+                    vectors[idx],
+                    float(topic_scores[idx]),
+                    heuristic_filter.flags(sample.text),
+                    state.rate,
+                    state.decayed_weight(now, half_life_seconds),
+                    hour=sample.timestamp.hour + sample.timestamp.minute / 60.0,
+                )
+            )
+            targets.append(label[0])
+            weights.append(label[1])
+        if sample.observed_by_decider:
+            state.observe(sample.responded, now, half_life_seconds)
+    return np.stack(rows), np.asarray(targets, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+
+
+def fit_logistic(
+    X: np.ndarray,
+    y: np.ndarray,
+    sample_weight: np.ndarray | None = None,
+    l2: float = 1.0,
+    iterations: int = 30,
+    tol: float = 1e-6,
+) -> Tuple[np.ndarray, float, np.ndarray, np.ndarray]:
+    """Взвешенная логистическая регрессия с L2 (Ньютон / IRLS) на стандартизованных признаках.
+
+    Возвращает (weights, bias, mean, scale) для ``ReactionModel``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    mean = np.average(X, axis=0, weights=w)
+    scale = np.sqrt(np.average((X - mean) ** 2, axis=0, weights=w))
+    scale[scale < 1e-6] = 1.0
+    Z = np.hstack([(X - mean) / scale, np.ones((len(X), 1))])
+    penalty = np.full(Z.shape[1], l2)
+    penalty[-1] = 0.0  # свободный член не штрафуем
+    beta = np.zeros(Z.shape[1])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Z @ beta, -30.0, 30.0)))
+        gradient = Z.T @ (w * (p - y)) + penalty * beta
+        hessian = (Z * (w * p * (1.0 - p))[:, None]).T @ Z + np.diag(penalty + 1e-9)
+        step = np.linalg.solve(hessian, gradient)
+        beta -= step
+        if np.max(np.abs(step)) < tol:
+            break
+    return beta[:-1], float(beta[-1]), mean, scale
+
+
+def roc_auc(y: np.ndarray, scores: np.ndarray) -> float:
+    """AUC через ранги (Манна — Уитни); при одном классе — nan."""
+    y = np.asarray(y) > 0.5
+    positives, negatives = int(y.sum()), int((~y).sum())
+    if not positives or not negatives:
+        return float("nan")
+    order = np.argsort(scores, kind="mergesort")
+    ranks = np.empty(len(scores))
+    ranks[order] = np.arange(1, len(scores) + 1)
+    # Одинаковые оценки получают средний ранг.
+    for value in np.unique(scores):
+        tied = scores == value
+        if tied.sum() > 1:
+            ranks[tied] = ranks[tied].mean()
+    return float((ranks[y].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def _log_loss(y: np.ndarray, p: np.ndarray, w: np.ndarray) -> float:
+    p = np.clip(p, 1e-7, 1 - 1e-7)
+    return float(np.average(-(y * np.log(p) + (1 - y) * np.log(1 - p)), weights=w))
+
+
+def train_reaction_model(
+    X: np.ndarray,
+    y: np.ndarray,
+    sample_weight: np.ndarray,
+    target_rate: float = 0.2,
+    holdout: float = 0.2,
+    l2: float = 1.0,
+    encoder_id: str = "",
+) -> Tuple[ReactionModel, Dict[str, Any]]:
+    """Обучение на ранней части журнала, проверка на последних ``holdout`` примерах.
+
+    Порог подбирается так, чтобы доля ответов модели на обучающей части совпала с ``target_rate``:
+    при A/B ветки отвечают одинаково часто и сравниваются по качеству, а не по частоте.
+    """
+    split = int(len(y) * (1.0 - holdout)) if 0 < holdout < 1 else len(y)
+    split = max(1, min(split, len(y)))
+    weights, bias, mean, scale = fit_logistic(X[:split], y[:split], sample_weight[:split], l2=l2)
+    model = ReactionModel(weights=weights, bias=bias, mean=mean, scale=scale, encoder_id=encoder_id)
+    train_p = model.predict_proba(X[:split])
+    model.threshold = float(np.quantile(train_p, 1.0 - target_rate)) if 0 < target_rate < 1 else 0.5
+
+    report: Dict[str, Any] = {
+        "samples": int(len(y)),
+        "train": split,
+        "holdout": int(len(y) - split),
+        "positive_rate": round(float(np.mean(y)), 4),
+        "threshold": round(model.threshold, 4),
+        "train_auc": round(roc_auc(y[:split], train_p), 4),
+        "train_log_loss": round(_log_loss(y[:split], train_p, sample_weight[:split]), 4),
+    }
+    if split < len(y):
+        test_p = model.predict_proba(X[split:])
+        report.update(
+            holdout_auc=round(roc_auc(y[split:], test_p), 4),
+            holdout_log_loss=round(_log_loss(y[split:], test_p, sample_weight[split:]), 4),
+            holdout_response_rate=round(float(np.mean(test_p >= model.threshold)), 4),
+        )
+    model.metrics = {key: (None if isinstance(value, float) and math.isnan(value) else value) for key, value in report.items()}
+    return model, report
+
+
+def ab_report(samples: Sequence[DecisionSample]) -> Dict[str, Dict[str, Any]]:
+    """Сравнение веток A/B по журналу: доля ответов и доля одобренных ответов (без force_respond)."""
+    report: Dict[str, Dict[str, Any]] = {}
+    for sample in samples:
+        if sample.forced:
+            continue
+        row = report.setdefault(sample.variant, {"decisions": 0, "responded": 0, "approved": 0, "scopes": set()})
+        row["decisions"] += 1
+        row["scopes"].add(sample.scope)
+        if sample.responded:
+            row["responded"] += 1
+            row["approved"] += int(sample.approved is True)
+    for row in report.values():
+        row["scopes"] = len(row["scopes"])
+        row["response_rate"] = round(row["responded"] / row["decisions"], 4) if row["decisions"] else 0.0
+        row["approval_rate"] = round(row["approved"] / row["responded"], 4) if row["responded"] else None
+    return report
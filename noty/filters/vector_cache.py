@@ -0,0 +1,117 @@
+"""Бинарный кэш векторов тем интересов: заголовок + сырые float32, чтение через memory map.
+
+Формат файла ``.npv``::
+
+    b"NOTYVEC1" | uint32 LE длина заголовка | JSON-заголовок (дополнен пробелами до 64 байт) | данные C-order
+
+В заголовке ``model_id`` encoder-а и ``topics_hash`` (sha256 списка тем), а также dtype и shape.
+Смена модели или тем даёт другой хэш/id — файл пересчитывается, а не молча переиспользуется.
+Имя файла включает хэш тем, поэтому наборы интересов разных чатов лежат рядом и грузятся
+``np.memmap`` без pickle и без копирования в память процесса.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NOTYVEC1"
+_ALIGN = 64
+_LEN = struct.Struct("<I")
+
+
+def topics_hash(topics: Sequence[str]) -> str:
+    return hashlib.sha256(json.dumps(list(topics), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def write_vectors(path: str | Path, vectors: np.ndarray, model_id: str, topics: Sequence[str]) -> None:
+    """Атомарная запись: tmp-файл + ``os.replace``, читатели не увидят недописанный файл."""
+    target = Path(path)
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    header = {
+        "model_id": model_id,
+        "topics_hash": topics_hash(topics),
+        "dtype": matrix.dtype.str,
+        "shape": list(matrix.shape),
+        "topics": list(topics),
+    }
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = len(MAGIC) + _LEN.size
+    raw += b" " * (-(prefix + len(raw)) % _ALIGN)
+    tmp_path = target.with_name(target.name + ".tmp")
+    with tmp_path.open("wb") as fh:
+        fh.write(MAGIC)
+        fh.write(_LEN.pack(len(raw)))
+        fh.write(raw)
+        fh.write(matrix.tobytes(order="C"))
+    os.replace(tmp_path, target)
+
+
+def read_header(path: str | Path) -> tuple[Dict[str, Any], int]:
+    """Заголовок и смещение данных; ValueError, если файл не нашего формата или обрезан."""
+    with Path(path).open("rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: не файл векторов Noty")
+        (length,) = _LEN.unpack(fh.read(_LEN.size))
+        header = json.loads(fh.read(length).decode("utf-8"))
+    offset = len(MAGIC) + _LEN.size + length
+    expected = offset + int(np.prod(header["shape"])) * np.dtype(header["dtype"]).itemsize
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"{path}: файл обрезан")
+    return header, offset
+
+
+def open_vectors(path: str | Path, model_id: str, topics: Sequence[str]) -> np.ndarray | None:
+    """Read-only memmap, если заголовок совпал с моделью и темами; иначе None."""
+    try:
+        header, offset = read_header(path)
+    except (OSError, ValueError, KeyError, json.JSONDecodeError) as exc:
+        logger.info("Кэш векторов %s непригоден: %s", path, exc)
+        return None
+    if header.get("model_id") != model_id or header.get("topics_hash") != topics_hash(topics):
+        return None
+    return np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r", offset=offset, shape=tuple(header["shape"]))
+
+
+class InterestVectorStore:
+    """Векторы наборов тем по ``topics_hash``: memmap из файла или пересчёт encoder-ом."""
+
+    def __init__(self, cache_dir: str | Path, model_id: str, encode: Callable[[Sequence[str]], np.ndarray]):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.model_id = model_id
+        self.encode = encode
+        self._loaded: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.recomputed = 0
+
+    def path_for(self, topics: Sequence[str]) -> Path:
+        return self.cache_dir / f"interest-{topics_hash(topics)[:16]}.npv"
+
+    def get(self, topics: Sequence[str]) -> np.ndarray:
+        if not topics:
+            return np.zeros((0, 0), dtype=np.float32)
+        key = topics_hash(topics)
+        with self._lock:
+            cached = self._loaded.get(key)
+            if cached is not None:
+                return cached
+            path = self.path_for(topics)
+            vectors = open_vectors(path, self.model_id, topics) if path.exists() else None
+            if vectors is None:
+                write_vectors(path, np.asarray(self.encode(list(topics))), self.model_id, topics)
+                vectors = open_vectors(path, self.model_id, topics)
+                self.recomputed += 1
+                logger.info("Векторы интересов пересчитаны: %s тем, model=%s -> %s", len(topics), self.model_id, path.name)
+            self._loaded[key] = vectors
+            return vectors
@@ -3,18 +3,24 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-from mem0 import Memory
+if TYPE_CHECKING:
+    from mem0 import Memory
 
 
 class Mem0Wrapper:
-    def __init__(self, config: Optional[Dict] = None, memory_client: Optional[Memory] = None):
+    def __init__(self, config: Optional[Dict] = None, memory_client: Optional["Memory"] = None):
         default_config = {
             "vector_store": {"provider": "qdrant", "config": {"path": "./noty/data/qdrant_db", "collection_name": "noty_memories"}},
             "embedder": {"provider": "sentence_transformers", "config": {"model": "intfloat/multilingual-e5-base"}},
         }
-        self.memory = memory_client or Memory.from_config(config or default_config)
+        if memory_client is None:
+            # mem0 при импорте поднимает свои провайдеры (~1 с): грузим только при реальном создании памяти.
+            from mem0 import Memory
+
+            memory_client = Memory.from_config(config or default_config)
+        self.memory = memory_client
 
     def remember(
         self,
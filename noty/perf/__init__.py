@@ -0,0 +1 @@
+"""Профилирование и нагрузочные прогоны. Подмодули импортируются напрямую: пакет ничего не реэкспортирует."""
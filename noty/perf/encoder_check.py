@@ -0,0 +1,86 @@
+"""Сверка encoder-бэкендов: косинус эмбеддингов и совпадение лучшей темы интересов.
+
+Эталон — PyTorch (sentence-transformers), кандидат — например, ONNX int8. Квантизация
+немного сдвигает векторы; для фильтра важно, чтобы сообщения попадали в те же темы
+и оценки близости почти не менялись.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from noty.filters.interest_vectors import INTEREST_TOPICS
+
+DEFAULT_PROBES = (
+    "ноти, ты тут?",
+    "почему в питоне GIL до сих пор не убрали",
+    "кто-нибудь смотрел вчерашние дебаты? жесть",
+    "в чём вообще смысл всего этого",
+    "ахах, лучший мем недели",
+    "у меня опять сломался ноутбук, не знаю что делать",
+    "а вы знали, что осьминоги имеют три сердца?",
+    "2+2 сколько будет?",
+    "ребята, хватит ругаться из-за ерунды",
+    "как думаете, свобода воли существует?",
+)
+
+
+def cosine_rows(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Косинус между строками с одинаковым индексом."""
+    left = np.atleast_2d(np.asarray(left, dtype=np.float64))
+    right = np.atleast_2d(np.asarray(right, dtype=np.float64))
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    return (left * right).sum(axis=1) / np.clip(norms, 1e-12, None)
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+def _timed_encode(encoder: Any, texts: List[str]) -> tuple[np.ndarray, float]:
+    encoder.encode(texts[:2], convert_to_numpy=True)  # загрузка и прогрев не входят в замер
+    started = time.perf_counter()
+    vectors = np.asarray(encoder.encode(texts, convert_to_numpy=True))
+    return vectors, (time.perf_counter() - started) * 1000
+
+
+def cross_check_encoders(
+    reference: Any,
+    candidate: Any,
+    topics: Sequence[str] = INTEREST_TOPICS,
+    probes: Sequence[str] = DEFAULT_PROBES,
+    min_cosine: float = 0.98,
+    min_topic_agreement: float = 0.9,
+) -> Dict[str, Any]:
+    texts = list(dict.fromkeys([*topics, *probes]))
+    ref, ref_ms = _timed_encode(reference, texts)
+    cand, cand_ms = _timed_encode(candidate, texts)
+    cosines = cosine_rows(ref, cand)
+
+    # Лучшая тема для каждого пробного сообщения — в пространстве каждого бэкенда отдельно.
+    n_topics = len(topics)
+    ref_norm, cand_norm = _normalized(ref), _normalized(cand)
+    ref_scores = ref_norm[n_topics:] @ ref_norm[:n_topics].T
+    cand_scores = cand_norm[n_topics:] @ cand_norm[:n_topics].T
+    agreement = float(np.mean(ref_scores.argmax(axis=1) == cand_scores.argmax(axis=1))) if len(probes) else 1.0
+    score_drift = float(np.max(np.abs(ref_scores.max(axis=1) - cand_scores.max(axis=1)))) if len(probes) else 0.0
+
+    worst = np.argsort(cosines)[:5]
+    return {
+        "reference": getattr(reference, "model_id", type(reference).__name__),
+        "candidate": getattr(candidate, "model_id", type(candidate).__name__),
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "topic_agreement": round(agreement, 4),
+        "max_score_drift": round(score_drift, 5),
+        "worst": [{"text": texts[idx], "cosine": round(float(cosines[idx]), 5)} for idx in worst],
+        "reference_ms": round(ref_ms, 2),
+        "candidate_ms": round(cand_ms, 2),
+        "speedup": round(ref_ms / cand_ms, 2) if cand_ms > 0 else None,
+        "passed": bool(cosines.min() >= min_cosine and agreement >= min_topic_agreement),
+    }
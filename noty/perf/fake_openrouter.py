@@ -0,0 +1,141 @@
+"""Локальный фейковый OpenRouter (OpenAI-совместимый /chat/completions) с настраиваемой задержкой."""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple
+
+from noty.perf.harness import fake_completion_text
+
+
+def parse_latency_spec(spec: str) -> Callable[[random.Random], float]:
+    """Распределение задержки в секундах из строки (значения в миллисекундах).
+
+    ``fixed:50`` | ``uniform:20:80`` | ``lognormal:<median_ms>:<sigma>`` | ``exp:<mean_ms>``.
+    """
+    kind, *raw_args = str(spec or "fixed:0").split(":")
+    args = [float(x) for x in raw_args]
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0] / 1000
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(max(args[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, args[1]) / 1000
+    if kind == "exp" and len(args) == 1:
+        return lambda rng: rng.expovariate(1.0 / max(args[0], 1e-3)) / 1000
+    raise ValueError(f"Некорректная спецификация задержки: {spec}")
+
+
+class FakeOpenRouterServer:
+    """ThreadingHTTPServer, отвечающий в формате chat.completion; часть запросов может получать 429."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        retry_after_seconds: float = 1.0,
+        seed: int = 0,
+    ):
+        self.sample_latency = parse_latency_spec(latency)
+        self.error_rate = error_rate
+        self.retry_after_seconds = retry_after_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802 - имя задано BaseHTTPRequestHandler
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload, headers = server.handle_completion(self.path, body)
+                raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def handle_completion(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        if not path.rstrip("/").endswith("/chat/completions"):
+            return 404, {"error": {"message": "not found"}}, {}
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.sample_latency(self._rng)
+            failed = self._rng.random() < self.error_rate
+        try:
+            time.sleep(delay)
+            if failed:
+                with self._lock:
+                    self.errors += 1
+                return 429, {"error": {"message": "rate limited", "code": 429}}, {"Retry-After": str(self.retry_after_seconds)}
+            messages = body.get("messages") or [{}]
+            prompt = str(messages[-1].get("content", ""))
+            content = fake_completion_text(prompt)
+            prompt_tokens = max(1, len(prompt) // 4)
+            completion_tokens = max(1, len(content) // 4)
+            return (
+                200,
+                {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                },
+                {},
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "max_in_flight": self.max_in_flight}
+
+    def start(self) -> "FakeOpenRouterServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="noty-fake-openrouter")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,305 @@
+"""Полностью заглушённый NotyBot для профилирования, бенчмарков и нагрузочных прогонов.
+
+Настоящие MessageHandler/ContextBuilder/PromptBuilder/ResponseProcessor, но детерминированный
+encoder без модели, LLM без сети и SQLite во временном каталоге. Подсистемы включаются и
+выключаются по отдельности, чтобы атрибутировать стоимость.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+import numpy as np
+
+from .subsystems import DEFAULT_SUBSYSTEMS, SUBSYSTEMS
+
+SYNTHETIC_PHRASES = (
+    "привет всем",
+    "ноти, как думаешь, почему небо голубое?",
+    "кто-нибудь смотрел новый сериал?",
+    "я опять сломал прод, код не компилируется",
+    "лол",
+    "зачем вообще нужна философия, объясни",
+    "скиньте мемы про котов",
+    "ок",
+    "как работает сборщик мусора в питоне?",
+    "сегодня такой длинный день, устал как собака, а ещё работать и работать",
+)
+
+
+class FakeEncoder:
+    """Детерминированный encoder: вектор из seed=crc32(text), без загрузки модели."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts: str | Iterable[str], convert_to_numpy: bool = True, **_: Any) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._vector(texts)
+        items = list(texts)
+        if not items:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._vector(text) for text in items])
+
+
+def fake_completion_text(prompt: str) -> str:
+    """Канонический ответ фейкового LLM: мысли для монолога или короткий ответ пользователю."""
+    if "Подумай вслух" in prompt:
+        return (
+            "1. Сообщение выглядит любопытным и заслуживает ответа\n"
+            "2. Можно добавить игривый тон, но без перегибов\n"
+            "3. Стоит ответить коротко и по делу, без лишней воды"
+        )
+    return "Интересно. Я бы сказала, что тут всё сложнее, чем кажется. Давай разберём по шагам."
+
+
+class FakeLLMRotator:
+    """Подменяет APIRotator: детерминированный ответ с опциональной задержкой."""
+
+    def __init__(self, latency_seconds: float | Callable[[], float] = 0.0, sleep: Callable[[float], None] = time.sleep):
+        self.latency_seconds = latency_seconds
+        self.sleep = sleep
+        self.calls = 0
+
+    def call(self, messages: List[Dict[str, Any]], model: str = "default", **_: Any) -> Dict[str, Any]:
+        self.calls += 1
+        delay = self.latency_seconds() if callable(self.latency_seconds) else self.latency_seconds
+        if delay > 0:
+            self.sleep(delay)
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        content = fake_completion_text(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "content": content,
+            "tool_calls": [],
+            "finish_reason": "stop",
+            "model": model,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "cost_usd": round((prompt_tokens + completion_tokens) * 1e-7, 9),
+            },
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls}
+
+
+class _PassThroughEmbeddingFilter:
+    """Вместо семантического фильтра: всё интересно, encoder остаётся детерминированным."""
+
+    def __init__(self, encoder: FakeEncoder):
+        self.encoder = encoder
+
+    def is_interesting(self, message: str, threshold: float | None = None, return_score: bool = False, scope: str | None = None):
+        return (True, 1.0, "общение") if return_score else True
+
+    def batch_filter(self, messages: List[str], threshold: float | None = None, scope: str | None = None):
+        return [(i, msg, 1.0, "общение") for i, msg in enumerate(messages)]
+
+
+class _EmptyHistoryDB:
+    """История чата для context builder без SQLite: контекст строится из пустых источников."""
+
+    def get_recent_messages(self, platform: str, chat_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        return []
+
+    def get_messages_range(self, platform: str, chat_id: int, days_ago: int = 7, exclude_recent: int = 5) -> List[Dict[str, Any]]:
+        return []
+
+    def get_important_messages(self, platform: str, chat_id: int, days_ago: int = 7) -> List[Dict[str, Any]]:
+        return []
+
+
+class _StaticMonologue:
+    def generate_thoughts(self, context: Mapping[str, Any], cheap_model: bool = True) -> Dict[str, Any]:
+        return {"strategy": "balanced", "quality_score": 0.8, "decision": "respond"}
+
+
+class _NullInteractionLogger:
+    def log_incoming(self, event: Any) -> None:
+        return None
+
+    def log_outgoing(self, event: Any, payload: Dict[str, Any]) -> None:
+        return None
+
+
+class _NullThoughtLogger:
+    def log_thought(self, thought_entry: Dict[str, Any]) -> None:
+        return None
+
+
+def resolve_subsystems(disabled: Iterable[str] = (), enabled: Iterable[str] = ()) -> Dict[str, bool]:
+    flags = dict(DEFAULT_SUBSYSTEMS)
+    for name in enabled:
+        if name not in flags:
+            raise ValueError(f"Неизвестная подсистема: {name}")
+        flags[name] = True
+    for name in disabled:
+        if name not in flags:
+            raise ValueError(f"Неизвестная подсистема: {name}")
+        flags[name] = False
+    return flags
+
+
+def build_stub_bot(
+    workdir: str | Path,
+    subsystems: Mapping[str, bool] | None = None,
+    api_rotator: Any | None = None,
+    metrics: Any | None = None,
+    seed: int = 0,
+):
+    """Собирает NotyBot из настоящих компонентов пайплайна с детерминированными заглушками."""
+    from noty.core.bot import NotyBot
+    from noty.core.context_manager import DynamicContextBuilder
+    from noty.core.events import InteractionJSONLLogger
+    from noty.core.message_handler import MessageHandler
+    from noty.core.model_router import ModelRouter
+    from noty.filters.embedding_filter import EmbeddingFilter
+    from noty.filters.heuristic_filter import HeuristicFilter
+    from noty.memory.recent_days_memory import RecentDaysMemory
+    from noty.memory.sqlite_db import SQLiteDBManager
+    from noty.mood.mood_manager import MoodManager
+    from noty.prompts.prompt_builder import ModularPromptBuilder
+    from noty.thought.monologue import InternalMonologue, ThoughtLogger
+    from noty.tools.tool_executor import SafeToolExecutor
+    from noty.utils.metrics import MetricsCollector
+    from noty.utils.tracing import JSONLSpanExporter, Tracer
+
+    flags = {**DEFAULT_SUBSYSTEMS, **(subsystems or {})}
+    root = Path(workdir)
+    root.mkdir(parents=True, exist_ok=True)
+    random.seed(seed)
+
+    metrics = metrics or MetricsCollector()
+    encoder = FakeEncoder()
+    if flags["embedding"]:
+        embedding_filter: Any = EmbeddingFilter(encoder=encoder, cache_path=str(root / "embeddings_cache"))
+    else:
+        embedding_filter = _PassThroughEmbeddingFilter(encoder)
+    db_manager = SQLiteDBManager(db_path=str(root / "noty.db")) if flags["memory"] else None
+    if flags["context"] and db_manager is not None:
+        history_db: Any = db_manager
+        recent_days_memory = RecentDaysMemory(db_manager=db_manager, logs_dir=str(root / "logs" / "rolling_memory"))
+    else:
+        history_db = _EmptyHistoryDB()
+        recent_days_memory = None
+    context_builder = DynamicContextBuilder(
+        db_manager=history_db,
+        embedding_filter=embedding_filter,
+        recent_days_memory=recent_days_memory,
+        metrics=metrics,
+    )
+    message_handler = MessageHandler(
+        context_builder=context_builder,
+        prompt_builder=ModularPromptBuilder(prompts_dir=str(root / "prompts"), config_path=str(root / "persona_prompt_config.json")),
+        heuristic_filter=HeuristicFilter(),
+        embedding_filter=embedding_filter,
+        metrics=metrics,
+    )
+    rotator = api_rotator or FakeLLMRotator()
+    if flags["monologue"]:
+        thought_logger: Any = ThoughtLogger(logs_dir=str(root / "logs" / "thoughts")) if flags["logging"] else _NullThoughtLogger()
+        monologue: Any = InternalMonologue(api_rotator=rotator, thought_logger=thought_logger)
+    else:
+        monologue = _StaticMonologue()
+    interaction_logger: Any = (
+        InteractionJSONLLogger(logs_dir=str(root / "logs" / "interactions")) if flags["logging"] else _NullInteractionLogger()
+    )
+    tracer = Tracer(exporter=JSONLSpanExporter(str(root / "logs" / "spans.jsonl"))) if flags["tracing"] else None
+
+    bot = NotyBot(
+        api_rotator=rotator,
+        message_handler=message_handler,
+        mood_manager=MoodManager(),
+        tool_executor=SafeToolExecutor(owner_id=0, actions_log_dir=str(root / "logs" / "actions")),
+        monologue=monologue,
+        db_manager=db_manager,
+        metrics=metrics,
+        interaction_logger=interaction_logger,
+        model_router=ModelRouter() if flags["routing"] else None,
+        tracer=tracer,
+    )
+    if not flags["persona"]:
+        bot.persona_manager = None
+    if not flags["aliases"]:
+        bot.alias_manager = None
+    return bot
+
+
+def synthetic_events(
+    count: int,
+    chats: int = 5,
+    users: int = 20,
+    force_respond_ratio: float = 0.3,
+    platforms: tuple[str, ...] = ("vk", "telegram"),
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Детерминированный микс чатов: фразы, платформы и доля принудительных ответов."""
+    rng = random.Random(seed)
+    events: List[Dict[str, Any]] = []
+    for idx in range(count):
+        chat_id = 1000 + rng.randrange(chats)
+        user_id = 1 + rng.randrange(users)
+        events.append(
+            {
+                "platform": platforms[chat_id % len(platforms)],
+                "chat_id": chat_id,
+                "user_id": user_id,
+                "text": rng.choice(SYNTHETIC_PHRASES),
+                "username": f"user_{user_id}",
+                "chat_name": f"chat_{chat_id}",
+                "is_private": False,
+                "raw_event_id": f"synthetic:{idx}",
+                "force_respond": rng.random() < force_respond_ratio,
+            }
+        )
+    return events
+
+
+def load_interaction_events(path: str | Path, limit: int | None = None) -> List[Dict[str, Any]]:
+    """Входящие события из JSONL InteractionJSONLLogger (файл или каталог с дневными файлами)."""
+    source = Path(path)
+    files = sorted(source.glob("*.jsonl")) if source.is_dir() else [source]
+    events: List[Dict[str, Any]] = []
+    for file in files:
+        with file.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("direction") != "incoming":
+                    continue
+                event = entry.get("event") or {}
+                if "chat_id" not in event or "user_id" not in event:
+                    continue
+                events.append(
+                    {
+                        "platform": event.get("platform", "unknown"),
+                        "chat_id": event["chat_id"],
+                        "user_id": event["user_id"],
+                        "text": event.get("text", ""),
+                        "username": event.get("username") or f"user_{event['user_id']}",
+                        "chat_name": event.get("chat_name") or f"chat_{event['chat_id']}",
+                        "is_private": bool(event.get("is_private", False)),
+                        "raw_event_id": str(event.get("raw_event_id") or f"replay:{len(events)}"),
+                    }
+                )
+                if limit is not None and len(events) >= limit:
+                    return events
+    return events
@@ -0,0 +1,216 @@
+"""Офлайн генератор нагрузки: воспроизведение событий через TransportRouter и NotyBot.
+
+События (записанный JSONL или синтетический микс) проходят через настоящий транспортный
+контракт и бота, LLM-вызовы уходят в локальный фейковый OpenRouter по HTTP. Продюсер
+работает в открытом цикле с заданной частотой, N воркеров разбирают общую очередь —
+поэтому видно, где копится очередь и как растут хвосты задержек при увеличении нагрузки.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+import yaml
+
+from noty.utils.metrics import StreamingHistogram
+
+QUANTILES = (0.5, 0.95, 0.99)
+_STOP = object()
+
+
+def load_mix_spec(path: str | Path) -> Dict[str, Any]:
+    """Параметры ``synthetic_events`` из YAML/JSON: chats, users, force_respond_ratio, platforms."""
+    raw = Path(path).read_text(encoding="utf-8")
+    spec = (json.loads(raw) if str(path).endswith(".json") else yaml.safe_load(raw)) or {}
+    if "platforms" in spec:
+        spec["platforms"] = tuple(spec["platforms"])
+    return spec
+
+
+def route_events(events: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Пропускает события через TransportRouter (по адаптеру на платформу) и нормализует их."""
+    from noty.transport.router import PlatformAdapter, TransportRouter, _StaticEventSource
+
+    by_platform: Dict[str, List[tuple[int, Dict[str, Any]]]] = {}
+    for idx, event in enumerate(events):
+        by_platform.setdefault(str(event.get("platform", "unknown")), []).append((idx, dict(event)))
+    router = TransportRouter(
+        [
+            PlatformAdapter(platform=platform, source=_StaticEventSource([raw for _, raw in items]), mapper=dict)
+            for platform, items in by_platform.items()
+        ]
+    )
+    indexed = [item for items in by_platform.values() for item in items]
+    routed: List[tuple[int, Dict[str, Any]]] = []
+    for (idx, raw), event in zip(indexed, router.iter_events()):
+        payload = event.to_dict()
+        payload["force_respond"] = bool(raw.get("force_respond", False))
+        routed.append((idx, payload))
+    # Router обходит адаптеры по очереди; исходный порядок поступления восстанавливаем.
+    return [payload for _, payload in sorted(routed, key=lambda item: item[0])]
+
+
+def _summary(histogram: StreamingHistogram) -> Dict[str, float]:
+    p50, p95, p99 = histogram.quantiles(QUANTILES)
+    return {
+        "count": histogram.count,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "max_ms": round(histogram.max * 1000, 3) if histogram.count else 0.0,
+    }
+
+
+def _stage_percentiles(metrics: Any) -> Dict[str, Dict[str, Dict[str, float]]]:
+    series = metrics.export_series()["stage_platform_timings"]
+    return {stage: {platform: _summary(histogram) for platform, histogram in items.items()} for stage, items in sorted(series.items())}
+
+
+class LoadGenerator:
+    """Открытый цикл: продюсер с частотой ``rate`` (0 = без пауз) и пул из ``concurrency`` воркеров."""
+
+    def __init__(
+        self,
+        bot: Any,
+        rate: float = 0.0,
+        concurrency: int = 4,
+        queue_size: int = 0,
+        depth_sample_seconds: float = 0.01,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.bot = bot
+        self.rate = rate
+        self.concurrency = max(1, concurrency)
+        self.depth_sample_seconds = depth_sample_seconds
+        self.clock = clock
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.queue_wait = StreamingHistogram()
+        self.service = StreamingHistogram()
+        self.end_to_end = StreamingHistogram()
+        self.statuses: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.depth_samples: List[int] = []
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                scheduled_at, enqueued_at, event = item
+                started = self.clock()
+                try:
+                    status = str(self.bot.handle_message(dict(event)).get("status", "unknown"))
+                    error = None
+                except Exception as exc:  # noqa: BLE001 - нагрузочный прогон фиксирует ошибку и идёт дальше
+                    status, error = "exception", type(exc).__name__
+                finished = self.clock()
+                with self._lock:
+                    self.queue_wait.record(started - enqueued_at)
+                    self.service.record(finished - started)
+                    self.end_to_end.record(finished - scheduled_at)
+                    self.statuses[status] += 1
+                    if error:
+                        self.errors[error] += 1
+            finally:
+                self._queue.task_done()
+
+    def _sample_depth(self, stop: threading.Event) -> None:
+        while not stop.wait(self.depth_sample_seconds):
+            depth = self._queue.qsize()
+            with self._lock:
+                self.depth_samples.append(depth)
+
+    def run(self, events: List[Mapping[str, Any]]) -> Dict[str, Any]:
+        workers = [threading.Thread(target=self._worker, daemon=True, name=f"noty-loadgen-{idx}") for idx in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        stop_sampler = threading.Event()
+        sampler = threading.Thread(target=self._sample_depth, args=(stop_sampler,), daemon=True, name="noty-loadgen-depth")
+        sampler.start()
+
+        started = self.clock()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        for idx, event in enumerate(events):
+            scheduled_at = started + idx * interval
+            delay = scheduled_at - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+            # Открытый цикл: время отсчитывается от расписания, а не от фактической отправки,
+            # иначе отставание продюсера спрячет очередь (coordinated omission).
+            self._queue.put((scheduled_at if interval else self.clock(), self.clock(), event))
+        offered_seconds = self.clock() - started
+        self._queue.join()
+        elapsed = self.clock() - started
+        for _ in workers:
+            self._queue.put(_STOP)
+        for worker in workers:
+            worker.join(timeout=5)
+        stop_sampler.set()
+        sampler.join(timeout=5)
+
+        depths = self.depth_samples or [0]
+        completed = sum(self.statuses.values())
+        return {
+            "events": len(events),
+            "completed": completed,
+            "concurrency": self.concurrency,
+            "target_rate": self.rate,
+            "offered_rate": round(len(events) / offered_seconds, 2) if offered_seconds > 0 else None,
+            "throughput_per_second": round(completed / elapsed, 2) if elapsed > 0 else None,
+            "wall_seconds": round(elapsed, 4),
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "latency": {
+                "queue_wait": _summary(self.queue_wait),
+                "service": _summary(self.service),
+                "end_to_end": _summary(self.end_to_end),
+            },
+            "queue_depth": {
+                "max": max(depths),
+                "mean": round(sum(depths) / len(depths), 2),
+                "samples": len(self.depth_samples),
+            },
+        }
+
+
+def run_load(
+    events: List[Mapping[str, Any]],
+    workdir: str | Path,
+    rate: float = 0.0,
+    concurrency: int = 4,
+    llm_latency: str = "fixed:50",
+    llm_error_rate: float = 0.0,
+    keys: int = 4,
+    subsystems: Mapping[str, bool] | None = None,
+    llm_timeout_seconds: float = 30.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Поднимает фейковый OpenRouter, собирает бота с настоящим APIRotator и гонит события."""
+    from noty.core.api_rotator import APIRotator, ProviderTier
+    from noty.perf.fake_openrouter import FakeOpenRouterServer
+    from noty.perf.harness import build_stub_bot
+
+    server = FakeOpenRouterServer(latency=llm_latency, error_rate=llm_error_rate, seed=seed).start()
+    try:
+        api_keys = [f"fake-key-{idx}" for idx in range(max(1, keys))]
+        rotator = APIRotator(
+            api_keys=api_keys,
+            max_parallel_calls=max(concurrency, 1),
+            tiers=[ProviderTier(name="fake_openrouter", base_url=server.base_url, api_keys=api_keys, timeout_seconds=llm_timeout_seconds)],
+        )
+        bot = build_stub_bot(workdir, subsystems=subsystems, api_rotator=rotator, seed=seed)
+        routed = route_events(events)
+        report = LoadGenerator(bot, rate=rate, concurrency=concurrency).run(routed)
+        report["llm"] = {"latency": llm_latency, "error_rate": llm_error_rate, **server.stats(), "tiers": rotator.tier_stats}
+        report["stages"] = _stage_percentiles(bot.metrics)
+        return report
+    finally:
+        server.stop()
@@ -0,0 +1,162 @@
+"""Профилирование пайплайна: cProfile + сэмплирующий профайлер стеков и collapsed flamegraph."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    filename = Path(code.co_filename)
+    try:
+        location = filename.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        location = filename.name
+    return f"{location}:{code.co_name}"
+
+
+class StackSampler:
+    """Периодически снимает стек целевого потока через ``sys._current_frames()``.
+
+    Стек копится в формате collapsed (``a;b;c count``), который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval_seconds: float = 0.001, thread_id: int | None = None, max_depth: int = 128):
+        self.interval_seconds = interval_seconds
+        self.thread_id = thread_id
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample_once(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)  # noqa: SLF001 - штатный способ снять чужой стек
+        if frame is None:
+            return
+        labels: List[str] = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self._sample_once()
+
+    def start(self) -> "StackSampler":
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="noty-stack-sampler")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def hot_path_rows(profile: cProfile.Profile, top: int = 30) -> List[Dict[str, Any]]:
+    """Топ функций по собственному времени (tottime) с кумулятивным временем и числом вызовов."""
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, lineno, func), (primitive_calls, calls, tottime, cumtime, _callers) in stats.stats.items():  # type: ignore[attr-defined]
+        try:
+            location = Path(filename).resolve().relative_to(PROJECT_ROOT).as_posix()
+        except ValueError:
+            location = filename
+        rows.append(
+            {
+                "function": f"{location}:{lineno}:{func}",
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "tottime_seconds": round(tottime, 6),
+                "cumtime_seconds": round(cumtime, 6),
+            }
+        )
+    rows.sort(key=lambda row: row["tottime_seconds"], reverse=True)
+    return rows[:top]
+
+
+def _replay(bot: Any, events: Iterable[Mapping[str, Any]]) -> Counter[str]:
+    statuses: Counter[str] = Counter()
+    for event in events:
+        result = bot.handle_message(dict(event))
+        statuses[str(result.get("status", "unknown"))] += 1
+    return statuses
+
+
+def run_profile(
+    events: List[Mapping[str, Any]],
+    bot_factory: Callable[[], Any],
+    output_dir: str | Path,
+    sample_interval_seconds: float = 0.001,
+    top: int = 30,
+) -> Dict[str, Any]:
+    """Два прогона на свежих ботах: сэмплирующий (wall-clock стеки) и cProfile (точные счётчики вызовов)."""
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    sampled_bot = bot_factory()
+    sampler = StackSampler(interval_seconds=sample_interval_seconds).start()
+    started = time.perf_counter()
+    try:
+        statuses = _replay(sampled_bot, events)
+    finally:
+        sampler.stop()
+    sampled_elapsed = time.perf_counter() - started
+    (out / "flamegraph.collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+
+    profiled_bot = bot_factory()
+    profile = cProfile.Profile()
+    started = time.perf_counter()
+    profile.enable()
+    try:
+        _replay(profiled_bot, events)
+    finally:
+        profile.disable()
+    profiled_elapsed = time.perf_counter() - started
+    profile.dump_stats(str(out / "profile.pstats"))
+
+    report = io.StringIO()
+    pstats.Stats(profile, stream=report).strip_dirs().sort_stats("cumulative").print_stats(top)
+    (out / "hotpath.txt").write_text(report.getvalue(), encoding="utf-8")
+
+    rows = hot_path_rows(profile, top=top)
+    count = len(events) or 1
+    summary = {
+        "events": len(events),
+        "statuses": dict(statuses),
+        "wall_seconds": round(sampled_elapsed, 4),
+        "per_event_ms": round(sampled_elapsed * 1000 / count, 3),
+        "cprofile_wall_seconds": round(profiled_elapsed, 4),
+        "samples": sampler.samples,
+        "stage_series": sampled_bot.metrics.snapshot()["series"]["stage_platform"],
+        "hot_path": rows,
+        "files": {
+            "flamegraph": str(out / "flamegraph.collapsed"),
+            "pstats": str(out / "profile.pstats"),
+            "report": str(out / "hotpath.txt"),
+            "summary": str(out / "hotpath.json"),
+        },
+    }
+    (out / "hotpath.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return summary
@@ -0,0 +1,112 @@
+"""Профиль холодного старта: разбор ``python -X importtime`` по модулям.
+
+Импорт запускается в отдельном интерпретаторе — в текущем процессе модули уже в
+``sys.modules`` и время импорта не измерить. Тяжёлые зависимости (torch, mem0, openai …)
+должны грузиться лениво, поэтому отчёт отдельно показывает, какие из них попали в старт.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Корневые пакеты, которые не должны загружаться при импорте main/noty.cli.
+HEAVY_MODULES = (
+    "sentence_transformers",
+    "torch",
+    "transformers",
+    "mem0",
+    "litellm",
+    "instructor",
+    "llama_index",
+    "fastapi",
+    "openai",
+)
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Строки ``import time: self | cumulative | name``; глубина — по отступу имени."""
+    rows: List[ImportTiming] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок "self [us] | cumulative | imported package"
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        rows.append(
+            ImportTiming(
+                module=name,
+                self_us=int(parts[0]),
+                cumulative_us=int(parts[1]),
+                depth=(len(raw_name) - len(name) - 1) // 2,
+            )
+        )
+    return rows
+
+
+def profile_startup(target: str = "main", python: str = sys.executable, cwd: Path | str = PROJECT_ROOT) -> Dict[str, Any]:
+    """Импортирует ``target`` в чистом интерпретаторе с ``-X importtime``.
+
+    ``module:function`` — после импорта ещё и вызывает функцию без аргументов (например,
+    ``noty.cli:build_parser``), чтобы учесть импорты, которые она делает сама.
+    """
+    module, _, function = target.partition(":")
+    call = f"; {module}.{function}()" if function else ""
+    probe = f"import sys, {module}{call}; print(','.join(sorted(name for name in sys.modules if '.' not in name)))"
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", probe],
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        tail = "\n".join(line for line in completed.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"Импорт {target} упал:\n{tail[-2000:]}")
+    loaded = set(completed.stdout.strip().split(","))
+    rows = parse_importtime(completed.stderr)
+    top_level = [row for row in rows if row.depth == 0]
+    return {
+        "target": target,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(row.cumulative_us for row in top_level) / 1000, 1),
+        "modules": len(rows),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "rows": rows,
+    }
+
+
+def render_startup_report(report: Dict[str, Any], top: int = 25) -> str:
+    rows: Sequence[ImportTiming] = report["rows"]
+    lines = [
+        f"Startup profile: import {report['target']}",
+        f"  wall={report['wall_ms']}ms (с запуском интерпретатора) imports={report['import_ms']}ms modules={report['modules']}",
+        f"  heavy deps loaded: {', '.join(report['heavy_loaded']) or 'нет'}",
+        "",
+        f"{'cumulative ms':>14} {'self ms':>9}  module",
+    ]
+    for row in sorted(rows, key=lambda item: item.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{row.cumulative_us / 1000:>14.1f} {row.self_us / 1000:>9.1f}  {'  ' * row.depth}{row.module}")
+    lines.append("")
+    lines.append("Самые дорогие модули по собственному времени:")
+    for row in sorted(rows, key=lambda item: item.self_us, reverse=True)[: min(top, 10)]:
+        lines.append(f"{row.self_us / 1000:>14.1f}  {row.module}")
+    return "\n".join(lines)
@@ -0,0 +1,8 @@
+"""Имена подсистем заглушённого бота: без тяжёлых импортов, чтобы ``noty.cli`` строил парсер быстро."""
+
+from __future__ import annotations
+
+from typing import Dict
+
+SUBSYSTEMS = ("embedding", "context", "monologue", "memory", "persona", "aliases", "routing", "logging", "tracing")
+DEFAULT_SUBSYSTEMS: Dict[str, bool] = {name: name != "tracing" for name in SUBSYSTEMS}
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, List
 
-from noty.core.api_rotator import APIRotator
+from noty.core.api_rotator import APIRotator, LLMCallPolicy
 
 
 class ThoughtLogger:
@@ -93,9 +93,19 @@ class InternalMonologue:
         ),
     }
 
-    def __init__(self, api_rotator: APIRotator, thought_logger: ThoughtLogger):
+    def __init__(
+        self,
+        api_rotator: APIRotator,
+        thought_logger: ThoughtLogger,
+        cheap_model_name: str = "meta-llama/llama-3.1-8b-instruct",
+        full_model_name: str = "meta-llama/llama-3.1-70b-instruct",
+        call_policy: LLMCallPolicy | None = None,
+    ):
         self.api = api_rotator
         self.logger = thought_logger
+        self.cheap_model_name = cheap_model_name
+        self.full_model_name = full_model_name
+        self.call_policy = call_policy
 
     @staticmethod
     def _extract_strategy_name(thoughts: List[str], mood: str) -> str:
@@ -141,8 +151,15 @@ class InternalMonologue:
             f"- Энергия: {context.get('energy', 100)}/100\n\n"
             "Подумай вслух (3-7 коротких мыслей) и выбери стратегию ответа."
         )
-        model = "meta-llama/llama-3.1-8b-instruct" if cheap_model else "meta-llama/llama-3.1-70b-instruct"
-        response = self.api.call(messages=[{"role": "user", "content": prompt}], model=model, temperature=0.8, max_tokens=300)
+        model = self.cheap_model_name if cheap_model else self.full_model_name
+        call_kwargs: Dict[str, Any] = {"policy": self.call_policy} if self.call_policy else {}
+        response = self.api.call(
+            messages=[{"role": "user", "content": prompt}],
+            model=model,
+            temperature=0.8,
+            max_tokens=300,
+            **call_kwargs,
+        )
         thoughts = [line.strip().lstrip("0123456789.-) ") for line in response["content"].split("\n") if line.strip()]
         strategy_name = self._extract_strategy_name(thoughts, mood=context.get("mood", "neutral"))
         quality = self._evaluate_quality(thoughts)
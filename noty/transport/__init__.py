@@ -1,6 +1,7 @@
 """Transport слой Noty."""
 
 from noty.transport.router import TransportRouter, create_transport_router
+from noty.transport.runtime import TransportRuntime, bot_event_handler
 from noty.transport.types import IncomingEvent, normalize_incoming_event
 
-__all__ = ["IncomingEvent", "normalize_incoming_event", "TransportRouter", "create_transport_router"]
+__all__ = ["IncomingEvent", "normalize_incoming_event", "TransportRouter", "TransportRuntime", "bot_event_handler", "create_transport_router"]
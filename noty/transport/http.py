@@ -0,0 +1,141 @@
+"""Общий HTTP-слой транспортов: пул keep-alive соединений, сжатие, классификация ошибок.
+
+``urlopen`` открывал новое TCP+TLS соединение на каждый вызов API и каждый цикл long poll.
+``PooledHTTPClient`` держит соединения открытыми (httpx, при наличии ``h2`` — HTTP/2),
+ограничивает их число и принимает ответы в gzip/deflate. VK и Telegram по умолчанию делят один
+процессный пул (``shared_http_client``). ``AsyncPooledHTTPClient`` — тот же контракт для asyncio.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import threading
+from typing import Any, Dict, Mapping
+
+import httpx
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 60.0
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "User-Agent": "noty-transport/1.0"}
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class TransportHTTPError(RuntimeError):
+    """HTTP- или API-ошибка транспорта; ``retryable`` решает, имеет ли смысл повтор."""
+
+    def __init__(self, message: str, status_code: int | None = None, retryable: bool = False, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    raw = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(raw)) if raw is not None else None
+    except ValueError:
+        return None
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.status_code < 400:
+        return
+    raise TransportHTTPError(
+        f"HTTP {response.status_code}: {response.text[:200]}",
+        status_code=response.status_code,
+        retryable=response.status_code in RETRYABLE_STATUS_CODES,
+        retry_after=_retry_after(response),
+    )
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Повторяем сетевые сбои, таймауты, 429/5xx и ошибки, явно помеченные ``retryable``."""
+    retryable = getattr(exc, "retryable", None)
+    if retryable is not None:
+        return bool(retryable)
+    return isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+def _timeout(value: float | None) -> Any:
+    return value if value is not None else httpx.USE_CLIENT_DEFAULT
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_options(max_connections: int, max_keepalive: int, timeout_seconds: float) -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(timeout_seconds),
+        "headers": DEFAULT_HEADERS,
+        "http2": _http2_available(),
+    }
+
+
+class PooledHTTPClient:
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+        timeout_seconds: float = 30.0,
+        transport: httpx.BaseTransport | None = None,
+    ):
+        self._client = httpx.Client(**_client_options(max_connections, max_keepalive, timeout_seconds), transport=transport)
+
+    def get_json(self, url: str, params: Mapping[str, Any] | None = None, timeout_seconds: float | None = None) -> Any:
+        response = self._client.get(url, params=params, timeout=_timeout(timeout_seconds))
+        _raise_for_status(response)
+        return response.json()
+
+    def post_form(self, url: str, data: Mapping[str, Any], timeout_seconds: float | None = None) -> Any:
+        response = self._client.post(url, data=dict(data), timeout=_timeout(timeout_seconds))
+        _raise_for_status(response)
+        return response.json()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class AsyncPooledHTTPClient:
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+        timeout_seconds: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._client = httpx.AsyncClient(**_client_options(max_connections, max_keepalive, timeout_seconds), transport=transport)
+
+    async def get_json(self, url: str, params: Mapping[str, Any] | None = None, timeout_seconds: float | None = None) -> Any:
+        response = await self._client.get(url, params=params, timeout=_timeout(timeout_seconds))
+        _raise_for_status(response)
+        return response.json()
+
+    async def post_form(self, url: str, data: Mapping[str, Any], timeout_seconds: float | None = None) -> Any:
+        response = await self._client.post(url, data=dict(data), timeout=_timeout(timeout_seconds))
+        _raise_for_status(response)
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_shared_client: PooledHTTPClient | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_http_client() -> PooledHTTPClient:
+    """Процессный пул соединений, общий для VK и Telegram клиентов."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = PooledHTTPClient()
+    return _shared_client
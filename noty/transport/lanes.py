@@ -0,0 +1,215 @@
+"""Шардирование обработки по чатам: ключ ``platform:chat_id`` хешируется на одну из N дорожек.
+
+У каждой дорожки свой поток и своя ограниченная очередь: внутри чата порядок сохраняется,
+медленный LLM-вызов одного чата задерживает только чаты своей дорожки. При переполнении
+дорожки работает политика ``overflow``:
+
+- ``block`` — продюсер ждёт освобождения места;
+- ``drop_oldest`` — выбрасывается самое старое событие дорожки;
+- ``coalesce`` — новое событие склеивается с последним ожидающим событием того же чата
+  (если такого нет — как ``drop_oldest``).
+
+Отдельно ``max_age_seconds`` отбрасывает события, которые простояли в очереди слишком долго.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass, field, replace
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "coalesce")
+
+
+def lane_index(key: str, lanes: int) -> int:
+    """Стабильный между процессами хеш (встроенный ``hash`` для str рандомизирован)."""
+    return zlib.crc32(key.encode("utf-8")) % lanes
+
+
+def coalesce_core_events(older: Any, newer: Any) -> Any:
+    """Склейка двух core.events.IncomingEvent одного чата: тексты через перевод строки, update_id обоих помнится."""
+    merged_ids = list(older.metadata.get("coalesced_update_ids", []))
+    if older.update_id is not None:
+        merged_ids.append(older.update_id)
+    return replace(
+        newer,
+        text=f"{older.text}\n{newer.text}",
+        metadata={**newer.metadata, "coalesced_update_ids": merged_ids},
+    )
+
+
+@dataclass(slots=True)
+class _LaneItem:
+    key: str
+    payload: Any
+    enqueued_at: float
+
+
+@dataclass
+class _Lane:
+    index: int
+    max_queue: int
+    items: Deque[_LaneItem] = field(default_factory=deque)
+    busy_seconds: float = 0.0
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    stale: int = 0
+    max_depth: int = 0
+    in_flight: bool = False
+
+
+class LaneDispatcher:
+    def __init__(
+        self,
+        handler: Callable[[Any], Any],
+        lanes: int = 4,
+        max_queue_per_lane: int = 64,
+        overflow: str = "coalesce",
+        coalesce: Callable[[Any, Any], Any] | None = None,
+        max_age_seconds: float | None = None,
+        metrics: Any | None = None,
+        clock: Callable[[], float] = monotonic,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {overflow}")
+        if overflow == "coalesce" and coalesce is None:
+            raise ValueError("Для overflow=coalesce нужна функция склейки")
+        self.handler = handler
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.max_age_seconds = max_age_seconds
+        self.metrics = metrics
+        self.clock = clock
+        self._lanes = [_Lane(index=idx, max_queue=max(1, max_queue_per_lane)) for idx in range(max(1, lanes))]
+        self._cond = threading.Condition()
+        self._stop = False
+        self._threads: List[threading.Thread] = []
+        self._started_at = clock()
+
+    def start(self) -> "LaneDispatcher":
+        self._stop = False
+        self._started_at = self.clock()
+        for lane in self._lanes:
+            thread = threading.Thread(target=self._run_lane, args=(lane,), daemon=True, name=f"noty-lane-{lane.index}")
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout_seconds: float = 5.0) -> None:
+        self.wait_idle(timeout_seconds)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout_seconds)
+        self._threads = []
+
+    def wait_idle(self, timeout_seconds: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: all(not lane.items and not lane.in_flight for lane in self._lanes), timeout=timeout_seconds)
+
+    def _inc(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(f"lane_{name}")
+
+    def submit(self, key: str, payload: Any) -> str:
+        """Ставит событие в дорожку чата; возвращает ``queued`` | ``coalesced`` | ``dropped_oldest``."""
+        lane = self._lanes[lane_index(key, len(self._lanes))]
+        outcome = "queued"
+        with self._cond:
+            if len(lane.items) >= lane.max_queue:
+                if self.overflow == "block":
+                    self._cond.wait_for(lambda: len(lane.items) < lane.max_queue or self._stop)
+                elif self.overflow == "coalesce" and self._coalesce_into(lane, key, payload):
+                    lane.coalesced += 1
+                    self._inc("coalesced")
+                    return "coalesced"
+                else:
+                    dropped = lane.items.popleft()
+                    lane.dropped += 1
+                    self._inc("dropped")
+                    logger.debug("Дорожка %s переполнена, отброшено событие чата %s", lane.index, dropped.key)
+                    outcome = "dropped_oldest"
+            lane.items.append(_LaneItem(key=key, payload=payload, enqueued_at=self.clock()))
+            lane.max_depth = max(lane.max_depth, len(lane.items))
+            self._cond.notify_all()
+        return outcome
+
+    def _coalesce_into(self, lane: _Lane, key: str, payload: Any) -> bool:
+        for item in reversed(lane.items):
+            if item.key == key:
+                item.payload = self.coalesce(item.payload, payload)  # type: ignore[misc]
+                return True
+        return False
+
+    def _next_item(self, lane: _Lane) -> _LaneItem | None:
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: lane.items or self._stop)
+                if not lane.items:
+                    return None
+                item = lane.items.popleft()
+                self._cond.notify_all()
+                if self.max_age_seconds is not None and self.clock() - item.enqueued_at > self.max_age_seconds:
+                    lane.stale += 1
+                    self._inc("stale")
+                    continue
+                lane.in_flight = True
+                return item
+
+    def _run_lane(self, lane: _Lane) -> None:
+        while True:
+            item = self._next_item(lane)
+            if item is None:
+                return
+            started = self.clock()
+            failed = False
+            try:
+                self.handler(item.payload)
+            except Exception as exc:  # noqa: BLE001 - ошибка одного события не должна останавливать дорожку
+                failed = True
+                logger.exception("Ошибка обработки в дорожке %s: %s", lane.index, exc)
+            elapsed = self.clock() - started
+            with self._cond:
+                lane.busy_seconds += elapsed
+                lane.processed += 1
+                lane.failed += int(failed)
+                lane.in_flight = False
+                self._cond.notify_all()
+            if self.metrics is not None:
+                self.metrics.observe("lane_service_seconds", elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики по дорожкам; ``utilization`` — доля времени с момента старта, когда дорожка была занята."""
+        with self._cond:
+            wall = max(self.clock() - self._started_at, 1e-9)
+            lanes = [
+                {
+                    "lane": lane.index,
+                    "depth": len(lane.items),
+                    "max_depth": lane.max_depth,
+                    "processed": lane.processed,
+                    "failed": lane.failed,
+                    "dropped": lane.dropped,
+                    "coalesced": lane.coalesced,
+                    "stale": lane.stale,
+                    "utilization": round(min(1.0, lane.busy_seconds / wall), 4),
+                }
+                for lane in self._lanes
+            ]
+        return {
+            "lanes": lanes,
+            "overflow": self.overflow,
+            "processed": sum(item["processed"] for item in lanes),
+            "dropped": sum(item["dropped"] for item in lanes),
+            "coalesced": sum(item["coalesced"] for item in lanes),
+            "stale": sum(item["stale"] for item in lanes),
+        }
@@ -0,0 +1,53 @@
+"""Token bucket для пейсинга исходящих вызовов платформенных API."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+# Погрешность float: без неё остаток 0.999999… токена давал бы паузы, которые не сдвигают часы.
+_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """``rate`` токенов в секунду, не больше ``capacity`` впрок; ``acquire`` ждёт, пока токен появится."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """0.0 — токен выдан; иначе сколько секунд подождать до следующей попытки."""
+        with self._lock:
+            self._refill()
+            if self._tokens + _EPSILON >= tokens:
+                self._tokens = max(0.0, self._tokens - tokens)
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Блокирует до получения токенов; возвращает суммарное время ожидания."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if delay <= 0:
+                return waited
+            self.sleep(delay)
+            waited += delay
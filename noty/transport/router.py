@@ -13,11 +13,13 @@ from noty.transport.telegram.mapper import map_telegram_update
 from noty.transport.telegram.polling import TelegramPolling, TelegramWebhookReceiver
 from noty.transport.types import IncomingEvent, normalize_incoming_event
 from noty.transport.vk.client import VKAPIClient
-from noty.transport.vk.mapper import map_vk_event
+from noty.transport.vk.mapper import map_vk_event, vk_update_id
 from noty.transport.vk.state_store import VKStateStore, run_with_backoff
 
 
 class EventSource(Protocol):
+    """``poll`` источника; ``long_poll = True`` — вызов сам ждёт новых событий и безопасен в цикле."""
+
     def poll(self) -> Iterable[dict[str, Any]]:
         ...
 
@@ -41,6 +43,11 @@ class TransportRouter:
     def make_routing_key(event: IncomingEvent) -> str:
         return f"{event.platform}:{event.chat_id}:{event.user_id}"
 
+    @staticmethod
+    def make_chat_key(event: IncomingEvent) -> str:
+        """Ключ упорядочивания: события одного чата обрабатываются строго по очереди."""
+        return f"{event.platform}:{event.chat_id}"
+
     def iter_events(self) -> Iterable[IncomingEvent]:
         for adapter in self.adapters:
             yield from adapter.iter_events()
@@ -58,6 +65,12 @@ class _StaticEventSource:
         return self.events
 
 class VKLongPollSource:
+    """Long poll VK с тем же dedup, что у ``VKLongPollTransport``: повтор ``ts`` после рестарта
+    не приводит к повторным ответам. Апдейт отмечается обработанным при выдаче в runtime.
+    """
+
+    long_poll = True
+
     def __init__(self, client: VKAPIClient, state_store: VKStateStore, wait: int = 25):
         self.client = client
         self.state_store = state_store
@@ -75,8 +88,18 @@ class VKLongPollSource:
             )
         )
         new_ts = str(response.get("ts", ts))
-        self.state_store.set_longpoll_ts(new_ts)
-        return response.get("updates", [])
+        fresh: list[dict[str, Any]] = []
+        # ts и отметки апдейтов — одной дозаписью журнала.
+        with self.state_store.batch():
+            self.state_store.set_longpoll_ts(new_ts)
+            for update in response.get("updates", []):
+                update_id = vk_update_id(update)
+                if update_id is not None:
+                    if self.state_store.is_processed(update_id):
+                        continue
+                    self.state_store.mark_processed(update_id)
+                fresh.append(update)
+        return fresh
 
 
 class VKWebhookEventSource:
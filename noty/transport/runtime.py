@@ -0,0 +1,289 @@
+"""Конкурентный транспортный runtime: поток-поллер на адаптер, общая ограниченная очередь и пул воркеров.
+
+Адаптеры опрашиваются параллельно, поэтому длинный VK long poll не задерживает Telegram и
+наоборот. Порядок сообщений внутри одного чата сохраняется: пока воркер обрабатывает чат,
+следующие его события откладываются и разбираются тем же воркером. Ёмкость ``max_pending``
+учитывает и очередь, и отложенные события — когда воркеры не успевают, поллеры блокируются
+и перестают забирать апдейты (backpressure).
+
+В цикле опрашиваются только long poll источники (``long_poll = True``): они сами ждут новых
+событий. Прочие (заглушка без токена, апдейт вебхука из конфига) отдают одно и то же при каждом
+вызове, поэтому читаются один раз. После пустого ответа поллер ждёт ``poll_idle_delay_seconds``.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping
+
+from noty.transport.router import PlatformAdapter, TransportRouter
+from noty.transport.types import IncomingEvent, normalize_incoming_event
+from noty.transport.vk.state_store import run_with_backoff
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[IncomingEvent], Any]
+ReplySender = Callable[[IncomingEvent, str], Any]
+
+
+def reply_dispatcher(senders: Mapping[str, ReplySender] | None = None) -> Callable[[Any, Mapping[str, Any]], None]:
+    """``on_result(event, result)``: отправка ответа бота через sender платформы события."""
+    senders = dict(senders or {})
+
+    def dispatch(event: Any, result: Mapping[str, Any]) -> None:
+        incoming = normalize_incoming_event(event)
+        sender = senders.get(incoming.platform)
+        if result.get("status") == "responded" and sender is not None:
+            sender(incoming, result["text"])
+
+    return dispatch
+
+
+def bot_event_handler(bot: Any, senders: Mapping[str, ReplySender] | None = None) -> EventHandler:
+    """Обработчик runtime: ``bot.handle_message`` и отправка ответа через sender платформы."""
+    on_result = reply_dispatcher(senders)
+
+    def handle(event: IncomingEvent) -> Any:
+        result = bot.handle_message(event)
+        on_result(event, result)
+        return result
+
+    return handle
+
+
+def vk_reply_sender(client: Any, outbound: Any | None = None) -> ReplySender:
+    """С ``outbound`` (VKOutboundDispatcher) ответ только ставится в очередь пакетной отправки."""
+
+    def send(event: IncomingEvent, text: str) -> Any:
+        random_id = random.randint(1, 2_147_483_647)
+        if outbound is not None:
+            return outbound.send(event.chat_id, text, random_id)
+        return run_with_backoff(lambda: client.send_message(event.chat_id, text, random_id))
+
+    return send
+
+
+def telegram_reply_sender(client: Any) -> ReplySender:
+    def send(event: IncomingEvent, text: str) -> Any:
+        return run_with_backoff(lambda: client.send_message(event.chat_id, text))
+
+    return send
+
+
+def reply_senders_for(router: TransportRouter, vk_outbound: Any | None = None) -> Dict[str, ReplySender]:
+    """Senders по клиентам, которые уже созданы для источников роутера (VKLongPollSource, TelegramPolling)."""
+    senders: Dict[str, ReplySender] = {}
+    for adapter in router.adapters:
+        client = getattr(adapter.source, "client", None)
+        if client is None:
+            continue
+        if adapter.platform == "vk":
+            senders["vk"] = vk_reply_sender(client, outbound=vk_outbound)
+        elif adapter.platform == "telegram":
+            senders["telegram"] = telegram_reply_sender(client)
+    return senders
+
+
+class TransportRuntime:
+    def __init__(
+        self,
+        router: TransportRouter,
+        handler: EventHandler,
+        workers: int = 4,
+        max_pending: int = 256,
+        poll_error_delay_seconds: float = 1.0,
+        poll_idle_delay_seconds: float = 0.5,
+        metrics: Any | None = None,
+    ):
+        self.router = router
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.poll_error_delay_seconds = poll_error_delay_seconds
+        self.poll_idle_delay_seconds = poll_idle_delay_seconds
+        self.metrics = metrics
+        self._queue: queue.Queue[IncomingEvent] = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._state_lock = threading.Lock()
+        self._idle = threading.Condition(self._state_lock)
+        self._active_chats: set[str] = set()
+        self._parked: Dict[str, Deque[IncomingEvent]] = {}
+        self._pending = 0
+        self._batches_in_flight = 0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stats: Dict[str, int] = {
+            "received": 0,
+            "processed": 0,
+            "failed": 0,
+            "skipped": 0,
+            "parked": 0,
+            "backpressure_waits": 0,
+            "rejected": 0,
+            "poll_errors": 0,
+            "polls": 0,
+            "max_pending_seen": 0,
+        }
+
+    def start(self) -> "TransportRuntime":
+        self._stop.clear()
+        for idx in range(self.workers):
+            self._spawn(self._worker_loop, f"noty-transport-worker-{idx}")
+        for adapter in self.router.adapters:
+            self._spawn(lambda adapter=adapter: self._poll_loop(adapter), f"noty-transport-poll-{adapter.platform}")
+        return self
+
+    def _spawn(self, target: Callable[[], None], name: str) -> None:
+        thread = threading.Thread(target=target, daemon=True, name=name)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout_seconds: float = 5.0) -> None:
+        """Останавливает поллеры и воркеры; уже принятые события дообрабатываются, пока не истечёт timeout."""
+        self.wait_idle(timeout_seconds)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout_seconds)
+        self._threads = []
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Остановка transport runtime")
+        finally:
+            self.stop()
+
+    def wait_idle(self, timeout_seconds: float | None = None) -> bool:
+        """Ждёт, пока очередь и отложенные события опустеют (для тестов и graceful shutdown)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0 and self._batches_in_flight == 0, timeout=timeout_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        with self._state_lock:
+            return {**self._stats, "pending": self._pending, "active_chats": len(self._active_chats)}
+
+    def _bump(self, key: str, value: int = 1) -> None:
+        with self._state_lock:
+            self._stats[key] += value
+        if self.metrics is not None:
+            self.metrics.inc(f"transport_{key}", value)
+
+    def _poll_loop(self, adapter: PlatformAdapter) -> None:
+        long_poll = bool(getattr(adapter.source, "long_poll", False))
+        if not long_poll:
+            logger.info("Источник %s не long poll: читается один раз", adapter.platform)
+        while not self._stop.is_set():
+            try:
+                self._bump("polls")
+                raws = list(adapter.source.poll())
+            except Exception as exc:  # noqa: BLE001 - поллер переживает сетевые ошибки и продолжает опрос
+                self._bump("poll_errors")
+                logger.warning("Ошибка опроса %s: %s", adapter.platform, exc)
+                if not long_poll:
+                    return
+                self._stop.wait(self.poll_error_delay_seconds)
+                continue
+            self._dispatch_batch(adapter, raws)
+            if not long_poll:
+                return
+            if not raws:
+                self._stop.wait(self.poll_idle_delay_seconds)
+
+    def _dispatch_batch(self, adapter: PlatformAdapter, raws: List[Any]) -> None:
+        with self._state_lock:
+            self._batches_in_flight += 1
+        try:
+            for raw in raws:
+                try:
+                    event = normalize_incoming_event(adapter.mapper(raw))
+                except ValueError as exc:
+                    self._bump("skipped")
+                    logger.debug("Пропуск апдейта %s: %s", adapter.platform, exc)
+                    continue
+                if not self._acquire_slot():
+                    return
+                self._enqueue(event)
+        finally:
+            with self._idle:
+                self._batches_in_flight -= 1
+                self._idle.notify_all()
+
+    def submit(self, event: IncomingEvent | Mapping[str, Any], block: bool = True) -> bool:
+        """Событие от внешнего источника (вебхук) в общую очередь воркеров.
+
+        ``block=False`` — при заполненной очереди сразу False вместо ожидания: вебхук ответит
+        платформе ошибкой, и она повторит доставку позже.
+        """
+        incoming = normalize_incoming_event(event)
+        if block:
+            if not self._acquire_slot():
+                return False
+        elif not self._slots.acquire(blocking=False):
+            self._bump("rejected")
+            return False
+        self._enqueue(incoming)
+        return True
+
+    def _acquire_slot(self) -> bool:
+        if self._slots.acquire(blocking=False):
+            return True
+        self._bump("backpressure_waits")
+        while not self._stop.is_set():
+            if self._slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _enqueue(self, event: IncomingEvent) -> None:
+        with self._state_lock:
+            self._pending += 1
+            self._stats["received"] += 1
+            self._stats["max_pending_seen"] = max(self._stats["max_pending_seen"], self._pending)
+        self._queue.put(event)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                event = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            chat_key = TransportRouter.make_chat_key(event)
+            with self._state_lock:
+                if chat_key in self._active_chats:
+                    # Чат уже обрабатывается другим воркером: событие подождёт его, порядок сохранится.
+                    self._parked.setdefault(chat_key, deque()).append(event)
+                    self._stats["parked"] += 1
+                    continue
+                self._active_chats.add(chat_key)
+            self._drain_chat(chat_key, event)
+
+    def _drain_chat(self, chat_key: str, event: IncomingEvent) -> None:
+        while True:
+            self._process(event)
+            with self._state_lock:
+                parked = self._parked.get(chat_key)
+                if not parked:
+                    self._parked.pop(chat_key, None)
+                    self._active_chats.discard(chat_key)
+                    return
+                event = parked.popleft()
+
+    def _process(self, event: IncomingEvent) -> None:
+        try:
+            self.handler(event)
+            self._bump("processed")
+        except Exception as exc:  # noqa: BLE001 - ошибка одного сообщения не должна останавливать воркер
+            self._bump("failed")
+            logger.exception("Ошибка обработки события %s: %s", event.raw_event_id, exc)
+        finally:
+            self._slots.release()
+            with self._idle:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
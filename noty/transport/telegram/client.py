@@ -2,33 +2,91 @@
 
 from __future__ import annotations
 
-import json
 from typing import Any
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+
+from noty.transport.http import AsyncPooledHTTPClient, PooledHTTPClient, TransportHTTPError, shared_http_client
+
+
+class TelegramAPIError(TransportHTTPError):
+    def __init__(self, method: str, data: dict[str, Any]):
+        code = data.get("error_code")
+        retry_after = (data.get("parameters") or {}).get("retry_after")
+        super().__init__(
+            f"Telegram {method} error: {data}",
+            status_code=code,
+            retryable=code == 429 or (isinstance(code, int) and code >= 500),
+            retry_after=float(retry_after) if retry_after is not None else None,
+        )
+
+
+def _unwrap(method: str, data: dict[str, Any]) -> Any:
+    if not data.get("ok"):
+        raise TelegramAPIError(method, data)
+    return data.get("result")
+
+
+def _webhook_params(url: str, secret_token: str | None, max_connections: int | None) -> dict[str, Any]:
+    """``secret_token`` Telegram присылает в заголовке ``X-Telegram-Bot-Api-Secret-Token`` каждого апдейта."""
+    params: dict[str, Any] = {"url": url}
+    if secret_token:
+        params["secret_token"] = secret_token
+    if max_connections:
+        params["max_connections"] = max_connections
+    return params
 
 
 class TelegramClient:
-    def __init__(self, token: str, timeout: int = 30):
+    def __init__(self, token: str, timeout: int = 30, http: PooledHTTPClient | None = None):
         self._base_url = f"https://api.telegram.org/bot{token}"
         self._timeout = timeout
+        self.http = http or shared_http_client()
 
-    def get_updates(self, offset: int | None = None, timeout: int = 20) -> list[dict[str, Any]]:
-        params = {"timeout": timeout}
+    def _updates_request(self, offset: int | None, timeout: int) -> tuple[dict[str, Any], float]:
+        params: dict[str, Any] = {"timeout": timeout}
         if offset is not None:
             params["offset"] = offset
-        url = f"{self._base_url}/getUpdates?{urlencode(params)}"
-        with urlopen(url, timeout=self._timeout) as response:  # noqa: S310
-            data = json.loads(response.read().decode("utf-8"))
-        if not data.get("ok"):
-            raise RuntimeError(f"Telegram getUpdates error: {data}")
-        return data.get("result", [])
-
-    def set_webhook(self, url: str) -> dict[str, Any]:
-        body = urlencode({"url": url}).encode("utf-8")
-        request = Request(f"{self._base_url}/setWebhook", data=body, method="POST")
-        with urlopen(request, timeout=self._timeout) as response:  # noqa: S310
-            data = json.loads(response.read().decode("utf-8"))
-        if not data.get("ok"):
-            raise RuntimeError(f"Telegram setWebhook error: {data}")
+        # Long poll держит запрос до ``timeout`` секунд: сетевой таймаут должен быть больше.
+        return params, max(self._timeout, timeout + 10)
+
+    def get_updates(self, offset: int | None = None, timeout: int = 20) -> list[dict[str, Any]]:
+        params, timeout_seconds = self._updates_request(offset, timeout)
+        data = self.http.get_json(f"{self._base_url}/getUpdates", params=params, timeout_seconds=timeout_seconds)
+        return _unwrap("getUpdates", data) or []
+
+    def send_message(self, chat_id: int, text: str) -> dict[str, Any]:
+        data = self.http.post_form(f"{self._base_url}/sendMessage", {"chat_id": chat_id, "text": text}, timeout_seconds=self._timeout)
+        return _unwrap("sendMessage", data) or {}
+
+    def set_webhook(self, url: str, secret_token: str | None = None, max_connections: int | None = None) -> dict[str, Any]:
+        data = self.http.post_form(f"{self._base_url}/setWebhook", _webhook_params(url, secret_token, max_connections), timeout_seconds=self._timeout)
+        _unwrap("setWebhook", data)
+        return data
+
+
+class AsyncTelegramClient:
+    """Тот же API для asyncio-транспортов: обёртка над ``TelegramClient`` с ``AsyncPooledHTTPClient``."""
+
+    def __init__(self, client: TelegramClient, http: AsyncPooledHTTPClient | None = None):
+        self.client = client
+        self.http = http or AsyncPooledHTTPClient()
+
+    async def get_updates(self, offset: int | None = None, timeout: int = 20) -> list[dict[str, Any]]:
+        params, timeout_seconds = self.client._updates_request(offset, timeout)
+        data = await self.http.get_json(f"{self.client._base_url}/getUpdates", params=params, timeout_seconds=timeout_seconds)
+        return _unwrap("getUpdates", data) or []
+
+    async def send_message(self, chat_id: int, text: str) -> dict[str, Any]:
+        data = await self.http.post_form(
+            f"{self.client._base_url}/sendMessage", {"chat_id": chat_id, "text": text}, timeout_seconds=self.client._timeout
+        )
+        return _unwrap("sendMessage", data) or {}
+
+    async def set_webhook(self, url: str, secret_token: str | None = None, max_connections: int | None = None) -> dict[str, Any]:
+        data = await self.http.post_form(
+            f"{self.client._base_url}/setWebhook", _webhook_params(url, secret_token, max_connections), timeout_seconds=self.client._timeout
+        )
+        _unwrap("setWebhook", data)
         return data
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
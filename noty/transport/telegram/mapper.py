@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Any
 
 from noty.transport.types import IncomingEvent
+from noty.utils.tracing import new_trace_id
 
 
 def _first_non_none(*values: Any) -> Any:
@@ -44,4 +45,5 @@ def map_telegram_update(update: dict[str, Any]) -> IncomingEvent:
         platform="telegram",
         raw_event_id=raw_event_id,
         raw_payload=update,
+        trace_id=new_trace_id(),
     )
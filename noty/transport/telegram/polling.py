@@ -8,6 +8,8 @@ from noty.transport.telegram.client import TelegramClient
 
 
 class TelegramPolling:
+    long_poll = True
+
     def __init__(self, client: TelegramClient, polling_timeout: int = 20):
         self.client = client
         self.polling_timeout = polling_timeout
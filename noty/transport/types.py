@@ -19,6 +19,7 @@ class IncomingEvent:
     platform: str
     raw_event_id: str
     raw_payload: dict[str, Any] | None = None
+    trace_id: str | None = None
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
@@ -55,4 +56,5 @@ def normalize_incoming_event(event: IncomingEvent | Mapping[str, Any]) -> Incomi
         platform=str(payload["platform"]),
         raw_event_id=str(payload["raw_event_id"]),
         raw_payload=payload.get("raw_payload"),
+        trace_id=payload.get("trace_id"),
     )
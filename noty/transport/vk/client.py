@@ -2,40 +2,73 @@
 
 from __future__ import annotations
 
-import json
 from typing import Any, Dict
-from urllib.parse import urlencode
-from urllib.request import urlopen
+
+from noty.transport.http import AsyncPooledHTTPClient, PooledHTTPClient, TransportHTTPError, shared_http_client
+
+VK_API_URL = "https://api.vk.com/method"
+# 1 — неизвестная ошибка, 6 — слишком много запросов в секунду, 9 — flood control, 10 — внутренняя ошибка.
+VK_RETRYABLE_ERROR_CODES = frozenset({1, 6, 9, 10})
+
+
+class VKAPIError(TransportHTTPError):
+    def __init__(self, error: Dict[str, Any]):
+        code = error.get("error_code")
+        super().__init__(f"VK API error: {error}", retryable=code in VK_RETRYABLE_ERROR_CODES)
+        self.error_code = code
+
+
+def _unwrap(data: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in data:
+        raise VKAPIError(data["error"])
+    return data["response"]
+
+
+def _execute_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    _unwrap(data)
+    return {"response": data["response"], "execute_errors": data.get("execute_errors", [])}
 
 
 class VKAPIClient:
-    def __init__(self, token: str, group_id: int, api_version: str = "5.199", timeout_seconds: int = 25):
+    def __init__(
+        self,
+        token: str,
+        group_id: int,
+        api_version: str = "5.199",
+        timeout_seconds: int = 25,
+        http: PooledHTTPClient | None = None,
+    ):
         self.token = token
         self.group_id = group_id
         self.api_version = api_version
         self.timeout_seconds = timeout_seconds
+        self.http = http or shared_http_client()
+
+    def _method_payload(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {**params, "access_token": self.token, "v": self.api_version}
+
+    def _poll_params(self, key: str, ts: str, wait: int) -> Dict[str, Any]:
+        return {"act": "a_check", "key": key, "ts": ts, "wait": wait}
 
     def call_method(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        payload = {
-            **params,
-            "access_token": self.token,
-            "v": self.api_version,
-        }
-        url = f"https://api.vk.com/method/{method}?{urlencode(payload)}"
-        with urlopen(url, timeout=self.timeout_seconds) as resp:  # noqa: S310
-            data = json.loads(resp.read().decode("utf-8"))
-        if "error" in data:
-            raise RuntimeError(f"VK API error: {data['error']}")
-        return data["response"]
+        # POST: токен не попадает в URL/логи прокси, длинный текст сообщения не упирается в лимит query.
+        data = self.http.post_form(f"{VK_API_URL}/{method}", self._method_payload(params), timeout_seconds=self.timeout_seconds)
+        return _unwrap(data)
+
+    def execute(self, code: str) -> Dict[str, Any]:
+        """VKScript ``execute``: до 25 вызовов API за один запрос.
+
+        Возвращает ``{"response": [...], "execute_errors": [...]}`` — упавшие вложенные вызовы дают
+        ``false`` в ``response`` и запись в ``execute_errors`` в том же порядке.
+        """
+        data = self.http.post_form(f"{VK_API_URL}/execute", self._method_payload({"code": code}), timeout_seconds=self.timeout_seconds)
+        return _execute_result(data)
 
     def get_longpoll_server(self) -> Dict[str, Any]:
         return self.call_method("groups.getLongPollServer", {"group_id": self.group_id})
 
     def poll_events(self, server: str, key: str, ts: str, wait: int = 25) -> Dict[str, Any]:
-        query = urlencode({"act": "a_check", "key": key, "ts": ts, "wait": wait})
-        url = f"{server}?{query}"
-        with urlopen(url, timeout=self.timeout_seconds + wait) as resp:  # noqa: S310
-            return json.loads(resp.read().decode("utf-8"))
+        return self.http.get_json(server, params=self._poll_params(key, ts, wait), timeout_seconds=self.timeout_seconds + wait)
 
     def send_message(self, peer_id: int, text: str, random_id: int) -> Dict[str, Any]:
         return self.call_method(
@@ -46,3 +79,40 @@ class VKAPIClient:
                 "random_id": random_id,
             },
         )
+
+
+class AsyncVKAPIClient:
+    """Тот же API для asyncio-транспортов: обёртка над ``VKAPIClient``.
+
+    Токен, версия API, group_id и таймауты берутся у синхронного клиента, запросы идут
+    через ``AsyncPooledHTTPClient``.
+    """
+
+    def __init__(self, client: VKAPIClient, http: AsyncPooledHTTPClient | None = None):
+        self.client = client
+        self.http = http or AsyncPooledHTTPClient()
+
+    @property
+    def group_id(self) -> int:
+        return self.client.group_id
+
+    async def call_method(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        data = await self.http.post_form(f"{VK_API_URL}/{method}", self.client._method_payload(params), timeout_seconds=self.client.timeout_seconds)
+        return _unwrap(data)
+
+    async def execute(self, code: str) -> Dict[str, Any]:
+        """VKScript ``execute``, результат как у ``VKAPIClient.execute``."""
+        data = await self.http.post_form(f"{VK_API_URL}/execute", self.client._method_payload({"code": code}), timeout_seconds=self.client.timeout_seconds)
+        return _execute_result(data)
+
+    async def get_longpoll_server(self) -> Dict[str, Any]:
+        return await self.call_method("groups.getLongPollServer", {"group_id": self.client.group_id})
+
+    async def poll_events(self, server: str, key: str, ts: str, wait: int = 25) -> Dict[str, Any]:
+        return await self.http.get_json(server, params=self.client._poll_params(key, ts, wait), timeout_seconds=self.client.timeout_seconds + wait)
+
+    async def send_message(self, peer_id: int, text: str, random_id: int) -> Dict[str, Any]:
+        return await self.call_method("messages.send", {"peer_id": peer_id, "message": text, "random_id": random_id})
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
@@ -6,6 +6,7 @@ from typing import Any, Dict
 
 from noty.core.events import IncomingEvent as CoreIncomingEvent
 from noty.transport.types import IncomingEvent
+from noty.utils.tracing import new_trace_id
 
 VK_MESSAGE_NEW = "message_new"
 
@@ -37,9 +38,16 @@ def map_vk_event(event: dict[str, Any]) -> IncomingEvent:
         platform="vk",
         raw_event_id=str(message.get("conversation_message_id") or message.get("id") or event.get("event_id") or "unknown"),
         raw_payload=event,
+        trace_id=new_trace_id(),
     )
 
 
+def vk_update_id(update: Dict[str, Any]) -> Any:
+    """Ключ dedup апдейта long poll: ``event_id``, иначе идентификатор сообщения."""
+    message = (update.get("object") or {}).get("message") or {}
+    return update.get("event_id") or message.get("conversation_message_id") or message.get("id")
+
+
 def map_vk_update_to_incoming_event(update: Dict[str, Any]) -> CoreIncomingEvent | None:
     """Legacy-совместимый маппер для core.events.IncomingEvent."""
     if update.get("type") != VK_MESSAGE_NEW:
@@ -60,7 +68,7 @@ def map_vk_update_to_incoming_event(update: Dict[str, Any]) -> CoreIncomingEvent
         chat_id=int(peer_id),
         user_id=int(from_id),
         text=text,
-        update_id=update.get("event_id") or message.get("conversation_message_id") or message.get("id"),
+        update_id=vk_update_id(update),
         chat_name="private" if int(peer_id) == int(from_id) else f"chat_{peer_id}",
         username=message.get("username") or f"id{from_id}",
     )
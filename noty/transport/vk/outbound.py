@@ -0,0 +1,231 @@
+"""Очередь исходящих сообщений VK: пачки через ``execute``, пейсинг token bucket, ретраи без блокировки.
+
+Обработчики входящих только ставят ответ в очередь и сразу идут дальше. Отдельный поток
+собирает до 25 ожидающих ``messages.send`` в один VKScript ``execute``, перед каждым запросом
+берёт токен из bucket (лимит сообщества — 20 запросов в секунду) и разбирает результат
+по вызовам. Упавший вызов откладывается с экспоненциальной паузой; следующие сообщения того
+же чата ждут его, чтобы не нарушить порядок. ``random_id`` сохраняется между попытками, поэтому
+VK не продублирует сообщение, если ответ на уже выполненный запрос потерялся.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from noty.transport.http import is_retryable_error
+from noty.transport.ratelimit import TokenBucket
+from noty.transport.vk.client import VKAPIError
+
+logger = logging.getLogger(__name__)
+
+VK_EXECUTE_MAX_CALLS = 25
+# Лимит длины VKScript — 64 KiB; оставляем запас на обвязку.
+VK_EXECUTE_MAX_CODE_CHARS = 60_000
+
+
+@dataclass
+class _Outgoing:
+    seq: int
+    peer_id: int
+    text: str
+    random_id: int
+    future: Future = field(default_factory=Future)
+    attempts: int = 0
+    ready_at: float = 0.0
+
+    def call(self) -> str:
+        params = {"peer_id": self.peer_id, "message": self.text, "random_id": self.random_id}
+        return f"API.messages.send({json.dumps(params, ensure_ascii=False)})"
+
+
+def build_execute_code(items: List[_Outgoing]) -> str:
+    return "return [" + ",".join(item.call() for item in items) + "];"
+
+
+class VKOutboundDispatcher:
+    def __init__(
+        self,
+        client: Any,
+        rate_per_second: float = 20.0,
+        max_batch: int = VK_EXECUTE_MAX_CALLS,
+        linger_seconds: float = 0.05,
+        max_retries: int = 5,
+        base_retry_delay_seconds: float = 0.5,
+        max_retry_delay_seconds: float = 30.0,
+        bucket: TokenBucket | None = None,
+        metrics: Any | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.client = client
+        self.max_batch = max(1, min(max_batch, VK_EXECUTE_MAX_CALLS))
+        self.linger_seconds = linger_seconds
+        self.max_retries = max_retries
+        self.base_retry_delay_seconds = base_retry_delay_seconds
+        self.max_retry_delay_seconds = max_retry_delay_seconds
+        self.bucket = bucket or TokenBucket(rate_per_second, clock=clock)
+        self.metrics = metrics
+        self.clock = clock
+        self.rng = rng
+        self._items: List[_Outgoing] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        self._stats: Dict[str, int] = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "batches": 0, "calls": 0, "max_depth": 0}
+
+    def send(self, peer_id: int, text: str, random_id: int | None = None) -> Future:
+        """Ставит сообщение в очередь и сразу возвращает Future с ответом VK (message id)."""
+        item = _Outgoing(
+            seq=next(self._seq),
+            peer_id=int(peer_id),
+            text=text,
+            random_id=random_id if random_id is not None else random.randint(1, 2_147_483_647),
+            ready_at=self.clock(),
+        )
+        with self._cond:
+            self._items.append(item)
+            self._stats["queued"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._items))
+            self._cond.notify_all()
+        return item.future
+
+    def start(self) -> "VKOutboundDispatcher":
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="noty-vk-outbound")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout_seconds: float = 10.0) -> None:
+        """Дожидается отправки очереди (до timeout), затем останавливает поток."""
+        self.wait_idle(timeout_seconds)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout_seconds)
+            self._thread = None
+
+    def wait_idle(self, timeout_seconds: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._items, timeout=timeout_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "depth": len(self._items),
+                "avg_batch_size": round(self._stats["calls"] / batches, 3) if batches else 0.0,
+            }
+
+    def _take_batch(self, now: float) -> List[_Outgoing]:
+        """Готовые сообщения в порядке постановки, не больше одного на чат.
+
+        Вызовы внутри ``execute`` независимы: если бы в пачку попали два сообщения одного чата
+        и первое упало, второе всё равно ушло бы раньше повтора. Чат с отложенным сообщением
+        пропускается целиком.
+        """
+        batch: List[_Outgoing] = []
+        seen: set[int] = set()
+        code_chars = 0
+        for item in self._items:
+            if len(batch) >= self.max_batch:
+                break
+            if item.peer_id in seen:
+                continue
+            seen.add(item.peer_id)
+            if item.ready_at > now:
+                continue
+            call_chars = len(item.call())
+            if batch and code_chars + call_chars > VK_EXECUTE_MAX_CODE_CHARS:
+                break
+            batch.append(item)
+            code_chars += call_chars
+        return batch
+
+    def _next_wakeup(self) -> float | None:
+        """Ближайший момент, когда хоть одно сообщение можно отправить с учётом порядка внутри чата."""
+        eligible_at: Dict[int, float] = {}
+        for item in self._items:
+            eligible_at[item.peer_id] = max(eligible_at.get(item.peer_id, 0.0), item.ready_at)
+        return min(eligible_at.values(), default=None)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop:
+                        return
+                    now = self.clock()
+                    wakeup = self._next_wakeup()
+                    if wakeup is not None and wakeup <= now:
+                        break
+                    self._cond.wait(timeout=None if wakeup is None else max(0.0, wakeup - now))
+                # Короткая задержка собирает ответы, которые придут почти одновременно, в одну пачку.
+                linger_until = self.clock() + self.linger_seconds
+                while not self._stop and len(self._items) < self.max_batch:
+                    remaining = linger_until - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                batch = self._take_batch(self.clock())
+            if not batch:
+                continue
+            self.bucket.acquire()
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: List[_Outgoing]) -> None:
+        with self._cond:
+            self._stats["batches"] += 1
+            self._stats["calls"] += len(batch)
+        if self.metrics is not None:
+            self.metrics.inc("vk_outbound_batches")
+            self.metrics.inc("vk_outbound_calls", len(batch))
+        try:
+            result = self.client.execute(build_execute_code(batch))
+        except Exception as exc:  # noqa: BLE001 - исход решает классификация ошибки
+            for item in batch:
+                self._retry_or_fail(item, exc)
+            return
+        responses = list(result.get("response") or [])
+        errors = iter(result.get("execute_errors") or [])
+        for idx, item in enumerate(batch):
+            value = responses[idx] if idx < len(responses) else False
+            if value is False:
+                error = next(errors, {"error_code": None, "error_msg": "нет результата вызова"})
+                self._retry_or_fail(item, VKAPIError(error))
+            else:
+                self._complete(item, value)
+
+    def _complete(self, item: _Outgoing, value: Any) -> None:
+        with self._cond:
+            self._items.remove(item)
+            self._stats["sent"] += 1
+            self._cond.notify_all()
+        item.future.set_result(value)
+
+    def _retry_or_fail(self, item: _Outgoing, exc: BaseException) -> None:
+        item.attempts += 1
+        with self._cond:
+            if is_retryable_error(exc) and item.attempts <= self.max_retries:
+                delay = self.rng() * min(self.max_retry_delay_seconds, self.base_retry_delay_seconds * (2 ** (item.attempts - 1)))
+                retry_after = getattr(exc, "retry_after", None)
+                item.ready_at = self.clock() + max(delay, float(retry_after or 0.0))
+                self._stats["retried"] += 1
+                self._cond.notify_all()
+                logger.info("VK outbound: повтор #%s для peer_id=%s через %.2fs (%s)", item.attempts, item.peer_id, item.ready_at - self.clock(), exc)
+                return
+            self._items.remove(item)
+            self._stats["failed"] += 1
+            self._cond.notify_all()
+        logger.warning("VK outbound: сообщение для peer_id=%s не отправлено: %s", item.peer_id, exc)
+        item.future.set_exception(exc)
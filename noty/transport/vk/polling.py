@@ -7,23 +7,52 @@ import random
 from typing import Any, Dict
 
 from noty.core.bot import NotyBot
+from noty.core.events import IncomingEvent
+from noty.transport.lanes import LaneDispatcher, coalesce_core_events
 from noty.transport.vk.client import VKAPIClient
 from noty.transport.vk.mapper import map_vk_update_to_incoming_event
+from noty.transport.vk.outbound import VKOutboundDispatcher
 from noty.transport.vk.state_store import VKStateStore, run_with_backoff
 
 logger = logging.getLogger(__name__)
 
 
 class VKLongPollTransport:
-    def __init__(self, client: VKAPIClient, bot: NotyBot, state_store: VKStateStore):
+    """Цикл long poll; при ``lanes > 0`` апдейты раскладываются по дорожкам чатов (LaneDispatcher)."""
+
+    def __init__(
+        self,
+        client: VKAPIClient,
+        bot: NotyBot,
+        state_store: VKStateStore,
+        lanes: int = 0,
+        max_queue_per_lane: int = 64,
+        overflow: str = "coalesce",
+        max_age_seconds: float | None = None,
+        outbound: VKOutboundDispatcher | None = None,
+    ):
         self.client = client
         self.bot = bot
         self.state_store = state_store
+        self.outbound = outbound
+        self.dispatcher: LaneDispatcher | None = None
+        if lanes > 0:
+            self.dispatcher = LaneDispatcher(
+                handler=self._handle_event,
+                lanes=lanes,
+                max_queue_per_lane=max_queue_per_lane,
+                overflow=overflow,
+                coalesce=coalesce_core_events,
+                max_age_seconds=max_age_seconds,
+                metrics=getattr(bot, "metrics", None),
+            )
 
     def run_forever(self) -> None:
         logger.info("Запуск VK longpoll transport")
         server_info = run_with_backoff(self.client.get_longpoll_server)
         ts = self.state_store.get_longpoll_ts() or str(server_info["ts"])
+        if self.dispatcher is not None:
+            self.dispatcher.start()
 
         while True:
             poll_response = run_with_backoff(
@@ -34,10 +63,11 @@ class VKLongPollTransport:
                 )
             )
             ts = str(poll_response.get("ts", ts))
-            self.state_store.set_longpoll_ts(ts)
-
-            for update in poll_response.get("updates", []):
-                self._process_update(update)
+            # ts и отметки апдейтов цикла уходят на диск одной дозаписью журнала.
+            with self.state_store.batch():
+                self.state_store.set_longpoll_ts(ts)
+                for update in poll_response.get("updates", []):
+                    self._process_update(update)
 
     def _process_update(self, update: Dict[str, Any]) -> None:
         event = map_vk_update_to_incoming_event(update)
@@ -46,11 +76,20 @@ class VKLongPollTransport:
         if event.update_id is not None and self.state_store.is_processed(event.update_id):
             logger.debug("Скип дубликата update_id=%s", event.update_id)
             return
+        if self.dispatcher is not None:
+            self.dispatcher.submit(f"{event.platform}:{event.chat_id}", event)
+            return
+        self._handle_event(event)
 
+    def _handle_event(self, event: IncomingEvent) -> None:
         result = self.bot.handle_message(event)
         if result.get("status") == "responded":
             random_id = random.randint(1, 2_147_483_647)
-            run_with_backoff(lambda: self.client.send_message(event.chat_id, result["text"], random_id))
+            if self.outbound is not None:
+                self.outbound.send(event.chat_id, result["text"], random_id)
+            else:
+                run_with_backoff(lambda: self.client.send_message(event.chat_id, result["text"], random_id))
 
-        if event.update_id is not None:
-            self.state_store.mark_processed(event.update_id)
+        for update_id in [*event.metadata.get("coalesced_update_ids", []), event.update_id]:
+            if update_id is not None:
+                self.state_store.mark_processed(update_id)
@@ -3,41 +3,136 @@
 from __future__ import annotations
 
 import json
+import os
+import random
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Callable, Iterable
+from typing import Any, Callable, Deque, Iterable, Iterator, List
+
+from noty.transport.http import is_retryable_error
 
 
 class VKStateStore:
-    def __init__(self, state_path: str = "./noty/data/vk_state.json", dedup_cache_size: int = 5000):
+    """Long poll ts и dedup обработанных update_id.
+
+    В памяти — кольцевой буфер + множество (O(1) на проверку и отметку). На диске — компактный
+    снимок ``state_path`` и append-only журнал ``<state_path>.journal``: каждое изменение дописывает
+    строку, а когда журнал вырастает до ``compact_every`` записей, снимок пересобирается во временный
+    файл и атомарно подменяется через rename. Внутри ``batch()`` записи копятся и попадают в журнал
+    одной порцией — один write на цикл опроса.
+    """
+
+    def __init__(self, state_path: str = "./noty/data/vk_state.json", dedup_cache_size: int = 5000, compact_every: int | None = None):
         self.state_path = Path(state_path)
         self.state_path.parent.mkdir(parents=True, exist_ok=True)
-        self.dedup_cache_size = dedup_cache_size
-        self._state = self._load()
+        self.journal_path = self.state_path.with_name(self.state_path.name + ".journal")
+        self.dedup_cache_size = max(1, dedup_cache_size)
+        self.compact_every = compact_every or max(1000, self.dedup_cache_size)
+        self._lock = threading.RLock()
+        self._ts: str | None = None
+        self._ring: Deque[str] = deque()
+        self._seen: set[str] = set()
+        self._pending: List[str] = []
+        self._batch_depth = 0
+        self._journal_records = 0
+        self._load()
+
+    def _remember(self, update_id: str) -> bool:
+        if update_id in self._seen:
+            return False
+        if len(self._ring) >= self.dedup_cache_size:
+            self._seen.discard(self._ring.popleft())
+        self._ring.append(update_id)
+        self._seen.add(update_id)
+        return True
+
+    def _load(self) -> None:
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text(encoding="utf-8") or "{}")
+            self._ts = state.get("longpoll_ts")
+            for update_id in state.get("processed_update_ids", []):
+                self._remember(str(update_id))
+        if self.journal_path.exists():
+            torn = False
+            with self.journal_path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Хвост, оборванный падением процесса посреди записи, — всё до него валидно.
+                        torn = True
+                        break
+                    if "ts" in record:
+                        self._ts = record["ts"]
+                    if "id" in record:
+                        self._remember(str(record["id"]))
+                    self._journal_records += 1
+            if torn:
+                # Дописывать за битой строкой нельзя: сворачиваем журнал в снимок сразу.
+                self.compact()
 
-    def _load(self) -> dict[str, Any]:
-        if not self.state_path.exists():
-            return {"longpoll_ts": None, "processed_update_ids": []}
-        return json.loads(self.state_path.read_text(encoding="utf-8"))
+    def _append(self, record: dict[str, Any]) -> None:
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if self._batch_depth == 0:
+            self._flush()
 
-    def _persist(self) -> None:
-        self.state_path.write_text(json.dumps(self._state, ensure_ascii=False, indent=2), encoding="utf-8")
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self.journal_path.open("a", encoding="utf-8") as fh:
+            fh.write("\n".join(self._pending) + "\n")
+        self._journal_records += len(self._pending)
+        self._pending = []
+        if self._journal_records >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Снимок текущего состояния через tmp + ``os.replace``; журнал после этого обнуляется."""
+        with self._lock:
+            # Ожидающие записи уже отражены в памяти и попадут в снимок.
+            self._pending = []
+            snapshot = {"longpoll_ts": self._ts, "processed_update_ids": list(self._ring)}
+            tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.state_path)
+            self.journal_path.unlink(missing_ok=True)
+            self._journal_records = 0
+
+    @contextmanager
+    def batch(self) -> Iterator["VKStateStore"]:
+        """Группирует записи цикла опроса (ts + отметки апдейтов) в одну дозапись журнала."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._flush()
 
     def get_longpoll_ts(self) -> str | None:
-        return self._state.get("longpoll_ts")
+        return self._ts
 
     def set_longpoll_ts(self, ts: str | None) -> None:
-        self._state["longpoll_ts"] = ts
-        self._persist()
+        with self._lock:
+            if ts == self._ts:
+                return
+            self._ts = ts
+            self._append({"ts": ts})
 
     def is_processed(self, update_id: int | str) -> bool:
-        return str(update_id) in set(map(str, self._state.get("processed_update_ids", [])))
+        return str(update_id) in self._seen
 
     def mark_processed(self, update_id: int | str) -> None:
-        ids = [str(x) for x in self._state.get("processed_update_ids", [])]
-        ids.append(str(update_id))
-        self._state["processed_update_ids"] = ids[-self.dedup_cache_size :]
-        self._persist()
+        # Дорожки LaneDispatcher отмечают апдейты из разных потоков.
+        with self._lock:
+            key = str(update_id)
+            if self._remember(key):
+                self._append({"id": key})
 
 
 def run_with_backoff(
@@ -45,14 +140,28 @@ def run_with_backoff(
     retries: int = 5,
     base_delay_seconds: float = 0.5,
     retryable_exceptions: Iterable[type[Exception]] = (Exception,),
+    is_retryable: Callable[[BaseException], bool] | None = is_retryable_error,
+    max_delay_seconds: float = 30.0,
+    sleep: Callable[[float], None] = time.sleep,
+    rng: Callable[[], float] = random.random,
 ) -> Any:
+    """Повтор с экспоненциальной задержкой и full jitter.
+
+    Повторяются только ошибки, которые ``is_retryable`` считает временными (сеть, таймауты,
+    429/5xx, flood control VK); остальные — например, неверный токен — пробрасываются сразу.
+    ``Retry-After`` от сервера задаёт нижнюю границу паузы.
+    """
     attempt = 0
     while True:
         try:
             return operation()
-        except tuple(retryable_exceptions):
-            if attempt >= retries:
+        except tuple(retryable_exceptions) as exc:
+            if attempt >= retries or (is_retryable is not None and not is_retryable(exc)):
                 raise
-            delay = base_delay_seconds * (2**attempt)
-            time.sleep(delay)
+            # Full jitter: одновременно упавшие клиенты не ретраят синхронной волной.
+            delay = rng() * min(max_delay_seconds, base_delay_seconds * (2**attempt))
+            retry_after = getattr(exc, "retry_after", None)
+            if retry_after is not None:
+                delay = max(delay, float(retry_after))
+            sleep(delay)
             attempt += 1
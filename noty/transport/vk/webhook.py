@@ -8,15 +8,24 @@ from typing import Any, Dict
 from noty.core.bot import NotyBot
 from noty.transport.vk.client import VKAPIClient
 from noty.transport.vk.mapper import map_vk_update_to_incoming_event
+from noty.transport.vk.outbound import VKOutboundDispatcher
 from noty.transport.vk.state_store import VKStateStore, run_with_backoff
 
 
 class VKWebhookHandler:
-    def __init__(self, client: VKAPIClient, bot: NotyBot, state_store: VKStateStore, confirmation_token: str | None = None):
+    def __init__(
+        self,
+        client: VKAPIClient,
+        bot: NotyBot,
+        state_store: VKStateStore,
+        confirmation_token: str | None = None,
+        outbound: VKOutboundDispatcher | None = None,
+    ):
         self.client = client
         self.bot = bot
         self.state_store = state_store
         self.confirmation_token = confirmation_token
+        self.outbound = outbound
 
     def handle_update(self, payload: Dict[str, Any]) -> str:
         if payload.get("type") == "confirmation" and self.confirmation_token:
@@ -32,7 +41,10 @@ class VKWebhookHandler:
         result = self.bot.handle_message(event)
         if result.get("status") == "responded":
             random_id = random.randint(1, 2_147_483_647)
-            run_with_backoff(lambda: self.client.send_message(event.chat_id, result["text"], random_id))
+            if self.outbound is not None:
+                self.outbound.send(event.chat_id, result["text"], random_id)
+            else:
+                run_with_backoff(lambda: self.client.send_message(event.chat_id, result["text"], random_id))
 
         if event.update_id is not None:
             self.state_store.mark_processed(event.update_id)
@@ -0,0 +1,219 @@
+"""ASGI-приём вебхуков Telegram и VK Callback API.
+
+Запрос только проверяет секрет, отбрасывает повторную доставку по update_id, маппит апдейт и
+кладёт его в очередь воркеров (``TransportRuntime.submit``) — ответ уходит сразу, не дожидаясь
+LLM. Если очередь заполнена, отвечаем 503: платформа повторит доставку позже, а id не
+запоминается, чтобы повтор не отбросился как дубль.
+
+Приложение — голый ASGI без фреймворка, чтобы горячий путь не тянул FastAPI-обвязку.
+Локальный запуск: ``uvicorn.run(WebhookIngress(...), host=..., port=...)``.
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, MutableMapping
+
+from noty.transport.telegram.mapper import map_telegram_update
+from noty.transport.types import IncomingEvent
+from noty.transport.vk.mapper import map_vk_event
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+DEFAULT_MAX_BODY_BYTES = 1_048_576
+
+Scope = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[MutableMapping[str, Any]]]
+Send = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+
+
+class RecentUpdateIds:
+    """Последние ``size`` принятых id: кольцевой буфер + множество, проверка и отметка атомарны."""
+
+    def __init__(self, size: int = 10_000):
+        self.size = max(1, size)
+        self._ring: Deque[str] = deque()
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> bool:
+        """True — id новый и запомнен; False — повторная доставка."""
+        with self._lock:
+            if key in self._seen:
+                return False
+            if len(self._ring) >= self.size:
+                self._seen.discard(self._ring.popleft())
+            self._ring.append(key)
+            self._seen.add(key)
+            return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self._seen:
+                self._seen.discard(key)
+                self._ring.remove(key)
+
+
+class WebhookIngress:
+    def __init__(
+        self,
+        submit: Callable[[IncomingEvent], bool],
+        telegram_secret_token: str | None = None,
+        vk_secret: str | None = None,
+        vk_confirmation_token: str | None = None,
+        vk_group_id: int | None = None,
+        telegram_path: str = "/telegram",
+        vk_path: str = "/vk",
+        dedup_size: int = 10_000,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        metrics: Any | None = None,
+        readiness: Callable[[], bool] | None = None,
+    ):
+        self.submit = submit
+        self.readiness = readiness
+        self.telegram_secret_token = telegram_secret_token or None
+        self.vk_secret = vk_secret or None
+        self.vk_confirmation_token = vk_confirmation_token
+        self.vk_group_id = int(vk_group_id) if vk_group_id else None
+        self.routes: Dict[str, Callable[[Mapping[bytes, bytes], Dict[str, Any]], tuple[int, bytes]]] = {
+            telegram_path: self._handle_telegram,
+            vk_path: self._handle_vk,
+        }
+        self.dedup = RecentUpdateIds(dedup_size)
+        self.max_body_bytes = max_body_bytes
+        self.metrics = metrics
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {"accepted": 0, "duplicates": 0, "ignored": 0, "rejected": 0, "unauthorized": 0, "bad_requests": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _bump(self, key: str, platform: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+        if self.metrics is not None:
+            self.metrics.inc(f"webhook_{platform}_{key}")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        path = scope.get("path", "")
+        if scope.get("method") == "GET" and path == "/healthz":
+            await _respond(send, 200, json.dumps(self.stats()).encode("utf-8"), b"application/json")
+            return
+        if scope.get("method") == "GET" and path == "/readyz":
+            # Модели ещё прогреваются — балансировщик может подождать; сами вебхуки принимаются всё равно.
+            ready = self.readiness is None or self.readiness()
+            await _respond(send, 200 if ready else 503, b"ready" if ready else b"warming up")
+            return
+        handler = self.routes.get(path)
+        if handler is None or scope.get("method") != "POST":
+            await _respond(send, 404, b"not found")
+            return
+        body = await _read_body(receive, self.max_body_bytes)
+        if body is None:
+            await _respond(send, 413, b"payload too large")
+            return
+        try:
+            payload = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            payload = None
+        if not isinstance(payload, dict):
+            self._bump("bad_requests", path.strip("/"))
+            await _respond(send, 400, b"bad request")
+            return
+        headers = {name.lower(): value for name, value in scope.get("headers", [])}
+        status, response = handler(headers, payload)
+        await _respond(send, status, response)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _accept(self, platform: str, update_id: Any, raw: Dict[str, Any], mapper: Callable[[Dict[str, Any]], IncomingEvent]) -> int:
+        """Общий путь после проверки секрета: dedupe -> маппинг -> очередь. Возвращает HTTP-статус."""
+        key = f"{platform}:{update_id}" if update_id is not None else None
+        if key is not None and not self.dedup.add(key):
+            self._bump("duplicates", platform)
+            return 200
+        try:
+            event = mapper(raw)
+        except ValueError as exc:
+            # Апдейт не про сообщение (реакции, вступления и т.п.) — подтверждаем и забываем.
+            self._bump("ignored", platform)
+            logger.debug("Пропуск вебхука %s: %s", platform, exc)
+            return 200
+        if not self.submit(event):
+            if key is not None:
+                self.dedup.discard(key)
+            self._bump("rejected", platform)
+            return 503
+        self._bump("accepted", platform)
+        return 200
+
+    def _handle_telegram(self, headers: Mapping[bytes, bytes], payload: Dict[str, Any]) -> tuple[int, bytes]:
+        if self.telegram_secret_token is not None:
+            received = headers.get(TELEGRAM_SECRET_HEADER, b"").decode("latin-1")
+            if not hmac.compare_digest(received, self.telegram_secret_token):
+                self._bump("unauthorized", "telegram")
+                return 403, b"forbidden"
+        status = self._accept("telegram", payload.get("update_id"), payload, map_telegram_update)
+        return status, b"ok" if status == 200 else b"busy"
+
+    def _handle_vk(self, headers: Mapping[bytes, bytes], payload: Dict[str, Any]) -> tuple[int, bytes]:
+        if self.vk_group_id is not None:
+            try:
+                group_id = int(payload.get("group_id") or 0)
+            except (TypeError, ValueError):
+                self._bump("bad_requests", "vk")
+                return 400, b"bad request"
+            if group_id != self.vk_group_id:
+                self._bump("unauthorized", "vk")
+                return 403, b"forbidden"
+        if payload.get("type") == "confirmation":
+            return 200, (self.vk_confirmation_token or "").encode("utf-8")
+        if self.vk_secret is not None and not hmac.compare_digest(str(payload.get("secret") or ""), self.vk_secret):
+            self._bump("unauthorized", "vk")
+            return 403, b"forbidden"
+        status = self._accept("vk", payload.get("event_id"), payload, map_vk_event)
+        # VK Callback API повторяет доставку, пока не получит ровно "ok".
+        return status, b"ok" if status == 200 else b"busy"
+
+
+async def _read_body(receive: Receive, limit: int) -> bytes | None:
+    chunks: list[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _respond(send: Send, status: int, body: bytes, content_type: bytes = b"text/plain; charset=utf-8") -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode("ascii"))],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -2,30 +2,207 @@
 
 from __future__ import annotations
 
+import math
+import threading
 from collections import defaultdict
 from dataclasses import dataclass, field
-from statistics import quantiles
-from time import perf_counter
-from typing import Any, Dict
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, List
+
+
+class StreamingHistogram:
+    """Гистограмма с логарифмическими бакетами фиксированного числа (HDR-style).
+
+    Память не зависит от числа наблюдений; относительная ошибка квантиля ~ (growth - 1) / 2.
+    """
+
+    __slots__ = ("min_value", "growth", "_log_growth", "counts", "count", "total", "min", "max")
+
+    def __init__(self, min_value: float = 1e-5, max_value: float = 3600.0, growth: float = 1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * (int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(len(self.counts) - 1, 1 + int(math.log(value / self.min_value) / self._log_growth))
+
+    def record(self, value: float) -> None:
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def copy(self) -> "StreamingHistogram":
+        clone = StreamingHistogram.__new__(StreamingHistogram)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        clone.counts = list(self.counts)
+        return clone
+
+    def bucket_upper_bound(self, idx: int) -> float:
+        return self.min_value * (self.growth**idx)
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """Несколько квантилей за один проход по бакетам: O(buckets)."""
+        targets = list(qs)
+        if self.count == 0:
+            return [0.0 for _ in targets]
+        if self.count == 1:
+            return [self.min for _ in targets]
+        order = sorted(range(len(targets)), key=lambda i: targets[i])
+        result = [0.0] * len(targets)
+        cumulative = 0
+        pos = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            cumulative += bucket_count
+            while pos < len(order) and cumulative > targets[order[pos]] * (self.count - 1):
+                upper = self.bucket_upper_bound(idx)
+                estimate = math.sqrt(upper * upper / self.growth) if idx else self.min_value
+                result[order[pos]] = min(self.max, max(self.min, estimate))
+                pos += 1
+            if pos == len(order):
+                break
+        return result
+
+    def cumulative_counts(self, bounds: Iterable[float]) -> List[int]:
+        """Кумулятивные счётчики для внешних границ (`le`), например для OpenMetrics."""
+        sorted_bounds = list(bounds)
+        result: List[int] = []
+        cumulative = 0
+        idx = 0
+        for bound in sorted_bounds:
+            while idx < len(self.counts) and self.bucket_upper_bound(idx) <= bound:
+                cumulative += self.counts[idx]
+                idx += 1
+            result.append(cumulative)
+        return result
+
+
+class RateWindow:
+    """Скользящее окно счётчика из кольца слотов фиксированного размера."""
+
+    __slots__ = ("slot_seconds", "slots", "counts", "stamps")
+
+    def __init__(self, window_seconds: float = 60.0, slots: int = 12):
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self.counts = [0.0] * slots
+        self.stamps = [-1] * slots
+
+    def add(self, value: float, now: float) -> None:
+        stamp = int(now // self.slot_seconds)
+        pos = stamp % self.slots
+        if self.stamps[pos] != stamp:
+            self.stamps[pos] = stamp
+            self.counts[pos] = 0.0
+        self.counts[pos] += value
+
+    def rate_per_second(self, now: float) -> float:
+        oldest = int(now // self.slot_seconds) - self.slots + 1
+        total = sum(count for count, stamp in zip(self.counts, self.stamps) if stamp >= oldest)
+        return total / (self.slot_seconds * self.slots)
+
+
+class RequestTrace:
+    """Компактная трасса одного запроса: длительности стадий, токены и стоимость."""
+
+    __slots__ = ("trace_id", "started", "stages", "tokens", "cost_usd")
+
+    def __init__(self, trace_id: str | None = None) -> None:
+        self.trace_id = trace_id
+        self.started = perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {}
+        self.cost_usd = 0.0
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_usage(self, usage: Dict[str, Any] | None) -> None:
+        if not usage:
+            return
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            try:
+                self.tokens[key] = self.tokens.get(key, 0) + int(usage.get(key, 0) or 0)
+            except (TypeError, ValueError):
+                continue
+        try:
+            self.cost_usd += float(usage.get("cost_usd", 0.0) or 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "total_seconds": round(perf_counter() - self.started, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "tokens": dict(self.tokens),
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class _Timer:
+    __slots__ = ("collector", "metric_name", "stage", "platform", "trace", "start")
+
+    def __init__(
+        self,
+        collector: "MetricsCollector",
+        metric_name: str,
+        stage: str | None,
+        platform: str | None,
+        trace: RequestTrace | None = None,
+    ):
+        self.collector = collector
+        self.metric_name = metric_name
+        self.stage = stage
+        self.platform = platform
+        self.trace = trace
+
+    def __enter__(self) -> "_Timer":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = perf_counter() - self.start
+        self.collector.observe(self.metric_name, elapsed, stage=self.stage, platform=self.platform)
+        if self.trace is not None:
+            self.trace.add_stage(self.stage or self.metric_name, elapsed)
 
 
 @dataclass
 class MetricsCollector:
-    """Лёгкий in-memory сборщик метрик для отладки и мониторинга."""
+    """Лёгкий in-memory сборщик метрик для отладки и мониторинга (фиксированная память на серию)."""
 
     counters: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
     scoped_counters: Dict[str, Dict[str, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
-    timings: Dict[str, Dict[str, float]] = field(default_factory=lambda: defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0}))
-    timing_samples: Dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
-    stage_platform_timings: Dict[str, Dict[str, list[float]]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(list)))
+    timings: Dict[str, StreamingHistogram] = field(default_factory=lambda: defaultdict(StreamingHistogram))
+    stage_platform_timings: Dict[str, Dict[str, StreamingHistogram]] = field(
+        default_factory=lambda: defaultdict(lambda: defaultdict(StreamingHistogram))
+    )
+    counter_rates: Dict[str, RateWindow] = field(default_factory=lambda: defaultdict(RateWindow))
     token_usage: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
     scoped_token_usage: Dict[str, Dict[str, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
     stage_platform_token_cost_usd: Dict[str, Dict[str, float]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(float)))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
     def inc(self, key: str, value: int = 1, scope: str | None = None) -> None:
-        self.counters[key] += value
-        if scope:
-            self.scoped_counters[scope][key] += value
+        with self._lock:
+            self.counters[key] += value
+            self.counter_rates[key].add(value, monotonic())
+            if scope:
+                self.scoped_counters[scope][key] += value
 
     def record_tokens(self, usage: Dict[str, Any] | None, scope: str | None = None) -> None:
         if not usage:
@@ -36,9 +213,10 @@ class MetricsCollector:
                 amount = int(raw)
             except (TypeError, ValueError):
                 continue
-            self.token_usage[key] += amount
-            if scope:
-                self.scoped_token_usage[scope][key] += amount
+            with self._lock:
+                self.token_usage[key] += amount
+                if scope:
+                    self.scoped_token_usage[scope][key] += amount
 
     def record_token_cost(self, amount_usd: float | int | str, *, stage: str, platform: str) -> None:
         try:
@@ -47,41 +225,24 @@ class MetricsCollector:
             return
         if amount < 0:
             return
-        self.stage_platform_token_cost_usd[stage][platform] += amount
-
-    def time_block(self, metric_name: str, *, stage: str | None = None, platform: str | None = None):
-        collector = self
-
-        class _Timer:
-            def __enter__(self):
-                self.start = perf_counter()
-                return self
-
-            def __exit__(self, exc_type, exc, tb):
-                elapsed = perf_counter() - self.start
-                bucket = collector.timings[metric_name]
-                bucket["count"] += 1
-                bucket["total"] += elapsed
-                bucket["max"] = max(bucket["max"], elapsed)
-                collector.timing_samples[metric_name].append(elapsed)
-                if stage and platform:
-                    collector.stage_platform_timings[stage][platform].append(elapsed)
-
-        return _Timer()
-
-    @staticmethod
-    def _percentile(data: list[float], percentile: float) -> float:
-        if not data:
-            return 0.0
-        if len(data) == 1:
-            return data[0]
-        if percentile == 50:
-            qs = quantiles(data, n=2, method="inclusive")
-            return qs[0]
-        if percentile == 95:
-            qs = quantiles(data, n=100, method="inclusive")
-            return qs[94]
-        raise ValueError(f"Unsupported percentile: {percentile}")
+        with self._lock:
+            self.stage_platform_token_cost_usd[stage][platform] += amount
+
+    def observe(self, metric_name: str, seconds: float, *, stage: str | None = None, platform: str | None = None) -> None:
+        with self._lock:
+            self.timings[metric_name].record(seconds)
+            if stage and platform:
+                self.stage_platform_timings[stage][platform].record(seconds)
+
+    def time_block(
+        self,
+        metric_name: str,
+        *,
+        stage: str | None = None,
+        platform: str | None = None,
+        trace: RequestTrace | None = None,
+    ) -> _Timer:
+        return _Timer(self, metric_name, stage, platform, trace)
 
     def _build_stage_platform_series(self) -> Dict[str, Any]:
         result: Dict[str, Any] = {}
@@ -90,19 +251,34 @@ class MetricsCollector:
             stage_item: Dict[str, Any] = {}
             platforms = set(self.stage_platform_timings.get(stage, {})) | set(self.stage_platform_token_cost_usd.get(stage, {}))
             for platform in platforms:
-                samples = self.stage_platform_timings.get(stage, {}).get(platform, [])
-                count = len(samples)
-                avg = (sum(samples) / count) if count else 0.0
+                histogram = self.stage_platform_timings.get(stage, {}).get(platform)
+                count = histogram.count if histogram else 0
+                p50, p95 = histogram.quantiles((0.5, 0.95)) if histogram else (0.0, 0.0)
                 stage_item[platform] = {
                     "count": count,
-                    "avg_seconds": round(avg, 4),
-                    "p50_seconds": round(self._percentile(samples, 50), 4),
-                    "p95_seconds": round(self._percentile(samples, 95), 4),
+                    "avg_seconds": round(histogram.total / count, 4) if count else 0.0,
+                    "p50_seconds": round(p50, 4),
+                    "p95_seconds": round(p95, 4),
                     "token_cost_usd": round(self.stage_platform_token_cost_usd.get(stage, {}).get(platform, 0.0), 6),
                 }
             result[stage] = stage_item
         return result
 
+    def export_series(self) -> Dict[str, Any]:
+        """Согласованная копия сырых серий (счётчики и гистограммы) для экспортёров."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "scoped_counters": {scope: dict(items) for scope, items in self.scoped_counters.items()},
+                "token_usage": dict(self.token_usage),
+                "scoped_token_usage": {scope: dict(items) for scope, items in self.scoped_token_usage.items()},
+                "token_cost_usd": {stage: dict(items) for stage, items in self.stage_platform_token_cost_usd.items()},
+                "timings": {metric: histogram.copy() for metric, histogram in self.timings.items()},
+                "stage_platform_timings": {
+                    stage: {platform: histogram.copy() for platform, histogram in items.items()}
+                    for stage, items in self.stage_platform_timings.items()
+                },
+            }
 
     def respond_rate_alert(self, responded: int, total: int, target_rate: float = 0.2, tolerance: float = 0.05) -> Dict[str, Any] | None:
         if total <= 0:
@@ -123,28 +299,33 @@ class MetricsCollector:
         }
 
     def snapshot(self) -> Dict[str, Any]:
-        avg_timings = {}
-        for metric, values in self.timings.items():
-            count = values["count"] or 1
-            avg_timings[metric] = {
-                "count": int(values["count"]),
-                "avg_seconds": round(values["total"] / count, 4),
-                "max_seconds": round(values["max"], 4),
-            }
-        return {
-            "global": {
-                "counters": dict(self.counters),
-                "token_usage": dict(self.token_usage),
-            },
-            "scope": {
-                scope: {
-                    "counters": dict(counters),
-                    "token_usage": dict(self.scoped_token_usage.get(scope, {})),
+        with self._lock:
+            now = monotonic()
+            avg_timings = {}
+            for metric, histogram in self.timings.items():
+                count = histogram.count or 1
+                p95 = histogram.quantiles((0.95,))[0]
+                avg_timings[metric] = {
+                    "count": int(histogram.count),
+                    "avg_seconds": round(histogram.total / count, 4),
+                    "max_seconds": round(histogram.max, 4),
+                    "p95_seconds": round(p95, 4),
                 }
-                for scope, counters in self.scoped_counters.items()
-            },
-            "timings": avg_timings,
-            "series": {
-                "stage_platform": self._build_stage_platform_series(),
-            },
-        }
+            return {
+                "global": {
+                    "counters": dict(self.counters),
+                    "token_usage": dict(self.token_usage),
+                    "rates_per_second": {key: round(window.rate_per_second(now), 4) for key, window in self.counter_rates.items()},
+                },
+                "scope": {
+                    scope: {
+                        "counters": dict(counters),
+                        "token_usage": dict(self.scoped_token_usage.get(scope, {})),
+                    }
+                    for scope, counters in self.scoped_counters.items()
+                },
+                "timings": avg_timings,
+                "series": {
+                    "stage_platform": self._build_stage_platform_series(),
+                },
+            }
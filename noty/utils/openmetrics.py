@@ -0,0 +1,161 @@
+"""Экспорт MetricsCollector в текстовый формат OpenMetrics (Prometheus)."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Tuple
+
+from noty.utils.metrics import MetricsCollector, StreamingHistogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+OVERFLOW_SCOPE = "other"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return "{" + body + "}" if body else ""
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _fold_scopes(scoped: Dict[str, Dict[str, int]], max_scopes: int) -> Dict[str, Dict[str, int]]:
+    """Оставляет top-N скоупов по объёму этой же серии, остальные сворачивает в ``scope="other"``."""
+    if len(scoped) <= max_scopes:
+        return scoped
+    weights = {scope: sum(items.values()) for scope, items in scoped.items()}
+    keep = set(sorted(weights, key=lambda scope: (-weights[scope], scope))[:max_scopes])
+    folded: Dict[str, Dict[str, int]] = {}
+    for scope, items in scoped.items():
+        target = scope if scope in keep else OVERFLOW_SCOPE
+        bucket = folded.setdefault(target, {})
+        for key, value in items.items():
+            bucket[key] = bucket.get(key, 0) + value
+    return folded
+
+
+class _Writer:
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> str:
+        full = f"{self.prefix}_{name}"
+        self.lines.append(f"# TYPE {full} {kind}")
+        self.lines.append(f"# HELP {full} {help_text}")
+        return full
+
+    def sample(self, name: str, labels: Iterable[Tuple[str, str]], value: float) -> None:
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, labels: List[Tuple[str, str]], histogram: StreamingHistogram, buckets: Tuple[float, ...]) -> None:
+        for bound, cumulative in zip(buckets, histogram.cumulative_counts(buckets)):
+            self.sample(f"{name}_bucket", labels + [("le", repr(float(bound)))], cumulative)
+        self.sample(f"{name}_bucket", labels + [("le", "+Inf")], histogram.count)
+        self.sample(f"{name}_count", labels, histogram.count)
+        self.sample(f"{name}_sum", labels, histogram.total)
+
+
+def render_openmetrics(
+    collector: MetricsCollector,
+    *,
+    prefix: str = "noty",
+    max_scopes: int = 50,
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+) -> str:
+    """Текст OpenMetrics: счётчики, гистограммы задержек, токены и стоимость.
+
+    Число скоупов (чатов) ограничено ``max_scopes``: хвост сворачивается в ``scope="other"``,
+    чтобы число серий не росло вместе с числом чатов.
+    """
+    series = collector.export_series()
+    writer = _Writer(prefix)
+
+    name = writer.family("events", "counter", "Счётчики событий пайплайна.")
+    for key, value in sorted(series["counters"].items()):
+        writer.sample(f"{name}_total", [("name", key)], value)
+
+    name = writer.family("scope_events", "counter", "Счётчики событий по скоупам (top-N, остальные в other).")
+    for scope, items in sorted(_fold_scopes(series["scoped_counters"], max_scopes).items()):
+        for key, value in sorted(items.items()):
+            writer.sample(f"{name}_total", [("scope", scope), ("name", key)], value)
+
+    name = writer.family("tokens", "counter", "Потреблённые токены LLM.")
+    for kind, value in sorted(series["token_usage"].items()):
+        writer.sample(f"{name}_total", [("kind", kind)], value)
+
+    name = writer.family("scope_tokens", "counter", "Потреблённые токены LLM по скоупам (top-N, остальные в other).")
+    for scope, items in sorted(_fold_scopes(series["scoped_token_usage"], max_scopes).items()):
+        for kind, value in sorted(items.items()):
+            writer.sample(f"{name}_total", [("scope", scope), ("kind", kind)], value)
+
+    name = writer.family("token_cost_usd", "counter", "Стоимость токенов в USD по стадиям и платформам.")
+    for stage, items in sorted(series["token_cost_usd"].items()):
+        for platform, value in sorted(items.items()):
+            writer.sample(f"{name}_total", [("stage", stage), ("platform", platform)], value)
+
+    name = writer.family("timing_seconds", "histogram", "Длительность измеряемых блоков.")
+    for metric, histogram in sorted(series["timings"].items()):
+        writer.histogram(name, [("metric", metric)], histogram, buckets)
+
+    name = writer.family("stage_seconds", "histogram", "Длительность стадий по платформам.")
+    for stage, items in sorted(series["stage_platform_timings"].items()):
+        for platform, histogram in sorted(items.items()):
+            writer.histogram(name, [("stage", stage), ("platform", platform)], histogram, buckets)
+
+    writer.lines.append("# EOF")
+    return "\n".join(writer.lines) + "\n"
+
+
+class MetricsHTTPServer:
+    """Отдельный HTTP-сервер `/metrics` в фоновом потоке (без FastAPI)."""
+
+    def __init__(self, collector: MetricsCollector, host: str = "127.0.0.1", port: int = 9464, max_scopes: int = 50):
+        self.collector = collector
+        self.max_scopes = max_scopes
+        self.logger = logging.getLogger(__name__)
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - имя задано BaseHTTPRequestHandler
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = render_openmetrics(exporter.collector, max_scopes=exporter.max_scopes).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                exporter.logger.debug("metrics http: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> "MetricsHTTPServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="noty-metrics-http")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
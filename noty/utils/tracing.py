@@ -0,0 +1,284 @@
+"""Лёгкий трейсинг пайплайна: вложенные спаны, trace id из транспорта, JSONL/OTLP экспорт."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import urllib.request
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from time import time_ns
+from typing import Any, Callable, Dict, List, Mapping, Protocol
+
+
+def new_trace_id() -> str:
+    """128-битный trace id в hex (совместим с W3C/OTLP)."""
+    return uuid.uuid4().hex
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status", "_trace", "_token")
+
+    def __init__(self, trace: "_TraceState", name: str, parent_id: str | None, attributes: Dict[str, Any]):
+        self.trace_id = trace.trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = 0
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "ok"
+        self._trace = trace
+        self._token: Any = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time_ns()
+        self._token = _CURRENT_SPAN.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time_ns()
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error.type"] = exc_type.__name__
+        _CURRENT_SPAN.reset(self._token)
+        self._trace.finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Спан-заглушка для несэмплированных трасс: ни аллокаций, ни часов."""
+
+    __slots__ = ()
+    trace_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+_CURRENT_SPAN: ContextVar[Span | None] = ContextVar("noty_current_span", default=None)
+
+
+class _TraceState:
+    __slots__ = ("trace_id", "root", "spans", "exporter")
+
+    def __init__(self, trace_id: str, exporter: "SpanExporter"):
+        self.trace_id = trace_id
+        self.root: Span | None = None
+        self.spans: List[Span] = []
+        self.exporter = exporter
+
+    def finish(self, span: Span) -> None:
+        self.spans.append(span)
+        if span is self.root:
+            self.exporter.export(self.spans)
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: List[Span]) -> None:
+        ...
+
+
+class JSONLSpanExporter:
+    """Одна строка JSONL на завершённую трассу (все её спаны)."""
+
+    def __init__(self, path: str = "./noty/data/logs/traces/spans.jsonl"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        line = json.dumps({"trace_id": spans[0].trace_id, "spans": [span.to_dict() for span in spans]}, ensure_ascii=False, default=str)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+
+def _otlp_id(value: str, hex_length: int) -> str:
+    try:
+        if len(value) == hex_length:
+            int(value, 16)
+            return value
+    except ValueError:
+        pass
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=hex_length // 2).hexdigest()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHTTPSpanExporter:
+    """OTLP/HTTP JSON экспорт в локальный коллектор; отправка в фоновом потоке, при переполнении очереди трассы отбрасываются."""
+
+    def __init__(
+        self,
+        endpoint: str = "http://127.0.0.1:4318/v1/traces",
+        service_name: str = "noty",
+        timeout_seconds: float = 2.0,
+        max_queue: int = 256,
+        post: Callable[[str, bytes, float], None] | None = None,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout_seconds = timeout_seconds
+        self.dropped = 0
+        self._post = post or self._http_post
+        self._queue: queue.Queue[List[Span]] = queue.Queue(maxsize=max_queue)
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _http_post(endpoint: str, body: bytes, timeout_seconds: float) -> None:
+        request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout_seconds) as response:
+            response.read()
+
+    def build_payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "noty"},
+                            "spans": [
+                                {
+                                    "traceId": _otlp_id(span.trace_id, 32),
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(span.start_ns),
+                                    "endTimeUnixNano": str(span.end_ns),
+                                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                                    "status": {"code": 2 if span.status == "error" else 1},
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(list(spans))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout_seconds: float = 5.0) -> None:
+        if self._worker is None:
+            return
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout_seconds)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name="noty-otlp-exporter")
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                body = json.dumps(self.build_payload(spans), default=str).encode("utf-8")
+                self._post(self.endpoint, body, self.timeout_seconds)
+            except Exception as exc:  # noqa: BLE001 - экспорт трасс не должен ронять бота
+                self.logger.debug("OTLP экспорт не удался: %s", exc)
+            finally:
+                self._queue.task_done()
+
+
+class _NullExporter:
+    def export(self, spans: List[Span]) -> None:
+        return None
+
+
+class Tracer:
+    """Сэмплирующий трейсер: решение принимается один раз на трассу (head sampling).
+
+    Несэмплированные сообщения получают ``NOOP_SPAN`` на всех уровнях, поэтому накладные
+    расходы сводятся к чтению contextvar.
+    """
+
+    def __init__(self, exporter: SpanExporter | None = None, sample_rate: float = 1.0, rng: Callable[[], float] = random.random):
+        self.exporter = exporter or _NullExporter()
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.rng = rng
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any] | None) -> "Tracer":
+        cfg = config or {}
+        if not cfg.get("enabled", False):
+            return cls(sample_rate=0.0)
+        exporter_name = str(cfg.get("exporter", "jsonl")).lower()
+        if exporter_name == "otlp":
+            exporter: SpanExporter = OTLPHTTPSpanExporter(
+                endpoint=cfg.get("otlp_endpoint", "http://127.0.0.1:4318/v1/traces"),
+                service_name=cfg.get("service_name", "noty"),
+            )
+        else:
+            exporter = JSONLSpanExporter(cfg.get("path", "./noty/data/logs/traces/spans.jsonl"))
+        return cls(exporter=exporter, sample_rate=float(cfg.get("sample_rate", 0.05)))
+
+    def start_trace(self, name: str, trace_id: str | None = None, **attributes: Any) -> Span | _NoopSpan:
+        """Корневой спан сообщения; trace id берётся из транспортного события, если он есть."""
+        if self.sample_rate <= 0.0 or (self.sample_rate < 1.0 and self.rng() >= self.sample_rate):
+            return NOOP_SPAN
+        state = _TraceState(trace_id or new_trace_id(), self.exporter)
+        span = Span(state, name, None, attributes)
+        state.root = span
+        return span
+
+    def span(self, name: str, **attributes: Any) -> Span | _NoopSpan:
+        """Дочерний спан текущей трассы; вне сэмплированной трассы — заглушка."""
+        parent = _CURRENT_SPAN.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(parent._trace, name, parent.span_id, attributes)
@@ -1,6 +1,11 @@
+import threading
+import time
 from types import SimpleNamespace
 
-from noty.core.api_rotator import APIRotator
+import pytest
+
+from noty.core.api_rotator import APIRotator, LLMCallPolicy, ProviderTier
+from noty.core.key_scheduler import KeyScheduler
 
 
 def _response(content: str = "ok"):
@@ -26,7 +31,6 @@ def test_api_rotator_switches_on_error_and_recovers():
     assert out1["content"] == "k2"
     assert calls[:2] == ["k1", "k2"]
 
-    rotator.degraded_keys["k1"] = 0
     out2 = rotator.call(messages=[{"role": "user", "content": "again"}])
     assert out2["content"] in {"k1", "k2"}
     assert rotator.get_stats()["key_stats"]["k1"]["errors"] >= 1
@@ -45,3 +49,220 @@ def test_api_rotator_skips_referer_when_not_provided():
     rotator = APIRotator(api_keys=["k1"], app_referer=None, app_title="Noty")
 
     assert rotator._build_default_headers() == {"X-Title": "Noty"}
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("Error code: 429 - rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+def test_key_scheduler_prefers_lowest_ewma_latency():
+    scheduler = KeyScheduler(["k1", "k2"])
+    scheduler.record_success("k1", 900.0)
+    scheduler.record_success("k2", 100.0)
+
+    picks = []
+    for _ in range(4):
+        key = scheduler.acquire()
+        picks.append(key)
+        scheduler.release(key)
+
+    assert picks == ["k2"] * 4
+    assert scheduler.stats()["k2"]["ewma_latency_ms"] == 100.0
+
+
+def test_key_scheduler_circuit_opens_and_half_open_probe_closes_it():
+    clock = _FakeClock()
+    scheduler = KeyScheduler(["k1", "k2"], failure_threshold=2, base_cooldown_seconds=10.0, clock=clock)
+    scheduler.record_failure("k1")
+    scheduler.record_failure("k1")
+    assert scheduler.open_keys() == ["k1"]
+
+    assert scheduler.acquire() == "k2"
+    scheduler.release("k2")
+
+    clock.now += 11.0
+    scheduler.record_success("k2", 5000.0)
+    probe = scheduler.acquire()
+    assert probe == "k1"
+    assert scheduler.stats()["k1"]["state"] == "half_open"
+    assert scheduler.acquire() == "k2"
+    scheduler.release("k2")
+
+    scheduler.record_success("k1", 50.0)
+    scheduler.release("k1")
+    assert scheduler.stats()["k1"]["state"] == "closed"
+
+
+def test_key_scheduler_fallback_prefers_open_circuit_over_failed_key():
+    clock = _FakeClock()
+    scheduler = KeyScheduler(["bad", "k2"], failure_threshold=1, base_cooldown_seconds=10.0, clock=clock)
+    scheduler.record_failure("bad", permanent=True)
+    scheduler.record_failure("k2")
+
+    # k2 временно закрыт, но лучше отозванного ключа.
+    assert scheduler.acquire() == "k2"
+    scheduler.release("k2")
+    assert "bad" in scheduler.failed_keys
+
+    scheduler.record_failure("k2", permanent=True)
+    assert scheduler.acquire() in {"bad", "k2"}
+    assert scheduler.failed_keys == set()
+
+
+def test_api_rotator_honors_retry_after_on_429():
+    clock = _FakeClock()
+    rotator = APIRotator(api_keys=["k1", "k2"], scheduler=KeyScheduler(["k1", "k2"], clock=clock))
+    calls = []
+
+    def fake_call(api_key: str, call_params):
+        calls.append(api_key)
+        if api_key == "k1":
+            raise _RateLimitError(retry_after="42")
+        return _response(content=api_key)
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+
+    assert rotator.call(messages=[{"role": "user", "content": "hi"}])["content"] == "k2"
+    stats = rotator.get_stats()
+    assert stats["degraded_keys"] == ["k1"]
+    assert stats["key_stats"]["k1"]["reopens_in_seconds"] == 42.0
+
+    clock.now += 43.0
+    rotator.scheduler.health["k2"].ewma_latency_ms = 10_000.0
+    rotator._call_backend = lambda api_key, call_params: _response(content=api_key)  # type: ignore[method-assign]
+    assert rotator.call(messages=[{"role": "user", "content": "again"}])["content"] == "k1"
+    assert rotator.get_stats()["degraded_keys"] == []
+
+
+class _ForbiddenError(Exception):
+    status_code = 403
+
+    def __init__(self):
+        super().__init__("Error code: 403 - key disabled")
+
+
+def test_api_rotator_marks_forbidden_key_as_permanently_failed():
+    rotator = APIRotator(api_keys=["k1", "k2"], scheduler=KeyScheduler(["k1", "k2"], clock=_FakeClock()))
+
+    def fake_call(api_key: str, call_params):
+        if api_key == "k1":
+            raise _ForbiddenError()
+        return _response(content=api_key)
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+
+    assert rotator.call(messages=[{"role": "user", "content": "hi"}])["content"] == "k2"
+    assert rotator.scheduler.failed_keys == {"k1"}
+    assert rotator.scheduler.open_keys() == []
+
+
+def test_key_scheduler_spreads_concurrent_callers_by_in_flight():
+    scheduler = KeyScheduler(["k1", "k2", "k3"])
+    held = [scheduler.acquire() for _ in range(3)]
+
+    assert sorted(held) == ["k1", "k2", "k3"]
+    assert all(item["in_flight"] == 1 for item in scheduler.stats().values())
+
+
+def test_api_rotator_hedges_slow_key_and_returns_first_result():
+    rotator = APIRotator(api_keys=["slow", "fast"])
+    release_slow = threading.Event()
+
+    def fake_call(api_key: str, call_params):
+        if api_key == "slow":
+            release_slow.wait(timeout=2.0)
+        return _response(content=api_key)
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+    policy = LLMCallPolicy(hedge=True, default_hedge_delay_seconds=0.05, deadline_seconds=1.0)
+
+    started = time.monotonic()
+    out = rotator.call(messages=[{"role": "user", "content": "hi"}], policy=policy)
+    release_slow.set()
+
+    assert out["content"] == "fast"
+    assert time.monotonic() - started < 1.0
+    assert rotator.get_stats()["hedging"] == {"fired": 1, "won": 1, "deadline_exceeded": 0}
+
+
+def test_api_rotator_deadline_caps_total_retry_time():
+    rotator = APIRotator(api_keys=["k1", "k2"])
+    hang = threading.Event()
+    seen_timeouts = []
+
+    def fake_call(api_key: str, call_params):
+        seen_timeouts.append(call_params["timeout"])
+        hang.wait(timeout=1.0)
+        return _response(content=api_key)
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="Дедлайн"):
+        rotator.call(messages=[{"role": "user", "content": "hi"}], policy=LLMCallPolicy(deadline_seconds=0.1))
+    hang.set()
+
+    assert time.monotonic() - started < 0.5
+    assert seen_timeouts and seen_timeouts[0] <= 0.1
+    assert rotator.get_stats()["hedging"]["deadline_exceeded"] == 1
+
+
+def test_api_rotator_fails_over_to_local_tier_with_its_own_model():
+    primary = ProviderTier(name="openrouter", api_keys=["k1"], scheduler=KeyScheduler(["k1"], failure_threshold=1))
+    local = ProviderTier(name="local", base_url="http://127.0.0.1:8080/v1", model="local-model")
+    rotator = APIRotator(api_keys=["k1"], tiers=[primary, local])
+    calls = []
+
+    def fake_call(api_key: str, call_params):
+        calls.append((api_key, call_params["base_url"], call_params["model"]))
+        if call_params["base_url"] != "http://127.0.0.1:8080/v1":
+            raise RuntimeError("upstream 502")
+        return _response(content="local")
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+
+    out = rotator.call(messages=[{"role": "user", "content": "hi"}], model="big-model")
+    assert out["content"] == "local"
+    assert out["provider_tier"] == "local"
+    assert calls == [
+        ("k1", "https://openrouter.ai/api/v1", "big-model"),
+        ("sk-local-no-key", "http://127.0.0.1:8080/v1", "local-model"),
+    ]
+
+    rotator.call(messages=[{"role": "user", "content": "again"}])
+    tiers = rotator.get_stats()["tiers"]
+    assert tiers["openrouter"]["failovers"] == 1
+    assert tiers["openrouter"]["skipped_open"] == 1
+    assert tiers["local"]["calls"] == 2
+
+
+def test_api_rotator_fails_over_when_tier_latency_budget_exceeded():
+    slow = ProviderTier(name="slow", api_keys=["k1"], timeout_seconds=0.05)
+    fast = ProviderTier(name="fast", base_url="http://127.0.0.1:8080/v1")
+    rotator = APIRotator(api_keys=["k1"], tiers=[slow, fast])
+    hang = threading.Event()
+
+    def fake_call(api_key: str, call_params):
+        if api_key == "k1":
+            hang.wait(timeout=1.0)
+        return _response(content=api_key)
+
+    rotator._call_backend = fake_call  # type: ignore[method-assign]
+
+    out = rotator.call(messages=[{"role": "user", "content": "hi"}])
+    hang.set()
+
+    assert out["provider_tier"] == "fast"
+    assert rotator.get_stats()["tiers"]["slow"]["budget_exceeded"] == 1
@@ -0,0 +1,39 @@
+import json
+
+from benchmarks import runner
+
+
+def test_run_benchmarks_quick_filter_produces_json_serializable_stats():
+    report = runner.run_benchmarks(name_filter="HeuristicFilter", quick=True, repeat=2, min_repeat_seconds=0.01, log=lambda _: None)
+
+    stats = report["results"]["bench_filters.HeuristicFilterSuite.time_should_check_embeddings"]
+    assert stats["repeat"] == 2
+    assert stats["number"] >= 1
+    assert 0 < stats["min_seconds"] <= stats["median_seconds"]
+    assert report["meta"]["quick"] is True
+    json.dumps(report)
+
+
+def test_discover_suites_covers_requested_hot_paths():
+    names = {name for name, _ in runner.discover_suites()}
+
+    assert {
+        "bench_filters.HeuristicFilterSuite",
+        "bench_filters.EmbeddingBatchFilterSuite",
+        "bench_context.ContextBuildSuite",
+        "bench_context.RecentDaysMaintenanceSuite",
+        "bench_context.PromptBuildSuite",
+        "bench_pipeline.VKStateStoreSuite",
+        "bench_pipeline.HandleMessageSuite",
+    } <= names
+
+
+def test_compare_results_flags_regressions_over_threshold():
+    baseline = {"results": {"a": {"median_seconds": 1.0}, "b": {"median_seconds": 1.0}}}
+    current = {"results": {"a": {"median_seconds": 1.05}, "b": {"median_seconds": 1.5}, "new": {"median_seconds": 1.0}}}
+
+    rows = {row["benchmark"]: row for row in runner.compare_results(baseline, current, threshold=0.1)}
+
+    assert rows["a"]["regression"] is False
+    assert rows["b"]["regression"] is True
+    assert "new" not in rows
@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.encoders import OnnxEncoderBackend, SentenceTransformerBackend, build_encoder
+from noty.perf.encoder_check import cross_check_encoders
+
+
+class _FakeTokenizer:
+    """Токен = символ; паддинг до самой длинной строки батча."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode_batch(self, texts):
+        self.batches.append(list(texts))
+        width = max(len(text) for text in texts)
+        return [
+            SimpleNamespace(ids=[ord(ch) for ch in text] + [0] * (width - len(text)), attention_mask=[1] * len(text) + [0] * (width - len(text)))
+            for text in texts
+        ]
+
+
+class _FakeSession:
+    """hidden[token] = (id, 1): mean pooling даёт (средний код символа, 1)."""
+
+    def run(self, _outputs, feeds):
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids) * (feeds["attention_mask"] > 0)], axis=-1) + (feeds["attention_mask"][..., None] == 0) * 999.0]
+
+
+def _onnx_backend(batch_size=2, normalize=False):
+    backend = OnnxEncoderBackend(model_dir="/nonexistent", batch_size=batch_size, normalize=normalize)
+    backend._session, backend._tokenizer = _FakeSession(), _FakeTokenizer()
+    return backend
+
+
+def test_build_encoder_selects_backend_from_config():
+    torch_backend = build_encoder({"backend": "sentence_transformers", "model_name": "m", "threads": 2})
+    assert isinstance(torch_backend, SentenceTransformerBackend) and torch_backend.threads == 2
+    assert torch_backend._model is None  # модель не грузится до первого encode
+
+    onnx_backend = build_encoder({"backend": "onnx", "model_name": "org/m", "onnx": {"intra_op_threads": 3, "quantized": True}})
+    assert isinstance(onnx_backend, OnnxEncoderBackend)
+    assert onnx_backend.intra_op_threads == 3 and onnx_backend.model_path.name == "model_int8.onnx"
+    assert onnx_backend.model_id == "org/m@onnx-int8" and onnx_backend.model_dir.name == "m"
+
+    with pytest.raises(ValueError):
+        build_encoder({"backend": "tflite"})
+
+
+def test_onnx_backend_mean_pools_masked_tokens_and_keeps_input_order():
+    backend = _onnx_backend(batch_size=2)
+    texts = ["ccc", "a", "bb", "dddd"]
+    vectors = backend.encode(texts)
+
+    # Паддинг (999) в среднее не попал; порядок строк совпадает со входом.
+    assert np.allclose(vectors[:, 0], [ord("c"), ord("a"), ord("b"), ord("d")])
+    assert np.allclose(vectors[:, 1], 1.0)
+    # Батчи собраны из текстов близкой длины.
+    assert backend._tokenizer.batches == [["a", "bb"], ["ccc", "dddd"]]
+    assert backend.encode("a").shape == (2,)
+
+
+def test_onnx_backend_normalizes_vectors():
+    vectors = _onnx_backend(normalize=True).encode(["ab", "xyz"])
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+
+def test_onnx_backend_explains_missing_model(tmp_path):
+    backend = OnnxEncoderBackend(model_dir=str(tmp_path))
+    with pytest.raises((FileNotFoundError, RuntimeError)):
+        backend.load()
+
+
+class _HashEncoder:
+    def __init__(self, noise=0.0, seed=0):
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.model_id = f"hash-{noise}"
+
+    def encode(self, texts, convert_to_numpy=True, **_):
+        base = np.array([np.random.default_rng(sum(map(ord, text))).normal(size=16) for text in texts])
+        return base + self.rng.normal(scale=self.noise, size=base.shape)
+
+
+def test_cross_check_reports_agreement_and_flags_drift():
+    same = cross_check_encoders(_HashEncoder(), _HashEncoder())
+    assert same["passed"] and same["min_cosine"] == pytest.approx(1.0) and same["topic_agreement"] == 1.0
+
+    drifted = cross_check_encoders(_HashEncoder(), _HashEncoder(noise=2.0, seed=1))
+    assert not drifted["passed"]
+    assert drifted["min_cosine"] < 0.98 and len(drifted["worst"]) == 5
+
+
+def test_embedding_filter_loads_backend_before_encoding(tmp_path):
+    backend = _onnx_backend(normalize=True)
+    loads = []
+    original_load = backend.load
+    backend.load = lambda: loads.append(1) or original_load()
+
+    filt = EmbeddingFilter(cache_path=str(tmp_path), encoder=backend)
+    assert loads and filt.interest_vectors.shape[0] == len(filt.interest_topics)
+    assert filt.is_interesting("ноти, привет", threshold=-1)
+
+
+class _SentenceTransformerLike:
+    """Как SentenceTransformer: ``load`` — staticmethod с обязательным путём."""
+
+    @staticmethod
+    def load(input_path):
+        raise AssertionError(f"load({input_path}) не должен вызываться")
+
+    def encode(self, texts, convert_to_numpy=True, **_):
+        if isinstance(texts, str):
+            return np.array([len(texts), 1.0])
+        return np.array([[len(text), 1.0] for text in texts])
+
+
+def test_embedding_filter_accepts_raw_sentence_transformer_style_encoder(tmp_path):
+    filt = EmbeddingFilter(cache_path=str(tmp_path), encoder=_SentenceTransformerLike())
+    assert filt.ready and filt.interest_vectors.shape == (len(filt.interest_topics), 2)
@@ -0,0 +1,103 @@
+import numpy as np
+
+from noty.core.message_handler import MessageHandler
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.heuristic_filter import HeuristicFilter
+from noty.filters.interest_profiles import InterestProfileRegistry, learn_topics
+
+AXES = {"код": [1.0, 0.0, 0.0], "мемы": [0.0, 1.0, 0.0], "политика": [0.0, 0.0, 1.0]}
+
+
+class AxisEncoder:
+    """Вектор текста — сумма осей ключевых слов из AXES."""
+
+    model_id = "axis"
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text):
+        vector = np.array([0.05, 0.05, 0.05])
+        for word, axis in AXES.items():
+            if word in text:
+                vector += np.array(axis)
+        return vector
+
+    def encode(self, texts, convert_to_numpy=True, **_):
+        self.calls += 1
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.array([self._vector(text) for text in texts])
+
+
+CONFIG = {
+    "default": {"topics": ["мемы", "политика"], "threshold": 0.5},
+    "dev": {"scopes": ["telegram:-100"], "topics": ["код", "мемы"], "threshold": 0.8, "target_rate": 0.05},
+    "vk": {"scopes": ["vk:*"], "threshold": 0.3},
+}
+
+
+def _filter(tmp_path, encoder=None):
+    return EmbeddingFilter(cache_path=str(tmp_path), encoder=encoder or AxisEncoder(), profiles=InterestProfileRegistry.from_config(CONFIG))
+
+
+def test_scopes_resolve_to_profiles():
+    registry = InterestProfileRegistry.from_config(CONFIG)
+    assert registry.profile_for("telegram:-100").name == "dev"
+    assert registry.profile_for("telegram:-100:7").name == "dev"  # тред наследует чат
+    assert registry.profile_for("vk:2000000001").name == "vk"
+    assert registry.profile_for("telegram:-200").name == "default"
+    assert registry.profile_for(None).name == "default"
+    assert registry.profiles["vk"].topics == ("мемы", "политика")  # темы default
+
+
+def test_profiles_share_one_normalized_matrix(tmp_path):
+    filt = _filter(tmp_path)
+    registry = filt.profiles
+    assert registry.topics == ["мемы", "политика", "код"]  # общая тема «мемы» — одна строка
+    assert registry.matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(registry.matrix, axis=1), 1.0)
+
+    assert filt.is_interesting("обсуждаем код", return_score=True, scope="telegram:-100")[2] == "код"
+    _, score, topic = filt.is_interesting("обсуждаем код", return_score=True, scope="telegram:-200")
+    assert topic in {"мемы", "политика"} and score < 0.5
+
+    # Порог профиля: 0.8 в dev, 0.3 в VK.
+    assert filt.is_interesting("мемы и код", scope="vk:1")
+    assert not filt.is_interesting("мемы и код", scope="telegram:-100")
+    rows = filt.batch_filter(["код", "мемы", "погода"], scope="telegram:-100")
+    assert [(row[1], row[3]) for row in rows] == [("код", "код"), ("мемы", "мемы")]
+
+
+def test_profile_vectors_come_from_binary_cache(tmp_path):
+    encoder = AxisEncoder()
+    _filter(tmp_path, encoder)
+    calls = encoder.calls
+    _filter(tmp_path, encoder)
+    assert encoder.calls == calls
+
+
+def test_each_profile_gets_its_own_decider(tmp_path):
+    handler = MessageHandler(
+        context_builder=None,
+        prompt_builder=None,
+        heuristic_filter=HeuristicFilter(pass_probability=1.0),
+        embedding_filter=_filter(tmp_path),
+    )
+    for _ in range(5):
+        handler.decide_reaction("ноти, смотри код", scope="telegram:-100")
+    handler.decide_reaction("ноти, смотри мемы", scope="telegram:-200")
+
+    assert handler.decider_for("telegram:-200") is handler.reaction_decider
+    dev = handler.decider_for("telegram:-100:3")
+    assert dev is handler.profile_deciders["dev"] and dev.target_rate == 0.05
+    stats = handler.get_filter_stats(include_metrics=False)
+    assert stats["profile_deciders"]["dev"]["seen"] == 5.0
+    assert stats["decider"]["seen"] == 1.0
+
+
+def test_learn_topics_picks_representative_messages():
+    texts = ["код падает", "код ревью", "мемы про котов", "смешные мемы", "политика опять", "новости политика"]
+    topics = learn_topics(texts, AxisEncoder().encode(texts), k=3)
+    assert len(topics) == 3
+    assert {next(word for word in AXES if word in topic) for topic in topics} == set(AXES)
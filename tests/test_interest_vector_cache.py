@@ -0,0 +1,68 @@
+import numpy as np
+
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.vector_cache import InterestVectorStore, open_vectors, write_vectors
+
+
+class CountingEncoder:
+    model_id = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True, **_):
+        self.calls += 1
+        if isinstance(texts, str):
+            return np.array([float(len(texts)), 1.0])
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_roundtrip_is_memory_mapped_and_validated_by_header(tmp_path):
+    path = tmp_path / "vectors.npv"
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    write_vectors(path, vectors, "m1", ["a", "b", "c"])
+
+    loaded = open_vectors(path, "m1", ["a", "b", "c"])
+    assert isinstance(loaded, np.memmap) and not loaded.flags.writeable
+    assert np.array_equal(loaded, vectors)
+    assert open_vectors(path, "m2", ["a", "b", "c"]) is None
+    assert open_vectors(path, "m1", ["a", "b"]) is None
+
+
+def test_store_recomputes_on_model_change_and_broken_files(tmp_path):
+    encoder = CountingEncoder()
+    topics = ["политика", "мемы"]
+    store = InterestVectorStore(tmp_path, "fake-model", encoder.encode)
+    first = store.get(topics)
+    assert encoder.calls == 1 and store.get(topics) is first
+
+    # Новый процесс с той же моделью — только memmap, без encoder-а.
+    assert np.array_equal(InterestVectorStore(tmp_path, "fake-model", encoder.encode).get(topics), first)
+    assert encoder.calls == 1
+
+    other_model = InterestVectorStore(tmp_path, "other-model", encoder.encode)
+    other_model.get(topics)
+    assert encoder.calls == 2 and other_model.recomputed == 1
+
+    path = store.path_for(topics)
+    path.write_bytes(path.read_bytes()[:-4])  # обрезанный файл
+    fresh = InterestVectorStore(tmp_path, "other-model", encoder.encode)
+    assert fresh.get(topics).shape == (2, 2) and encoder.calls == 3
+
+    path.write_bytes(b"\x80\x04pickle")  # старый/чужой формат не десериализуется
+    assert InterestVectorStore(tmp_path, "other-model", encoder.encode).get(topics).shape == (2, 2)
+    assert encoder.calls == 4
+
+
+def test_embedding_filter_shares_cache_between_instances_and_topic_sets(tmp_path):
+    encoder = CountingEncoder()
+    EmbeddingFilter(cache_path=str(tmp_path), encoder=encoder)
+    second = EmbeddingFilter(cache_path=str(tmp_path), encoder=encoder)
+    assert encoder.calls == 1
+    assert isinstance(second.interest_vectors, np.memmap)
+
+    chat_topics = ["настолки", "котики"]
+    assert second.topic_vectors(chat_topics).shape == (2, 2)
+    assert EmbeddingFilter(cache_path=str(tmp_path), encoder=encoder).topic_vectors(chat_topics).shape == (2, 2)
+    assert encoder.calls == 2
+    assert len(list(tmp_path.glob("interest-*.npv"))) == 2
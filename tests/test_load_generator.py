@@ -0,0 +1,94 @@
+import json
+import random
+import time
+import urllib.request
+
+import pytest
+
+from noty import cli
+from noty.perf.fake_openrouter import FakeOpenRouterServer, parse_latency_spec
+from noty.perf.harness import resolve_subsystems, synthetic_events
+from noty.perf.loadgen import LoadGenerator, route_events, run_load
+
+
+def test_parse_latency_spec_supports_distributions():
+    rng = random.Random(0)
+
+    assert parse_latency_spec("fixed:50")(rng) == pytest.approx(0.05)
+    assert 0.02 <= parse_latency_spec("uniform:20:80")(rng) <= 0.08
+    assert parse_latency_spec("lognormal:100:0.5")(rng) > 0
+    assert parse_latency_spec("exp:10")(rng) >= 0
+    with pytest.raises(ValueError):
+        parse_latency_spec("gauss:1")
+
+
+def test_fake_openrouter_returns_chat_completion_and_rate_limits():
+    server = FakeOpenRouterServer(error_rate=0.0).start()
+    try:
+        body = json.dumps({"model": "m", "messages": [{"role": "user", "content": "привет"}]}).encode("utf-8")
+        request = urllib.request.Request(f"{server.base_url}/chat/completions", data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            payload = json.loads(response.read())
+        assert payload["choices"][0]["message"]["content"]
+        assert payload["usage"]["total_tokens"] > 0
+
+        server.error_rate = 1.0
+        status, _, headers = server.handle_completion("/api/v1/chat/completions", {"messages": []})
+        assert status == 429 and "Retry-After" in headers
+        assert server.stats()["requests"] == 2 and server.stats()["errors"] == 1
+    finally:
+        server.stop()
+
+
+def test_route_events_keeps_arrival_order_and_force_flag():
+    events = synthetic_events(10, seed=1)
+
+    routed = route_events(events)
+
+    assert [e["raw_event_id"] for e in routed] == [e["raw_event_id"] for e in events]
+    assert [e["force_respond"] for e in routed] == [e["force_respond"] for e in events]
+
+
+class _SlowBot:
+    def __init__(self):
+        self.calls = 0
+
+    def handle_message(self, event):
+        self.calls += 1
+        time.sleep(0.002)
+        return {"status": "ignored"}
+
+
+def test_load_generator_reports_queue_and_latency():
+    bot = _SlowBot()
+
+    report = LoadGenerator(bot, concurrency=2, depth_sample_seconds=0.001).run([{"text": str(i)} for i in range(30)])
+
+    assert bot.calls == 30
+    assert report["completed"] == 30 and report["statuses"] == {"ignored": 30}
+    assert report["queue_depth"]["max"] > 0
+    assert report["latency"]["service"]["p50_ms"] >= 1.0
+    assert report["latency"]["end_to_end"]["count"] == 30
+
+
+def test_run_load_drives_bot_through_fake_openrouter(tmp_path):
+    events = synthetic_events(8, force_respond_ratio=1.0)
+
+    report = run_load(
+        events,
+        tmp_path,
+        concurrency=2,
+        llm_latency="fixed:1",
+        subsystems=resolve_subsystems(disabled=["logging", "monologue"]),
+    )
+
+    assert report["statuses"] == {"responded": 8}
+    assert report["llm"]["requests"] >= 8
+    assert "llm_call" in report["stages"]
+
+
+def test_cli_parser_accepts_loadgen_options():
+    args = cli.build_parser().parse_args(["loadgen", "--rate", "20", "--concurrency", "3", "--llm-latency", "uniform:10:30"])
+
+    assert args.command == "loadgen"
+    assert (args.rate, args.concurrency, args.llm_latency) == (20.0, 3, "uniform:10:30")
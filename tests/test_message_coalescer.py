@@ -0,0 +1,167 @@
+import threading
+
+from noty.core.coalescer import MessageCoalescer, merge_burst
+from noty.transport.router import TransportRouter
+from noty.transport.runtime import TransportRuntime
+from noty.transport.types import IncomingEvent
+
+
+def _event(chat_id, text, user_id=1, **extra):
+    return {"platform": "vk", "chat_id": chat_id, "user_id": user_id, "username": f"u{user_id}", "text": text, "raw_event_id": text, **extra}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_within_window_is_handled_once():
+    handled, clock = [], _Clock()
+    coalescer = MessageCoalescer(lambda event: handled.append(event) or {"status": "responded"}, window_seconds=1.0, clock=clock)
+
+    for idx, text in enumerate(["привет", "как дела", "ноти?"]):
+        clock.now = idx * 0.5
+        coalescer.submit(_event(1, text))
+    assert coalescer.flush_due(1.9) == 0
+    assert coalescer.flush_due(2.0) == 1
+
+    assert len(handled) == 1
+    assert handled[0]["text"] == "привет\nкак дела\nноти?"
+    assert handled[0]["coalesced_count"] == 3
+    stats = coalescer.stats()
+    assert stats["bursts"] == 1 and stats["merged_messages"] == 2 and stats["avg_burst_size"] == 3.0
+    assert stats["flush_reasons"]["window"] == 1
+
+
+def test_max_wait_caps_debounce_and_max_messages_flushes_immediately():
+    handled, clock = [], _Clock()
+    coalescer = MessageCoalescer(lambda event: handled.append(event) or {}, window_seconds=1.0, max_wait_seconds=2.0, max_messages=3, clock=clock)
+
+    for idx in range(3):
+        clock.now = idx * 0.9
+        coalescer.submit(_event(1, f"m{idx}"))
+    assert [event["coalesced_count"] for event in handled] == [3]
+    assert coalescer.stats()["flush_reasons"]["max_messages"] == 1
+
+    coalescer = MessageCoalescer(lambda event: handled.append(event) or {}, window_seconds=1.0, max_wait_seconds=2.0, clock=clock)
+    clock.now = 10.0
+    coalescer.submit(_event(2, "a"))
+    clock.now = 10.9
+    coalescer.submit(_event(2, "b"))
+    clock.now = 11.8
+    coalescer.submit(_event(2, "c", force_respond=True))
+    assert coalescer.flush_due(12.0) == 1
+    assert handled[-1]["force_respond"] is True
+    assert coalescer.stats()["flush_reasons"] == {"window": 0, "max_wait": 1, "max_messages": 0, "shutdown": 0}
+
+
+def test_scopes_are_independent_and_multi_user_bursts_keep_speakers():
+    handled = []
+    coalescer = MessageCoalescer(lambda event: handled.append(event) or {}, window_seconds=1.0, clock=_Clock())
+
+    coalescer.submit(_event(1, "всем привет", user_id=1))
+    coalescer.submit(_event(1, "йо", user_id=2))
+    coalescer.submit(_event(2, "другой чат"))
+    coalescer.flush_due(5.0)
+
+    texts = sorted(event["text"] for event in handled)
+    assert texts == ["u1: всем привет\nu2: йо", "другой чат"]
+
+
+def test_new_messages_wait_while_previous_burst_of_scope_is_in_flight():
+    release = threading.Event()
+    handled = []
+
+    def handle(event):
+        handled.append(event["text"])
+        release.wait(5)
+        return {}
+
+    clock = _Clock()
+    coalescer = MessageCoalescer(handle, window_seconds=0.1, clock=clock, tick_seconds=0.01).start()
+    coalescer.submit(_event(1, "first"))
+    clock.now = 1.0
+    while not handled:
+        threading.Event().wait(0.01)
+    coalescer.submit(_event(1, "second"))
+    coalescer.submit(_event(1, "third"))
+    clock.now = 5.0
+    threading.Event().wait(0.05)
+    assert handled == ["first"]
+
+    release.set()
+    coalescer.stop()
+    assert handled == ["first", "second\nthird"]
+
+
+def test_max_messages_holds_while_scope_is_busy():
+    release = threading.Event()
+    handled = []
+
+    def handle(event):
+        handled.append(event.get("coalesced_count", 1))
+        release.wait(5)
+        return {}
+
+    coalescer = MessageCoalescer(handle, window_seconds=0.1, max_messages=3, clock=_Clock(), tick_seconds=0.01).start()
+    for idx in range(3):
+        coalescer.submit(_event(1, f"first{idx}"))
+    while not handled:
+        threading.Event().wait(0.01)
+    for idx in range(50):
+        coalescer.submit(_event(1, f"next{idx}"))
+    assert coalescer.stats()["pending_bursts"] == 17
+
+    release.set()
+    coalescer.stop()
+    assert sum(handled) == 53
+    assert max(handled) == 3 and coalescer.stats()["max_burst_size"] == 3
+
+
+def test_full_coalescer_holds_runtime_slot_until_bursts_are_handled():
+    release = threading.Event()
+    handled = []
+
+    def handle(event):
+        handled.append(event["text"])
+        release.wait(5)
+        return {}
+
+    coalescer = MessageCoalescer(handle, window_seconds=0.1, max_messages=2, max_pending=2, tick_seconds=0.01).start()
+    runtime = TransportRuntime(TransportRouter([]), coalescer.submit, workers=1, max_pending=1).start()
+    event = {"user_id": 1, "username": "u", "chat_name": "c", "is_private": False, "platform": "vk"}
+    assert coalescer.submit(_event(1, "a")) and coalescer.submit(_event(1, "b"))
+    assert coalescer.submit(_event(1, "c"), block=False) is False
+
+    # Воркер runtime ждёт места в коалесцере и не отдаёт слот: следующее событие отклоняется.
+    assert runtime.submit({**event, "chat_id": 1, "text": "c", "raw_event_id": "c"}, block=False)
+    assert runtime.submit({**event, "chat_id": 1, "text": "d", "raw_event_id": "d"}, block=False) is False
+    while not coalescer.stats()["backpressure_waits"]:
+        threading.Event().wait(0.01)
+    assert coalescer.stats()["pending_messages"] == 2
+
+    release.set()
+    runtime.stop()
+    coalescer.stop()
+    assert handled == ["a\nb", "c"]
+    assert coalescer.stats()["rejected"] == 1
+
+
+def test_submit_accepts_transport_events_and_results_reach_callback():
+    results = []
+    coalescer = MessageCoalescer(lambda event: {"status": "responded", "text": "ok"}, on_result=lambda event, result: results.append((event["chat_id"], result["text"])), clock=_Clock())
+    event = IncomingEvent(chat_id=9, user_id=1, text="hi", username="u", chat_name="c", is_private=False, platform="telegram", raw_event_id="1")
+
+    coalescer.submit(event)
+    coalescer.stop()
+
+    assert results == [(9, "ok")]
+    assert coalescer.stats()["flush_reasons"]["shutdown"] == 1
+
+
+def test_merge_burst_single_event_is_unchanged():
+    event = _event(1, "solo")
+    assert merge_burst([event]) == event
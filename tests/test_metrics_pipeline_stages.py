@@ -1,4 +1,43 @@
-from noty.utils.metrics import MetricsCollector
+from noty.core.bot import NotyBot
+from noty.core.events import InteractionJSONLLogger
+from noty.mood.mood_manager import MoodManager
+from noty.tools.tool_executor import SafeToolExecutor
+from noty.utils.metrics import MetricsCollector, RequestTrace
+
+
+class _Decision:
+    should_respond = True
+    reason = "interesting"
+    score = 1.0
+    threshold = 0.5
+
+
+class _MessageHandlerStub:
+    prompt_builder = type("PB", (), {"current_personality_version": 1})()
+
+    def __init__(self):
+        self.full_stats_calls = 0
+
+    def decide_reaction(self, text: str):
+        return _Decision()
+
+    def prepare_prompt(self, **kwargs):
+        return "prompt"
+
+    def get_filter_stats(self, include_metrics: bool = True):
+        if include_metrics:
+            self.full_stats_calls += 1
+        return {"decider": {"respond_rate": 1.0}}
+
+
+class _MonologueStub:
+    def generate_thoughts(self, context, cheap_model=True):
+        return {"strategy": "balanced", "quality_score": 0.8}
+
+
+class _RotatorStub:
+    def call(self, messages):
+        return {"content": "Ответ", "tool_calls": [], "finish_reason": "stop", "usage": {"total_tokens": 9, "cost_usd": 0.002}}
 
 
 def test_metrics_snapshot_contains_stage_platform_percentiles_and_token_cost() -> None:
@@ -30,3 +69,86 @@ def test_metrics_snapshot_contains_stage_platform_percentiles_and_token_cost() -
     llm_vk = stage_series["llm_call"]["vk"]
     assert llm_vk["count"] == 1
     assert llm_vk["token_cost_usd"] == 0.0077
+
+
+def test_metrics_histograms_keep_fixed_memory_and_accurate_percentiles() -> None:
+    metrics = MetricsCollector()
+    for i in range(1, 10_001):
+        metrics.observe("llm_call_seconds", i / 1000, stage="llm_call", platform="vk")
+
+    histogram = metrics.stage_platform_timings["llm_call"]["vk"]
+    buckets_before = len(histogram.counts)
+    metrics.observe("llm_call_seconds", 5.0, stage="llm_call", platform="vk")
+
+    assert len(histogram.counts) == buckets_before
+    series = metrics.snapshot()["series"]["stage_platform"]["llm_call"]["vk"]
+    assert series["count"] == 10_001
+    assert abs(series["p50_seconds"] - 5.0) / 5.0 < 0.05
+    assert abs(series["p95_seconds"] - 9.5) / 9.5 < 0.05
+
+
+def test_metrics_snapshot_exposes_windowed_counter_rates() -> None:
+    metrics = MetricsCollector()
+    for _ in range(30):
+        metrics.inc("messages_total", scope="vk:1")
+
+    rates = metrics.snapshot()["global"]["rates_per_second"]
+
+    assert rates["messages_total"] == 0.5
+
+
+def test_request_trace_accumulates_stages_tokens_and_cost() -> None:
+    metrics = MetricsCollector()
+    trace = RequestTrace()
+
+    with metrics.time_block("llm_call_seconds", stage="llm_call", platform="vk", trace=trace):
+        pass
+    with metrics.time_block("llm_call_seconds", stage="llm_call", platform="vk", trace=trace):
+        pass
+    trace.add_usage({"total_tokens": "4", "cost_usd": 0.5})
+    trace.add_usage({"total_tokens": 6, "cost_usd": "bad"})
+
+    payload = trace.to_dict()
+    assert list(payload["stages"]) == ["llm_call"]
+    assert payload["tokens"]["total_tokens"] == 10
+    assert payload["cost_usd"] == 0.5
+    assert metrics.snapshot()["timings"]["llm_call_seconds"]["count"] == 2
+
+
+def _bot(tmp_path, handler, result_mode: str = "lean") -> NotyBot:
+    return NotyBot(
+        api_rotator=_RotatorStub(),
+        message_handler=handler,
+        mood_manager=MoodManager(),
+        tool_executor=SafeToolExecutor(owner_id=1, actions_log_dir=str(tmp_path / "actions")),
+        monologue=_MonologueStub(),
+        interaction_logger=InteractionJSONLLogger(logs_dir=str(tmp_path / "interactions")),
+        result_mode=result_mode,
+    )
+
+
+def test_lean_result_carries_compact_trace_instead_of_metrics_snapshot(tmp_path) -> None:
+    handler = _MessageHandlerStub()
+    bot = _bot(tmp_path, handler)
+
+    result = bot.handle_message({"chat_id": 1, "user_id": 2, "text": "расскажи что-нибудь", "platform": "vk"})
+
+    assert "metrics" not in result
+    assert "filter_stats" not in result
+    assert handler.full_stats_calls == 0
+    assert result["trace"]["tokens"]["total_tokens"] == 9
+    assert result["trace"]["cost_usd"] == 0.002
+    assert {"monologue", "llm_call", "response_processing"} <= set(result["trace"]["stages"])
+
+    on_demand = bot.metrics_snapshot()
+    assert on_demand["metrics"]["global"]["token_usage"]["total_tokens"] == 9
+    assert handler.full_stats_calls == 1
+
+
+def test_full_result_mode_keeps_metrics_snapshot_for_debugging(tmp_path) -> None:
+    result = _bot(tmp_path, _MessageHandlerStub(), result_mode="full").handle_message(
+        {"chat_id": 1, "user_id": 2, "text": "расскажи что-нибудь", "platform": "vk"}
+    )
+
+    assert "trace" in result
+    assert result["metrics"]["timings"]["llm_call_seconds"]["count"] == 1
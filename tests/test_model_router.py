@@ -0,0 +1,102 @@
+from noty.core.bot import NotyBot
+from noty.core.events import InteractionJSONLLogger
+from noty.core.model_router import ModelRouter
+from noty.mood.mood_manager import MoodManager
+from noty.tools.tool_executor import SafeToolExecutor
+
+
+class _Decision:
+    should_respond = True
+    reason = "interesting"
+    score = 1.0
+    threshold = 0.5
+    topic = "юмор, сарказм, мемы и шутки"
+
+
+class _MessageHandlerStub:
+    prompt_builder = type("PB", (), {"current_personality_version": 1})()
+
+    def decide_reaction(self, text: str, scope: str | None = None):
+        return _Decision()
+
+    def prepare_prompt(self, **kwargs):
+        return "prompt"
+
+    def get_filter_stats(self):
+        return {"respond_rate": 1.0}
+
+
+class _MonologueSpy:
+    def __init__(self, strategy: str = "balanced"):
+        self.calls = 0
+        self.strategy = strategy
+
+    def generate_thoughts(self, context, cheap_model=True):
+        self.calls += 1
+        return {"strategy": self.strategy, "quality_score": 0.8}
+
+
+class _RotatorSpy:
+    def __init__(self):
+        self.models = []
+
+    def call(self, messages, model="default"):
+        self.models.append(model)
+        return {"content": "Ответ", "tool_calls": [], "finish_reason": "stop", "usage": {"total_tokens": 7, "cost_usd": 0.001}}
+
+
+def test_model_router_picks_tiers_by_length_topic_and_relationship():
+    router = ModelRouter(cheap_model="small", response_model="large")
+
+    assert router.route("ок").tier == "trivial"
+    assert router.route("ок").run_monologue is False
+    assert router.route("ну и денёк сегодня у всех").response_model == "small"
+    assert router.route("почему небо голубое, объясни?").tier == "deep"
+    assert router.route("ну и что ты об этом думаешь", topic="философские вопросы и глубокие размышления").response_model == "large"
+    assert router.route("почему небо голубое, объясни?", relationship={"score": -8}).tier == "banter"
+
+
+def test_model_router_refine_downgrades_deep_route_for_cheap_strategy():
+    router = ModelRouter(cheap_model="small", response_model="large")
+    route = router.route("почему небо голубое, объясни?")
+
+    refined = router.refine(route, "dry_brief")
+
+    assert refined.tier == "banter"
+    assert refined.response_model == "small"
+    assert router.refine(route, "balanced") is route
+
+
+def test_model_router_reads_models_from_bot_config():
+    router = ModelRouter.from_config(
+        {"bot": {"cheap_thought_model": "m-8b", "response_model": "m-70b"}, "routing": {"trivial_max_chars": 3}}
+    )
+
+    assert router.cheap_model == "m-8b"
+    assert router.response_model == "m-70b"
+    assert router.trivial_max_chars == 3
+
+
+def test_bot_skips_monologue_for_trivial_message_and_records_route_metrics(tmp_path):
+    monologue = _MonologueSpy()
+    rotator = _RotatorSpy()
+    bot = NotyBot(
+        api_rotator=rotator,
+        message_handler=_MessageHandlerStub(),
+        mood_manager=MoodManager(),
+        tool_executor=SafeToolExecutor(owner_id=1, actions_log_dir=str(tmp_path / "actions")),
+        monologue=monologue,
+        interaction_logger=InteractionJSONLLogger(logs_dir=str(tmp_path / "interactions")),
+        model_router=ModelRouter(cheap_model="small", response_model="large"),
+    )
+
+    result = bot.handle_message({"chat_id": 1, "user_id": 2, "text": "привет", "platform": "vk"})
+
+    assert result["status"] == "responded"
+    assert result["route"]["tier"] == "trivial"
+    assert monologue.calls == 0
+    assert rotator.models == ["small"]
+    snapshot = bot.metrics.snapshot()
+    assert snapshot["global"]["counters"]["monologue_skipped"] == 1
+    assert snapshot["global"]["counters"]["route_trivial_tokens"] == 7
+    assert snapshot["series"]["stage_platform"]["route_trivial"]["vk"]["token_cost_usd"] == 0.001
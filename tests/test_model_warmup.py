@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import httpx
+import numpy as np
+
+from noty.core.message_handler import MessageHandler
+from noty.core.warmup import ModelWarmup, embedding_warmup
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.heuristic_filter import HeuristicFilter
+from noty.transport.webhook_server import WebhookIngress
+
+
+class GatedEncoder:
+    """Encoder, который «грузится», пока тест не откроет gate."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        self.gate.wait(5)
+        self.calls += 1
+        if isinstance(texts, str):
+            return np.array([1.0, 0.0])
+        return np.array([[1.0, 0.0] for _ in texts])
+
+
+def _handler(embedding_filter):
+    return MessageHandler(
+        context_builder=None,
+        prompt_builder=None,
+        heuristic_filter=HeuristicFilter(pass_probability=0.0),
+        embedding_filter=embedding_filter,
+    )
+
+
+def test_decisions_are_heuristic_only_until_embeddings_are_warm(tmp_path):
+    encoder = GatedEncoder()
+    embedding_filter = EmbeddingFilter(cache_path=str(tmp_path), encoder=encoder, defer_load=True)
+    handler = _handler(embedding_filter)
+    warmup = ModelWarmup().add("embedding", embedding_warmup(embedding_filter, batches=2)).start()
+
+    early = handler.decide_reaction("ноти, почему небо синее?", scope="vk:1")
+    assert not warmup.ready and not embedding_filter.ready
+    assert early.reason.startswith("heuristic_only:")
+    assert encoder.calls == 0
+    assert handler.metrics.counters["heuristic_only"] == 1
+
+    encoder.gate.set()
+    assert warmup.wait_ready(5)
+    # Векторы интересов + 2 пробных батча; кэш сообщений прогрев не засоряет.
+    assert encoder.calls == 3 and embedding_filter.cache_stats()["misses"] == 0
+
+    late = handler.decide_reaction("ноти, почему небо синее?", scope="vk:1")
+    assert not late.reason.startswith("heuristic_only")
+    assert warmup.status()["components"]["embedding"]["state"] == "ready"
+
+
+def test_failed_component_keeps_bot_in_heuristic_mode():
+    def broken():
+        raise OSError("model weights missing")
+
+    warmup = ModelWarmup().add("embedding", broken).add("llm_client", lambda: None)
+    assert warmup.run() is False
+
+    status = warmup.status()
+    assert status["ready"] is False
+    assert status["components"]["embedding"]["state"] == "failed"
+    assert "model weights missing" in status["components"]["embedding"]["error"]
+    assert status["components"]["llm_client"]["state"] == "ready"
+    assert warmup.wait_finished(1)
+
+
+def test_empty_warmup_is_ready_immediately():
+    assert ModelWarmup().start().wait_ready(0)
+
+
+def test_webhook_readyz_follows_warmup():
+    warmup = ModelWarmup().add("embedding", lambda: None)
+    app = WebhookIngress(submit=lambda event: True, readiness=lambda: warmup.ready)
+
+    async def probe():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ingress") as client:
+            return (await client.get("/readyz")).status_code
+
+    assert asyncio.run(probe()) == 503
+    warmup.run()
+    assert asyncio.run(probe()) == 200
@@ -0,0 +1,68 @@
+import urllib.request
+
+from noty.utils.metrics import MetricsCollector
+from noty.utils.openmetrics import CONTENT_TYPE, MetricsHTTPServer, render_openmetrics
+
+
+def _collector() -> MetricsCollector:
+    metrics = MetricsCollector()
+    metrics.inc("messages_total", scope="vk:chat:1")
+    metrics.inc("messages_total", value=3, scope="vk:chat:2")
+    metrics.inc("messages_total", scope="telegram:chat:3")
+    metrics.record_tokens({"total_tokens": 12}, scope="vk:chat:2")
+    metrics.record_token_cost(0.25, stage="llm", platform="vk")
+    metrics.observe("llm_seconds", 0.2, stage="llm", platform="vk")
+    metrics.observe("llm_seconds", 3.0, stage="llm", platform="vk")
+    return metrics
+
+
+def test_render_openmetrics_exposes_counters_histograms_and_costs():
+    text = render_openmetrics(_collector())
+
+    assert text.endswith("# EOF\n")
+    assert 'noty_events_total{name="messages_total"} 5' in text
+    assert 'noty_scope_events_total{scope="vk:chat:2",name="messages_total"} 3' in text
+    assert 'noty_tokens_total{kind="total_tokens"} 12' in text
+    assert 'noty_token_cost_usd_total{stage="llm",platform="vk"} 0.25' in text
+    assert "# TYPE noty_stage_seconds histogram" in text
+    assert 'noty_stage_seconds_bucket{stage="llm",platform="vk",le="0.25"} 1' in text
+    assert 'noty_stage_seconds_bucket{stage="llm",platform="vk",le="+Inf"} 2' in text
+    assert 'noty_timing_seconds_count{metric="llm_seconds"} 2' in text
+
+
+def test_render_openmetrics_folds_tail_scopes_into_other():
+    text = render_openmetrics(_collector(), max_scopes=1)
+
+    assert 'scope="vk:chat:2"' in text
+    assert 'noty_scope_events_total{scope="other",name="messages_total"} 2' in text
+    assert 'scope="vk:chat:1"' not in text
+
+
+def test_token_usage_scopes_are_capped_independently_of_event_scopes():
+    metrics = MetricsCollector()
+    metrics.inc("messages_total", value=5, scope="vk:chat:1")
+    for idx in range(10):
+        metrics.record_tokens({"total_tokens": 100 + idx}, scope=f"telegram:chat:{idx}")
+
+    text = render_openmetrics(metrics, max_scopes=2)
+    token_lines = [line for line in text.splitlines() if line.startswith("noty_scope_tokens_total") and "total_tokens" in line]
+
+    assert token_lines == [
+        'noty_scope_tokens_total{scope="other",kind="total_tokens"} 828',
+        'noty_scope_tokens_total{scope="telegram:chat:8",kind="total_tokens"} 108',
+        'noty_scope_tokens_total{scope="telegram:chat:9",kind="total_tokens"} 109',
+    ]
+
+
+def test_metrics_http_server_serves_openmetrics_text():
+    server = MetricsHTTPServer(_collector(), port=0).start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.stop()
+
+    assert content_type == CONTENT_TYPE
+    assert 'noty_events_total{name="messages_total"} 5' in body
@@ -0,0 +1,58 @@
+import json
+
+from noty import cli
+from noty.core.events import InteractionJSONLLogger
+from noty.perf.harness import build_stub_bot, load_interaction_events, resolve_subsystems, synthetic_events
+from noty.perf.profiler import run_profile
+
+
+def test_synthetic_events_are_deterministic():
+    assert synthetic_events(20, seed=3) == synthetic_events(20, seed=3)
+    assert synthetic_events(20, seed=3) != synthetic_events(20, seed=4)
+
+
+def test_load_interaction_events_reads_incoming_entries(tmp_path):
+    logger = InteractionJSONLLogger(logs_dir=str(tmp_path))
+    logger.log_incoming({"platform": "vk", "chat_id": 5, "user_id": 7, "text": "привет"})
+    logger.log_outgoing({"platform": "vk", "chat_id": 5, "user_id": 7, "text": "привет"}, {"status": "ignored"})
+
+    events = load_interaction_events(tmp_path)
+
+    assert len(events) == 1
+    assert events[0]["text"] == "привет"
+    assert events[0]["username"] == "user_7"
+
+
+def test_run_profile_writes_hot_path_report_and_collapsed_flamegraph(tmp_path):
+    subsystems = resolve_subsystems(disabled=["logging", "persona"])
+    runs = iter(range(10))
+    events = synthetic_events(12, force_respond_ratio=1.0)
+
+    summary = run_profile(
+        events,
+        lambda: build_stub_bot(tmp_path / f"run{next(runs)}", subsystems=subsystems),
+        tmp_path / "out",
+        sample_interval_seconds=0.0005,
+        top=10,
+    )
+
+    assert summary["statuses"] == {"responded": 12}
+    assert 0 < len(summary["hot_path"]) <= 10
+    assert (tmp_path / "out" / "profile.pstats").exists()
+    assert "llm_call" in summary["stage_series"]
+    collapsed = (tmp_path / "out" / "flamegraph.collapsed").read_text(encoding="utf-8")
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+    assert json.loads((tmp_path / "out" / "hotpath.json").read_text(encoding="utf-8"))["events"] == 12
+
+
+def test_profile_command_rejects_unknown_events_file(tmp_path):
+    assert cli.profile_command(events_path=str(tmp_path / "missing.jsonl"), output_dir=str(tmp_path / "out")) == 1
+
+
+def test_cli_parser_accepts_profile_subsystem_toggles():
+    args = cli.build_parser().parse_args(["profile", "--count", "5", "--disable", "embedding", "--disable", "monologue"])
+
+    assert args.command == "profile"
+    assert args.disable == ["embedding", "monologue"]
@@ -0,0 +1,71 @@
+from noty.filters.reaction_decider import DeciderStateStore, ReactionDecider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _flood(decider, scope, count, score=1.0):
+    for _ in range(count):
+        decider.decide(semantic_score=score, scope=scope)
+
+
+def test_flood_in_one_scope_does_not_move_other_thresholds():
+    decider = ReactionDecider(target_rate=0.2, clock=FakeClock())
+    _flood(decider, "vk:1", 200)
+
+    assert decider.threshold("vk:1") > 0.6
+    assert decider.threshold("vk:2") == 0.5
+    assert decider.stats()["seen"] == 200.0
+    assert decider.stats("vk:1")["scope_rate"] > 0.9
+
+
+def test_history_decays_back_to_neutral_threshold():
+    clock = FakeClock()
+    decider = ReactionDecider(target_rate=0.2, half_life_seconds=60, clock=clock)
+    _flood(decider, "vk:1", 100)
+    flooded = decider.threshold("vk:1")
+
+    clock.now += 1200  # двадцать полураспадов
+    assert decider.threshold("vk:1") < flooded
+    assert abs(decider.threshold("vk:1") - 0.5) < 0.01
+
+
+def test_lru_is_bounded_and_evicted_state_survives_via_store(tmp_path):
+    clock = FakeClock()
+    store = DeciderStateStore(str(tmp_path / "state.db"))
+    decider = ReactionDecider(max_scopes=2, store=store, clock=clock, flush_interval_seconds=3600)
+    _flood(decider, "vk:1", 50)
+    flooded = decider.threshold("vk:1")
+    _flood(decider, "vk:2", 1)
+    _flood(decider, "vk:3", 1)
+
+    assert decider.stats()["tracked_scopes"] == 2.0
+    assert decider.threshold("vk:1") == flooded  # вернулся из буфера вытесненных
+    decider.flush()
+    assert store.load("vk:3") is not None
+
+
+def test_state_is_restored_after_restart(tmp_path):
+    clock = FakeClock()
+    db_path = str(tmp_path / "state.db")
+    first = ReactionDecider(store=DeciderStateStore(db_path), clock=clock, flush_interval_seconds=10)
+    _flood(first, "telegram:-100", 30)
+    clock.now += 11
+    first.decide(semantic_score=0.0, scope="telegram:-100")  # периодический flush
+    expected = first.threshold("telegram:-100")
+
+    restarted = ReactionDecider(store=DeciderStateStore(db_path), clock=clock)
+    assert restarted.threshold("telegram:-100") == expected
+    assert restarted.threshold("telegram:-200") == 0.5
+
+
+def test_derived_decider_shares_store_with_own_target(tmp_path):
+    store = DeciderStateStore(str(tmp_path / "state.db"))
+    base = ReactionDecider(store=store, half_life_seconds=120)
+    derived = base.derive(target_rate=0.05)
+    assert derived.store is store and derived.half_life_seconds == 120 and derived.target_rate == 0.05
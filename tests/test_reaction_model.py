@@ -0,0 +1,163 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from noty.core.message_handler import MessageHandler
+from noty.filters.embedding_filter import EmbeddingFilter
+from noty.filters.heuristic_filter import HeuristicFilter
+from noty.filters.reaction_model import BASE_FEATURES, ReactionModel, ab_variant
+from noty.filters.reaction_training import (
+    DecisionSample,
+    ab_report,
+    build_training_set,
+    fit_logistic,
+    label_sample,
+    load_decision_samples,
+    roc_auc,
+    train_reaction_model,
+)
+
+
+class WordEncoder:
+    """«код» и «ноти» — отдельные оси, остальное — шум по длине."""
+
+    model_id = "word-encoder"
+
+    def _vector(self, text):
+        return np.array([float("код" in text), float("ноти" in text), 0.1 + len(text) % 7 / 10.0, 0.2])
+
+    def encode(self, texts, convert_to_numpy=True, **_):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.array([self._vector(text) for text in texts])
+
+
+def _write_log(path, rows):
+    start = datetime(2026, 1, 5, 10, 0)
+    with path.open("w", encoding="utf-8") as fh:
+        for idx, (text, status, approved) in enumerate(rows):
+            event = {"chat_id": idx % 3, "user_id": 1, "text": text, "raw_event_id": f"e{idx}", "scope": f"vk:{idx % 3}"}
+            stamp = (start + timedelta(minutes=idx)).isoformat()
+            fh.write(json.dumps({"timestamp": stamp, "direction": "incoming", "event": event}, ensure_ascii=False) + "\n")
+            payload = {"status": status, "reason": "sampled_out" if status == "ignored" else None}
+            if status == "responded":
+                payload.update(adaptation={"approved": approved}, decision={"variant": "pipeline", "reason": "sampled_in", "score": 0.7})
+            fh.write(json.dumps({"timestamp": stamp, "direction": "outgoing", "event": event, "payload": payload}, ensure_ascii=False) + "\n")
+
+
+def test_logistic_fit_separates_classes_and_roundtrips(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] + 0.5 * X[:, 1] > 0).astype(float)
+    weights, bias, mean, scale = fit_logistic(X, y, l2=0.1)
+    model = ReactionModel(weights=weights, bias=bias, mean=mean, scale=scale, threshold=0.4, encoder_id="m")
+    assert roc_auc(y, model.predict_proba(X)) > 0.98
+
+    loaded = ReactionModel.load(model.save(tmp_path / "model.npz"))
+    assert loaded.threshold == 0.4 and loaded.encoder_id == "m"
+    assert np.allclose(loaded.predict_proba(X), model.predict_proba(X), atol=1e-5)
+    assert abs(loaded.probability(X[0].astype(np.float32)) - float(model.predict_proba(X[0])[0])) < 1e-5
+
+
+def test_runtime_scoring_is_microseconds():
+    dim = len(BASE_FEATURES) + 768
+    model = ReactionModel(weights=np.ones(dim), bias=0.0, mean=np.zeros(dim), scale=np.ones(dim))
+    features = np.full(dim, 0.01, dtype=np.float32)
+    started = time.perf_counter()
+    for _ in range(2000):
+        model.probability(features)
+    assert (time.perf_counter() - started) / 2000 < 200e-6
+
+
+def test_training_from_interaction_logs(tmp_path):
+    rows = []
+    for idx in range(120):
+        if idx % 3 == 0:
+            rows.append((f"ноти, глянь код {idx}", "responded", True))
+        elif idx % 3 == 1:
+            rows.append((f"погода сегодня {idx}", "ignored", None))
+        else:
+            rows.append((f"ноти, привет {idx}", "responded", False))
+    log = tmp_path / "2026-01-05.jsonl"
+    _write_log(log, rows)
+
+    samples = load_decision_samples(tmp_path)
+    assert len(samples) == 120 and samples[0].scope == "vk:0"
+    filt = EmbeddingFilter(cache_path=str(tmp_path / "cache"), encoder=WordEncoder())
+    X, y, w = build_training_set(samples, filt, HeuristicFilter())
+    assert X.shape == (120, len(BASE_FEATURES) + 4)
+    assert set(w.tolist()) == {1.0, 0.25}
+
+    model, report = train_reaction_model(X, y, w, target_rate=0.3, holdout=0.25, l2=0.1, encoder_id="word-encoder")
+    assert report["holdout_auc"] > 0.95
+    assert 0.2 <= report["holdout_response_rate"] <= 0.45
+    assert ab_report(samples)["pipeline"]["approval_rate"] == 0.5
+
+
+def test_training_replays_only_decider_decisions(tmp_path):
+    start = datetime(2026, 1, 5, 10, 0)
+    rows = [
+        ("ноти, код", "ignored", "heuristic_drop", False),
+        ("ноти, привет", "ignored", "private_chat_uninteresting", False),
+        ("ноти, срочно", "responded", "", True),
+        ("погода", "ignored", "sampled_out", False),
+        ("ноти, код снова", "responded", "sampled_in", False),
+    ]
+    samples = [
+        DecisionSample(timestamp=start + timedelta(seconds=idx), scope="vk:1", text=text, status=status, reason=reason, forced=forced, approved=True)
+        for idx, (text, status, reason, forced) in enumerate(rows)
+    ]
+    assert label_sample(samples[1]) is None
+
+    filt = EmbeddingFilter(cache_path=str(tmp_path / "cache"), encoder=WordEncoder())
+    X, y, _ = build_training_set(samples, filt, HeuristicFilter())
+    assert X.shape[0] == 4 and y.tolist() == [0.0, 1.0, 0.0, 1.0]
+    rate, activity = BASE_FEATURES.index("scope_rate"), BASE_FEATURES.index("scope_activity")
+    # До последнего решения decider видел только sampled_out: доля 0, вес ~1.
+    assert X[-1, rate] == 0.0
+    assert abs(X[-1, activity] - np.log1p(1.0)) < 1e-3
+    assert X[:3, activity].tolist() == [0.0, 0.0, 0.0]
+
+
+def _handler(tmp_path, model, traffic):
+    return MessageHandler(
+        context_builder=None,
+        prompt_builder=None,
+        heuristic_filter=HeuristicFilter(pass_probability=1.0),
+        embedding_filter=EmbeddingFilter(cache_path=str(tmp_path), encoder=WordEncoder()),
+        reaction_model=model,
+        model_traffic=traffic,
+    )
+
+
+def test_ab_switch_routes_scopes_between_model_and_pipeline(tmp_path):
+    dim = len(BASE_FEATURES) + 4
+    weights = np.zeros(dim)
+    weights[len(BASE_FEATURES)] = 10.0  # ось «код»
+    model = ReactionModel(weights=weights, bias=-2.0, mean=np.zeros(dim), scale=np.ones(dim), threshold=0.5)
+
+    handler = _handler(tmp_path, model, traffic=1.0)
+    hit = handler.decide_reaction("ноти, посмотри код", scope="vk:1")
+    miss = handler.decide_reaction("ноти, привет всем", scope="vk:1")
+    assert hit.variant == "model" and hit.should_respond and hit.reason == "model_in"
+    assert not miss.should_respond and miss.reason == "model_out"
+    assert handler.reaction_decider.stats("vk:1")["seen"] == 2.0  # состояние чата ведётся и в ветке модели
+    assert handler.metrics.counters["ab_model_decisions"] == 2
+
+    assert handler.decide_reaction("ноти, код", scope="vk:1").variant == "model"
+    assert _handler(tmp_path, model, traffic=0.0).decide_reaction("ноти, код", scope="vk:1").variant == "pipeline"
+
+    scopes = [f"telegram:{idx}" for idx in range(2000)]
+    share = np.mean([ab_variant(scope, 0.3) == "model" for scope in scopes])
+    assert 0.25 < share < 0.35
+    assert all(ab_variant(scope, 0.3) == ab_variant(scope, 0.3) for scope in scopes[:50])
+
+
+def test_incompatible_model_falls_back_to_pipeline(tmp_path):
+    model = ReactionModel(weights=np.ones(3), bias=0.0, mean=np.zeros(3), scale=np.ones(3))
+    handler = _handler(tmp_path, model, traffic=1.0)
+    decision = handler.decide_reaction("ноти, что думаешь?", scope="vk:1")
+    assert decision.variant == "pipeline"
+    assert handler.metrics.counters["reaction_model_mismatch"] == 1
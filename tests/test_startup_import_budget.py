@@ -0,0 +1,40 @@
+import pytest
+
+from noty.perf.startup import parse_importtime, profile_startup, render_startup_report
+
+# С ленивыми тяжёлыми зависимостями импорт укладывается в ~0.4 с; запас на медленные CI-машины.
+IMPORT_BUDGET_MS = 2500
+
+
+@pytest.mark.parametrize("target", ["main", "noty.cli:build_parser", "noty.transport.webhook_server"])
+def test_cold_import_skips_heavy_dependencies_and_fits_budget(target):
+    report = profile_startup(target)
+
+    assert report["heavy_loaded"] == []
+    assert report["import_ms"] < IMPORT_BUDGET_MS, render_startup_report(report, top=15)
+
+
+def test_cli_parser_does_not_import_perf_harness():
+    modules = {row.module for row in profile_startup("noty.cli:build_parser")["rows"]}
+
+    assert "noty.perf.subsystems" in modules
+    assert not {"numpy", "noty.perf.harness", "noty.perf.loadgen", "noty.perf.profiler"} & modules
+
+
+def test_parse_importtime_reads_depth_and_timings():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     json.decoder",
+            "import time:        80 |        200 |   json",
+            "import time:        10 |        210 | app",
+            "unrelated warning line",
+        ]
+    )
+    rows = parse_importtime(stderr)
+
+    assert [(row.module, row.self_us, row.cumulative_us, row.depth) for row in rows] == [
+        ("json.decoder", 120, 120, 2),
+        ("json", 80, 200, 1),
+        ("app", 10, 210, 0),
+    ]
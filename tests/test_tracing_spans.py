@@ -0,0 +1,117 @@
+import json
+
+from noty.core.bot import NotyBot
+from noty.core.events import InteractionJSONLLogger
+from noty.mood.mood_manager import MoodManager
+from noty.tools.tool_executor import SafeToolExecutor
+from noty.utils.tracing import NOOP_SPAN, JSONLSpanExporter, OTLPHTTPSpanExporter, Tracer
+
+
+class _Decision:
+    should_respond = True
+    reason = "interesting"
+    score = 1.0
+    threshold = 0.5
+
+
+class _MessageHandlerStub:
+    prompt_builder = type("PB", (), {"current_personality_version": 1})()
+
+    def decide_reaction(self, text: str):
+        return _Decision()
+
+    def prepare_prompt(self, **kwargs):
+        return "prompt"
+
+    def get_filter_stats(self):
+        return {"respond_rate": 1.0}
+
+
+class _MonologueStub:
+    def generate_thoughts(self, context, cheap_model=True):
+        return {"strategy": "balanced", "quality_score": 0.8}
+
+
+class _RotatorStub:
+    def call(self, messages):
+        return {"content": "Ответ", "tool_calls": [], "finish_reason": "stop", "usage": {"total_tokens": 5}}
+
+
+class _CollectingExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(list(spans))
+
+
+def test_tracer_builds_nested_spans_and_exports_once_per_trace():
+    exporter = _CollectingExporter()
+    tracer = Tracer(exporter=exporter)
+
+    with tracer.start_trace("root", trace_id="abc") as root:
+        with tracer.span("child") as child:
+            with tracer.span("grandchild") as grandchild:
+                pass
+
+    assert len(exporter.traces) == 1
+    names = [span.name for span in exporter.traces[0]]
+    assert names == ["grandchild", "child", "root"]
+    assert child.parent_id == root.span_id
+    assert grandchild.parent_id == child.span_id
+    assert {span.trace_id for span in exporter.traces[0]} == {"abc"}
+
+
+def test_tracer_sampling_returns_noop_spans_outside_sampled_traces():
+    exporter = _CollectingExporter()
+    tracer = Tracer(exporter=exporter, sample_rate=0.5, rng=lambda: 0.9)
+
+    with tracer.start_trace("root") as root:
+        assert tracer.span("child") is NOOP_SPAN
+
+    assert root is NOOP_SPAN
+    assert exporter.traces == []
+    assert Tracer.from_config({"enabled": False}).sample_rate == 0.0
+
+
+def test_otlp_exporter_posts_resource_spans_payload():
+    posted = []
+    exporter = OTLPHTTPSpanExporter(post=lambda endpoint, body, timeout: posted.append((endpoint, json.loads(body))))
+    tracer = Tracer(exporter=exporter)
+
+    with tracer.start_trace("root", trace_id="not-a-hex-id", platform="vk"):
+        with tracer.span("llm_call", total_tokens=5):
+            pass
+    exporter.flush()
+
+    endpoint, payload = posted[0]
+    assert endpoint.endswith("/v1/traces")
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {span["name"] for span in spans} == {"root", "llm_call"}
+    assert all(len(span["traceId"]) == 32 for span in spans)
+    child = next(span for span in spans if span["name"] == "llm_call")
+    assert child["attributes"] == [{"key": "total_tokens", "value": {"intValue": "5"}}]
+
+
+def test_bot_carries_transport_trace_id_into_pipeline_spans(tmp_path):
+    exporter = JSONLSpanExporter(str(tmp_path / "spans.jsonl"))
+    bot = NotyBot(
+        api_rotator=_RotatorStub(),
+        message_handler=_MessageHandlerStub(),
+        mood_manager=MoodManager(),
+        tool_executor=SafeToolExecutor(owner_id=1, actions_log_dir=str(tmp_path / "actions")),
+        monologue=_MonologueStub(),
+        interaction_logger=InteractionJSONLLogger(logs_dir=str(tmp_path / "interactions")),
+        tracer=Tracer(exporter=exporter),
+    )
+
+    result = bot.handle_message({"chat_id": 1, "user_id": 2, "text": "как дела?", "platform": "vk", "trace_id": "f" * 32})
+
+    assert result["trace"]["trace_id"] == "f" * 32
+    record = json.loads((tmp_path / "spans.jsonl").read_text(encoding="utf-8").strip())
+    assert record["trace_id"] == "f" * 32
+    spans = {span["name"]: span for span in record["spans"]}
+    assert {"alias_extraction", "decide_reaction", "mem0_recall", "persona_update", "monologue", "llm_call", "response_processing", "logging"} <= set(spans)
+    root_id = spans["handle_message"]["span_id"]
+    assert spans["llm_call"]["parent_id"] == root_id
+    assert spans["llm_call"]["attributes"]["total_tokens"] == 5
@@ -38,6 +38,7 @@ def test_vk_mapping_contract_fields():
     assert payload["platform"] == "vk"
     assert payload["chat_id"] == 2000000001
     assert payload["user_id"] == 12345
+    assert len(payload["trace_id"]) == 32
 
 
 def test_telegram_mapping_contract_fields():
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from noty.transport.http import AsyncPooledHTTPClient, PooledHTTPClient, TransportHTTPError, is_retryable_error
+from noty.transport.telegram.client import AsyncTelegramClient, TelegramAPIError, TelegramClient
+from noty.transport.vk.client import AsyncVKAPIClient, VKAPIClient, VKAPIError
+from noty.transport.vk.state_store import run_with_backoff
+
+
+def _vk_transport(seen):
+    def handler(request: httpx.Request) -> httpx.Response:
+        form = parse_qs(request.content.decode("utf-8"))
+        seen.append((request.method, request.url.path, form))
+        if form.get("peer_id") == ["13"]:
+            return httpx.Response(200, json={"error": {"error_code": 6, "error_msg": "Too many requests per second"}})
+        if form.get("peer_id") == ["5"]:
+            return httpx.Response(200, json={"error": {"error_code": 5, "error_msg": "User authorization failed"}})
+        return httpx.Response(200, json={"response": 42})
+
+    return httpx.MockTransport(handler)
+
+
+def test_vk_client_posts_form_and_classifies_api_errors():
+    seen = []
+    client = VKAPIClient(token="secret", group_id=1, http=PooledHTTPClient(transport=_vk_transport(seen)))
+
+    assert client.send_message(7, "привет", random_id=1) == 42
+    method, path, form = seen[0]
+    assert (method, path) == ("POST", "/method/messages.send")
+    assert form["access_token"] == ["secret"] and form["message"] == ["привет"]
+
+    with pytest.raises(VKAPIError) as flood:
+        client.send_message(13, "x", random_id=2)
+    assert flood.value.error_code == 6 and is_retryable_error(flood.value)
+    with pytest.raises(VKAPIError) as auth:
+        client.send_message(5, "x", random_id=3)
+    assert not is_retryable_error(auth.value)
+
+
+def test_http_status_and_telegram_errors_carry_retry_hints():
+    def handler(request):
+        if request.url.path.endswith("/getUpdates"):
+            return httpx.Response(200, json={"ok": False, "error_code": 429, "parameters": {"retry_after": 3}})
+        return httpx.Response(503, headers={"Retry-After": "2"}, text="busy")
+
+    http = PooledHTTPClient(transport=httpx.MockTransport(handler))
+    with pytest.raises(TelegramAPIError) as tg:
+        TelegramClient(token="t", http=http).get_updates()
+    assert tg.value.retryable and tg.value.retry_after == 3.0
+
+    with pytest.raises(TransportHTTPError) as http_error:
+        http.get_json("https://example.invalid/x")
+    assert http_error.value.status_code == 503 and http_error.value.retryable and http_error.value.retry_after == 2.0
+    assert is_retryable_error(httpx.ConnectError("refused"))
+    assert not is_retryable_error(ValueError("bad payload"))
+
+
+def test_run_with_backoff_uses_jitter_and_skips_non_retryable_errors():
+    sleeps = []
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TransportHTTPError("503", status_code=503, retryable=True)
+        return "ok"
+
+    assert run_with_backoff(flaky, base_delay_seconds=1.0, sleep=sleeps.append, rng=lambda: 0.5) == "ok"
+    assert sleeps == [0.5, 1.0]
+
+    def fatal():
+        attempts.append(1)
+        raise TransportHTTPError("401", status_code=401, retryable=False)
+
+    attempts.clear()
+    with pytest.raises(TransportHTTPError):
+        run_with_backoff(fatal, sleep=sleeps.append)
+    assert len(attempts) == 1
+
+    sleeps.clear()
+    attempts.clear()
+
+    def throttled():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise TransportHTTPError("429", status_code=429, retryable=True, retry_after=7)
+        return "ok"
+
+    run_with_backoff(throttled, sleep=sleeps.append, rng=lambda: 0.0)
+    assert sleeps == [7.0]
+
+
+def test_pooled_client_reuses_keep_alive_connection():
+    peers = []
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # noqa: N802
+            peers.append(self.client_address)
+            body = json.dumps({"ok": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            return None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = PooledHTTPClient()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        for _ in range(5):
+            assert client.get_json(url) == {"ok": True}
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    assert len(peers) == 5
+    assert len(set(peers)) == 1
+
+
+def test_async_client_shares_the_contract():
+    async def scenario():
+        client = AsyncPooledHTTPClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"path": request.url.path})))
+        try:
+            return await client.get_json("https://example.invalid/ping"), await client.post_form("https://example.invalid/send", {"a": 1})
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario()) == ({"path": "/ping"}, {"path": "/send"})
+
+
+def test_async_api_clients_wrap_sync_clients():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        form = parse_qs(request.content.decode("utf-8"))
+        seen.append((request.url.path, form))
+        if request.url.path == "/method/execute":
+            return httpx.Response(200, json={"response": [1, False], "execute_errors": [{"method": "messages.send", "error_code": 7}]})
+        if request.url.path.endswith("/sendMessage"):
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": 3}})
+        return httpx.Response(200, json={"response": {"server": "s", "key": "k", "ts": "1"}})
+
+    async def scenario():
+        http = AsyncPooledHTTPClient(transport=httpx.MockTransport(handler))
+        vk = AsyncVKAPIClient(VKAPIClient(token="t", group_id=5), http=http)
+        telegram = AsyncTelegramClient(TelegramClient(token="tg"), http=http)
+        try:
+            return await vk.execute("return 1;"), await vk.get_longpoll_server(), await telegram.send_message(1, "hi")
+        finally:
+            await vk.aclose()
+
+    executed, server, sent = asyncio.run(scenario())
+    assert executed == {"response": [1, False], "execute_errors": [{"method": "messages.send", "error_code": 7}]}
+    assert server["key"] == "k" and sent == {"message_id": 3}
+    assert seen[0][1]["access_token"] == ["t"] and seen[0][1]["code"] == ["return 1;"]
+    assert seen[1][1]["group_id"] == ["5"]
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from noty.core.events import IncomingEvent
+from noty.transport.lanes import LaneDispatcher, coalesce_core_events, lane_index
+from noty.transport.vk.polling import VKLongPollTransport
+from noty.transport.vk.state_store import VKStateStore
+
+
+def test_lane_index_is_stable_and_in_range():
+    assert lane_index("vk:1", 4) == lane_index("vk:1", 4)
+    assert {lane_index(f"vk:{chat}", 4) for chat in range(100)} == {0, 1, 2, 3}
+
+
+def test_lanes_keep_chat_order_and_run_chats_in_parallel():
+    processed = {}
+    lock = threading.Lock()
+
+    def handler(item):
+        key, idx = item
+        time.sleep(0.01)
+        with lock:
+            processed.setdefault(key, []).append(idx)
+
+    dispatcher = LaneDispatcher(handler, lanes=4, max_queue_per_lane=100, overflow="block").start()
+    keys = [f"vk:{chat}" for chat in range(8)]
+    started = time.perf_counter()
+    for idx in range(5):
+        for key in keys:
+            dispatcher.submit(key, (key, idx))
+    assert dispatcher.wait_idle(5)
+    elapsed = time.perf_counter() - started
+    dispatcher.stop()
+
+    assert all(processed[key] == [0, 1, 2, 3, 4] for key in keys)
+    assert elapsed < 40 * 0.01  # 40 событий по 10 мс на одном потоке заняли бы >= 0.4 с
+    stats = dispatcher.stats()
+    assert stats["processed"] == 40
+    assert all(0 < lane["utilization"] <= 1 for lane in stats["lanes"] if lane["processed"])
+
+
+def _blocked_dispatcher(**kwargs):
+    release = threading.Event()
+    handled = []
+
+    def handler(item):
+        release.wait(5)
+        handled.append(item)
+
+    dispatcher = LaneDispatcher(handler, lanes=1, max_queue_per_lane=2, **kwargs).start()
+    dispatcher.submit("vk:1", "busy")
+    time.sleep(0.05)  # дорожка забрала первое событие и висит в обработчике
+    return dispatcher, release, handled
+
+
+def test_drop_oldest_policy_discards_stale_backlog():
+    dispatcher, release, handled = _blocked_dispatcher(overflow="drop_oldest")
+    outcomes = [dispatcher.submit("vk:1", f"m{idx}") for idx in range(4)]
+    release.set()
+    dispatcher.stop()
+
+    assert outcomes == ["queued", "queued", "dropped_oldest", "dropped_oldest"]
+    assert handled == ["busy", "m2", "m3"]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def test_coalesce_policy_merges_into_pending_message_of_same_chat():
+    dispatcher, release, handled = _blocked_dispatcher(overflow="coalesce", coalesce=lambda old, new: f"{old}+{new}")
+    outcomes = [dispatcher.submit("vk:1", f"m{idx}") for idx in range(4)]
+    release.set()
+    dispatcher.stop()
+
+    assert outcomes == ["queued", "queued", "coalesced", "coalesced"]
+    assert handled == ["busy", "m0", "m1+m2+m3"]
+    assert dispatcher.stats()["coalesced"] == 2
+
+
+def test_max_age_drops_messages_that_waited_too_long():
+    now = [0.0]
+    dispatcher, release, handled = _blocked_dispatcher(overflow="block", max_age_seconds=10, clock=lambda: now[0])
+    dispatcher.submit("vk:1", "old")
+    now[0] = 60.0
+    release.set()
+    dispatcher.stop()
+
+    assert handled == ["busy"]
+    assert dispatcher.stats()["stale"] == 1
+
+
+def test_coalesce_policy_requires_merge_function():
+    with pytest.raises(ValueError):
+        LaneDispatcher(lambda item: None, overflow="coalesce")
+
+
+def test_coalesce_core_events_joins_text_and_remembers_update_ids():
+    merged = coalesce_core_events(
+        IncomingEvent(platform="vk", chat_id=1, user_id=2, text="привет", update_id=10),
+        IncomingEvent(platform="vk", chat_id=1, user_id=3, text="как дела", update_id=11),
+    )
+
+    assert merged.text == "привет\nкак дела"
+    assert merged.update_id == 11
+    assert merged.metadata["coalesced_update_ids"] == [10]
+
+
+class _Bot:
+    def __init__(self):
+        self.texts = []
+
+    def handle_message(self, event):
+        self.texts.append(event.text)
+        return {"status": "ignored"}
+
+
+def test_vk_transport_routes_updates_through_lanes(tmp_path):
+    bot = _Bot()
+    store = VKStateStore(state_path=str(tmp_path / "state.json"))
+    transport = VKLongPollTransport(client=None, bot=bot, state_store=store, lanes=2)
+    transport.dispatcher.start()
+
+    for idx, peer in enumerate([2000000001, 2000000002, 2000000001]):
+        transport._process_update(
+            {"type": "message_new", "event_id": f"e{idx}", "object": {"message": {"peer_id": peer, "from_id": 5, "text": f"t{idx}"}}}
+        )
+    assert transport.dispatcher.wait_idle(5)
+    transport.dispatcher.stop()
+
+    assert sorted(bot.texts) == ["t0", "t1", "t2"]
+    assert all(store.is_processed(f"e{idx}") for idx in range(3))
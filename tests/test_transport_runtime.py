@@ -0,0 +1,198 @@
+import threading
+import time
+
+from noty.transport.router import PlatformAdapter, TransportRouter, VKLongPollSource, VKWebhookEventSource, _StaticEventSource
+from noty.transport.runtime import TransportRuntime, bot_event_handler
+from noty.transport.telegram.mapper import map_telegram_update
+from noty.transport.vk.mapper import map_vk_event
+from noty.transport.vk.state_store import VKStateStore
+
+
+class _BatchSource:
+    """Отдаёт заранее заданные батчи, затем пустые ответы, как long poll без новых событий."""
+
+    long_poll = True
+
+    def __init__(self, batches, delay=0.001):
+        self.batches = list(batches)
+        self.delay = delay
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+        time.sleep(self.delay)
+        return self.batches.pop(0) if self.batches else []
+
+
+def _raw(platform, chat_id, idx):
+    return {
+        "platform": platform,
+        "chat_id": chat_id,
+        "user_id": 1,
+        "text": f"m{idx}",
+        "username": "u",
+        "chat_name": "c",
+        "is_private": False,
+        "raw_event_id": f"{platform}:{chat_id}:{idx}",
+    }
+
+
+def _drain(runtime, source, timeout=5.0):
+    """Ждёт, пока источник отдаст первый батч целиком, затем — пустой очереди runtime."""
+    deadline = time.monotonic() + timeout
+    while source.polls < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert runtime.wait_idle(timeout)
+    runtime.stop()
+
+
+def _router(**sources):
+    return TransportRouter([PlatformAdapter(platform=name, source=source, mapper=dict) for name, source in sources.items()])
+
+
+def test_slow_adapter_does_not_block_other_platform():
+    seen = []
+    slow = _BatchSource([[_raw("vk", 1, 0)]], delay=0.3)
+    fast = _BatchSource([[_raw("telegram", 2, i) for i in range(3)]])
+    runtime = TransportRuntime(_router(vk=slow, telegram=fast), lambda event: seen.append(event.platform), workers=2).start()
+
+    time.sleep(0.15)
+    assert seen == ["telegram"] * 3
+    time.sleep(0.3)
+    runtime.stop()
+    assert seen.count("vk") == 1
+
+
+def test_per_chat_order_is_preserved_across_workers():
+    processed = {}
+    lock = threading.Lock()
+
+    def handler(event):
+        time.sleep(0.001 * (event.chat_id % 3))
+        with lock:
+            processed.setdefault(event.chat_id, []).append(event.text)
+
+    batch = [_raw("vk", chat_id, idx) for idx in range(20) for chat_id in (1, 2, 3)]
+    source = _BatchSource([batch])
+    runtime = TransportRuntime(_router(vk=source), handler, workers=4).start()
+
+    _drain(runtime, source)
+    for chat_id in (1, 2, 3):
+        assert processed[chat_id] == [f"m{idx}" for idx in range(20)]
+    assert runtime.stats()["processed"] == 60
+
+
+def test_backpressure_blocks_pollers_when_workers_fall_behind():
+    release = threading.Event()
+    batch = [_raw("vk", chat_id, 0) for chat_id in range(10)]
+    source = _BatchSource([batch])
+    runtime = TransportRuntime(_router(vk=source), lambda event: release.wait(5), workers=1, max_pending=3).start()
+
+    time.sleep(0.2)
+    stats = runtime.stats()
+    assert stats["pending"] == 3 and stats["received"] == 3
+    assert stats["backpressure_waits"] >= 1
+    release.set()
+    assert runtime.wait_idle(5)
+    runtime.stop()
+    assert runtime.stats()["processed"] == 10
+
+
+def test_invalid_updates_and_handler_errors_do_not_stop_runtime():
+    def mapper(raw):
+        if raw.get("bad"):
+            raise ValueError("не сообщение")
+        return raw
+
+    def handler(event):
+        if event.text == "m0":
+            raise RuntimeError("boom")
+
+    source = _BatchSource([[{"bad": True}, _raw("vk", 1, 0), _raw("vk", 1, 1)]])
+    runtime = TransportRuntime(TransportRouter([PlatformAdapter(platform="vk", source=source, mapper=mapper)]), handler, workers=1).start()
+
+    _drain(runtime, source)
+    assert runtime.stats()["skipped"] == 1
+    assert runtime.stats()["failed"] == 1 and runtime.stats()["processed"] == 1
+
+
+class _Bot:
+    def handle_message(self, event):
+        return {"status": "responded", "text": f"re:{event.text}"}
+
+
+def test_bot_event_handler_sends_reply_through_platform_sender():
+    sent = []
+    handler = bot_event_handler(_Bot(), {"telegram": lambda event, text: sent.append((event.chat_id, text))})
+    router = _router(telegram=_BatchSource([[_raw("telegram", 7, 0)]]))
+    event = next(router.iter_events())
+
+    handler(event)
+
+    assert sent == [(7, "re:m0")]
+
+
+class _CountingSource:
+    def __init__(self, source):
+        self.source = source
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+        return self.source.poll()
+
+
+def _vk_update(event_id, peer_id=2_000_000_001, text="привет"):
+    return {"type": "message_new", "event_id": event_id, "object": {"message": {"peer_id": peer_id, "from_id": 5, "text": text, "conversation_message_id": 1}}}
+
+
+def test_non_long_poll_sources_are_read_once():
+    sent = []
+    static = _CountingSource(_StaticEventSource())
+    webhook = _CountingSource(VKWebhookEventSource(_vk_update("ev-1")))
+    router = TransportRouter(
+        [
+            PlatformAdapter(platform="telegram", source=static, mapper=map_telegram_update),
+            PlatformAdapter(platform="vk", source=webhook, mapper=map_vk_event),
+        ]
+    )
+    handler = bot_event_handler(_Bot(), {"vk": lambda event, text: sent.append((event.chat_id, text))})
+    runtime = TransportRuntime(router, handler, workers=2).start()
+
+    time.sleep(0.2)
+    assert runtime.wait_idle(5)
+    runtime.stop()
+    assert static.polls == 1 and webhook.polls == 1
+    assert sent == [(2_000_000_001, "re:привет")]
+
+
+def test_empty_long_poll_batches_wait_idle_delay():
+    source = _BatchSource([], delay=0.0)
+    runtime = TransportRuntime(_router(vk=source), lambda event: None, poll_idle_delay_seconds=0.05).start()
+
+    time.sleep(0.3)
+    runtime.stop()
+    assert 2 <= source.polls <= 10
+
+
+class _VKClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get_longpoll_server(self):
+        return {"server": "s", "key": "k", "ts": "1"}
+
+    def poll_events(self, server, key, ts, wait=25):
+        return self.responses.pop(0)
+
+
+def test_vk_long_poll_source_skips_processed_updates_across_restarts(tmp_path):
+    state_path = str(tmp_path / "vk_state.json")
+    batch = {"ts": "2", "updates": [_vk_update("ev-1"), _vk_update("ev-2")]}
+    source = VKLongPollSource(_VKClient([batch, batch]), VKStateStore(state_path=state_path))
+    assert [update["event_id"] for update in source.poll()] == ["ev-1", "ev-2"]
+    assert source.poll() == []
+
+    # После рестарта с тем же ts апдейты уже отмечены.
+    restarted = VKLongPollSource(_VKClient([{"ts": "3", "updates": [_vk_update("ev-2"), _vk_update("ev-3")]}]), VKStateStore(state_path=state_path))
+    assert [update["event_id"] for update in restarted.poll()] == ["ev-3"]
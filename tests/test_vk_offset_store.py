@@ -23,3 +23,51 @@ def test_dedup_uses_bounded_cache(tmp_path: Path):
     assert store.is_processed(1) is False
     assert store.is_processed(2) is True
     assert store.is_processed(4) is True
+
+
+def test_state_survives_restart_through_journal_and_compaction(tmp_path: Path):
+    state_file = tmp_path / "vk_state.json"
+    store = VKStateStore(state_path=str(state_file), dedup_cache_size=100, compact_every=5)
+
+    for update_id in range(12):
+        store.mark_processed(update_id)
+    store.set_longpoll_ts("777")
+
+    assert state_file.exists()  # журнал уже сворачивался в снимок
+    restored = VKStateStore(state_path=str(state_file), dedup_cache_size=100)
+    assert restored.get_longpoll_ts() == "777"
+    assert all(restored.is_processed(update_id) for update_id in range(12))
+
+
+def test_batch_writes_one_journal_append_per_poll_cycle(tmp_path: Path, monkeypatch):
+    store = VKStateStore(state_path=str(tmp_path / "vk_state.json"))
+    writes = []
+    original_open = Path.open
+
+    def counting_open(self, *args, **kwargs):
+        if self == store.journal_path:
+            writes.append(args)
+        return original_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", counting_open)
+    with store.batch():
+        store.set_longpoll_ts("1")
+        for update_id in range(10):
+            store.mark_processed(update_id)
+        store.mark_processed(3)  # повтор не пишется
+
+    assert len(writes) == 1
+    assert len(store.journal_path.read_text(encoding="utf-8").splitlines()) == 11
+
+
+def test_legacy_snapshot_and_torn_journal_tail_are_loaded(tmp_path: Path):
+    state_file = tmp_path / "vk_state.json"
+    state_file.write_text('{"longpoll_ts": "5", "processed_update_ids": ["a", "b"]}', encoding="utf-8")
+    (tmp_path / "vk_state.json.journal").write_text('{"id":"c"}\n{"ts":"6"}\n{"id":"d', encoding="utf-8")
+
+    store = VKStateStore(state_path=str(state_file))
+
+    assert store.get_longpoll_ts() == "6"
+    assert [store.is_processed(x) for x in "abcd"] == [True, True, True, False]
+    store.mark_processed("e")
+    assert VKStateStore(state_path=str(state_file)).is_processed("e")
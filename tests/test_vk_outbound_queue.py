@@ -0,0 +1,128 @@
+import json
+import re
+import threading
+
+import pytest
+
+from noty.core.events import IncomingEvent
+from noty.transport.ratelimit import TokenBucket
+from noty.transport.vk.client import VKAPIError
+from noty.transport.vk.outbound import VKOutboundDispatcher
+from noty.transport.vk.polling import VKLongPollTransport
+from noty.transport.vk.state_store import VKStateStore
+
+
+def _calls(code):
+    return [json.loads(raw) for raw in re.findall(r"API\.messages\.send\((\{.*?\})\)", code)]
+
+
+class FakeExecuteClient:
+    """Выполняет execute по сценарию: ``fail`` — множество (peer_id, text) -> сколько раз вернуть ошибку."""
+
+    def __init__(self, fail=None, error_code=6):
+        self.fail = dict(fail or {})
+        self.error_code = error_code
+        self.batches = []
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def execute(self, code):
+        calls = _calls(code)
+        response, errors = [], []
+        with self.lock:
+            self.batches.append(calls)
+            for call in calls:
+                key = (call["peer_id"], call["message"])
+                if self.fail.get(key, 0) > 0:
+                    self.fail[key] -= 1
+                    response.append(False)
+                    errors.append({"method": "messages.send", "error_code": self.error_code, "error_msg": "fail"})
+                else:
+                    self.delivered.append((call["peer_id"], call["message"], call["random_id"]))
+                    response.append(len(self.delivered))
+        return {"response": response, "execute_errors": errors}
+
+
+def test_outbound_batches_up_to_25_sends_per_execute():
+    client = FakeExecuteClient()
+    dispatcher = VKOutboundDispatcher(client, rate_per_second=1000, linger_seconds=0)
+    futures = [dispatcher.send(2_000_000_000 + idx, f"m{idx}", random_id=idx + 1) for idx in range(60)]
+    dispatcher.start()
+    assert dispatcher.wait_idle(5)
+    dispatcher.stop()
+
+    assert [future.result(1) for future in futures] and all(future.done() for future in futures)
+    assert [len(batch) for batch in client.batches] == [25, 25, 10]
+    stats = dispatcher.stats()
+    assert stats["sent"] == 60 and stats["batches"] == 3 and stats["avg_batch_size"] == 20.0
+
+
+def test_outbound_retries_failed_call_and_keeps_peer_order():
+    client = FakeExecuteClient(fail={(1, "a1"): 2})
+    dispatcher = VKOutboundDispatcher(client, rate_per_second=1000, linger_seconds=0, rng=lambda: 0.0)
+    for text in ("a1", "a2", "a3"):
+        dispatcher.send(1, text, random_id=hash(text) & 0xFFFF)
+    other = dispatcher.send(2, "b1", random_id=7)
+    dispatcher.start()
+    assert dispatcher.wait_idle(5)
+    dispatcher.stop()
+
+    assert [text for peer, text, _ in client.delivered if peer == 1] == ["a1", "a2", "a3"]
+    assert other.result(1)
+    # Повтор идёт с тем же random_id, чтобы VK отбросил дубль.
+    sent_ids = {call["random_id"] for batch in client.batches for call in batch if call["message"] == "a1"}
+    assert sent_ids == {hash("a1") & 0xFFFF}
+    assert dispatcher.stats()["retried"] == 2
+    # В одной пачке не больше одного сообщения чата: иначе a2 ушло бы раньше повтора a1.
+    assert all(len({call["peer_id"] for call in batch}) == len(batch) for batch in client.batches)
+
+
+def test_outbound_fails_future_on_non_retryable_error():
+    client = FakeExecuteClient(fail={(1, "bad"): 1}, error_code=901)
+    dispatcher = VKOutboundDispatcher(client, rate_per_second=1000, linger_seconds=0)
+    bad = dispatcher.send(1, "bad")
+    good = dispatcher.send(1, "good")
+    dispatcher.start()
+    assert dispatcher.wait_idle(5)
+    dispatcher.stop()
+
+    with pytest.raises(VKAPIError):
+        bad.result(1)
+    assert good.result(1)
+    assert dispatcher.stats()["failed"] == 1
+
+
+def test_token_bucket_paces_calls_with_fake_clock():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=20, clock=lambda: now[0], sleep=sleep)
+    for _ in range(60):
+        bucket.acquire()
+    # 20 токенов есть сразу, остальные 40 выдаются со скоростью 20/с.
+    assert now[0] == pytest.approx(2.0)
+    assert bucket.try_acquire() == pytest.approx(0.05)
+
+
+class _NoopBot:
+    def handle_message(self, event):
+        return {"status": "responded", "text": f"re: {event.text}"}
+
+
+def test_longpoll_transport_enqueues_replies_to_outbound(tmp_path):
+    client = FakeExecuteClient()
+    dispatcher = VKOutboundDispatcher(client, rate_per_second=1000, linger_seconds=0).start()
+    transport = VKLongPollTransport(
+        client=client,
+        bot=_NoopBot(),
+        state_store=VKStateStore(state_path=str(tmp_path / "vk_state.json")),
+        outbound=dispatcher,
+    )
+    event = IncomingEvent(platform="vk", chat_id=5, user_id=1, text="hi", update_id=11)
+    transport._handle_event(event)
+    assert dispatcher.wait_idle(5)
+    dispatcher.stop()
+
+    assert client.delivered[0][:2] == (5, "re: hi")
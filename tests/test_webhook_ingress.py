@@ -0,0 +1,185 @@
+import asyncio
+import threading
+
+import httpx
+
+from noty.transport.router import TransportRouter
+from noty.transport.runtime import TransportRuntime
+from noty.transport.webhook_server import RecentUpdateIds, WebhookIngress
+from noty.utils.metrics import MetricsCollector
+
+
+def _tg_update(update_id, chat_id=10, text="привет"):
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "chat": {"id": chat_id, "type": "group", "title": "g"}, "from": {"id": 1, "username": "u"}, "text": text},
+    }
+
+
+def _vk_update(event_id, peer_id=2_000_000_001, text="привет", secret="s3"):
+    return {
+        "type": "message_new",
+        "group_id": 77,
+        "event_id": event_id,
+        "secret": secret,
+        "object": {"message": {"peer_id": peer_id, "from_id": 5, "text": text, "conversation_message_id": 1}},
+    }
+
+
+def _post_all(app, requests):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ingress") as client:
+            return [await client.post(path, json=body, headers=headers or {}) for path, body, headers in requests]
+
+    return asyncio.run(scenario())
+
+
+def test_ingress_acks_before_processing_and_dedupes_retries():
+    release = threading.Event()
+    handled = []
+
+    def handler(event):
+        release.wait(5)
+        handled.append((event.platform, event.raw_event_id))
+
+    runtime = TransportRuntime(TransportRouter([]), handler, workers=2).start()
+    app = WebhookIngress(
+        submit=lambda event: runtime.submit(event, block=False),
+        telegram_secret_token="tg-secret",
+        vk_secret="s3",
+        vk_group_id=77,
+    )
+    headers = {"X-Telegram-Bot-Api-Secret-Token": "tg-secret"}
+    responses = _post_all(
+        app,
+        [
+            ("/telegram", _tg_update(100), headers),
+            ("/telegram", _tg_update(100), headers),  # повторная доставка
+            ("/vk", _vk_update("ev-1"), None),
+            ("/vk", _vk_update("ev-1"), None),
+        ],
+    )
+    # Ответ пришёл, пока обработчик ещё заблокирован.
+    assert [r.status_code for r in responses] == [200, 200, 200, 200]
+    assert responses[2].text == "ok"
+    assert handled == []
+
+    release.set()
+    assert runtime.wait_idle(5)
+    runtime.stop()
+    assert sorted(handled) == [("telegram", "100"), ("vk", "1")]
+    assert app.stats()["accepted"] == 2 and app.stats()["duplicates"] == 2
+
+
+def test_ingress_rejects_wrong_secrets_and_answers_vk_confirmation():
+    accepted = []
+    app = WebhookIngress(
+        submit=lambda event: accepted.append(event) or True,
+        telegram_secret_token="tg-secret",
+        vk_secret="s3",
+        vk_confirmation_token="confirm-me",
+        vk_group_id=77,
+    )
+    responses = _post_all(
+        app,
+        [
+            ("/telegram", _tg_update(1), {"X-Telegram-Bot-Api-Secret-Token": "wrong"}),
+            ("/telegram", _tg_update(2), None),
+            ("/vk", _vk_update("ev-1", secret="nope"), None),
+            ("/vk", {"type": "confirmation", "group_id": 77}, None),
+            ("/vk", {"type": "confirmation", "group_id": 1}, None),
+        ],
+    )
+    assert [r.status_code for r in responses] == [403, 403, 403, 200, 403]
+    assert responses[3].text == "confirm-me"
+    assert accepted == []
+    assert app.stats()["unauthorized"] == 4
+
+
+def test_ingress_returns_503_when_queue_full_and_accepts_retry_later():
+    capacity = [0]
+
+    def submit(event):
+        if capacity[0] <= 0:
+            return False
+        capacity[0] -= 1
+        return True
+
+    app = WebhookIngress(submit=submit)
+    first = _post_all(app, [("/telegram", _tg_update(7), None)])
+    capacity[0] = 1
+    retry = _post_all(app, [("/telegram", _tg_update(7), None)])
+    # Отказ не запоминает update_id, поэтому повтор платформы принимается.
+    assert first[0].status_code == 503 and retry[0].status_code == 200
+    assert app.stats()["rejected"] == 1 and app.stats()["accepted"] == 1
+
+
+def test_ingress_counts_requests_in_metrics_collector():
+    metrics = MetricsCollector()
+    app = WebhookIngress(submit=lambda event: True, vk_secret="s3", metrics=metrics)
+    responses = _post_all(
+        app,
+        [
+            ("/telegram", _tg_update(1), None),
+            ("/telegram", _tg_update(1), None),
+            ("/vk", _vk_update("ev-1", secret="nope"), None),
+        ],
+    )
+    assert [r.status_code for r in responses] == [200, 200, 403]
+    assert metrics.counters["webhook_telegram_accepted"] == 1
+    assert metrics.counters["webhook_telegram_duplicates"] == 1
+    assert metrics.counters["webhook_vk_unauthorized"] == 1
+
+
+def test_ingress_rejects_non_numeric_vk_group_id():
+    accepted = []
+    app = WebhookIngress(submit=lambda event: accepted.append(event) or True, vk_secret="s3", vk_group_id=77)
+    responses = _post_all(
+        app,
+        [
+            ("/vk", {**_vk_update("ev-1"), "group_id": "abc"}, None),
+            ("/vk", {**_vk_update("ev-2"), "group_id": {"id": 77}}, None),
+            ("/vk", {**_vk_update("ev-3"), "group_id": 78}, None),
+        ],
+    )
+    assert [r.status_code for r in responses] == [400, 400, 403]
+    assert accepted == []
+    assert app.stats()["bad_requests"] == 2 and app.stats()["unauthorized"] == 1
+
+
+def test_ingress_ignores_non_message_updates_and_bad_json():
+    app = WebhookIngress(submit=lambda event: True)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ingress") as client:
+            return [
+                await client.post("/telegram", json={"update_id": 5, "my_chat_member": {}}),
+                await client.post("/vk", content=b"not json"),
+                await client.get("/healthz"),
+                await client.post("/unknown", json={}),
+            ]
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200, 400, 200, 404]
+    assert responses[2].json()["ignored"] == 1
+
+
+def test_runtime_submit_without_blocking_rejects_when_full():
+    gate = threading.Event()
+    runtime = TransportRuntime(TransportRouter([]), lambda event: gate.wait(5), workers=1, max_pending=1).start()
+    event = {"chat_id": 1, "user_id": 1, "text": "x", "username": "u", "chat_name": "c", "is_private": True, "platform": "vk", "raw_event_id": "1"}
+    assert runtime.submit(event, block=False) is True
+    assert runtime.submit({**event, "raw_event_id": "2"}, block=False) is False
+    gate.set()
+    assert runtime.wait_idle(5)
+    runtime.stop()
+    assert runtime.stats()["rejected"] == 1
+
+
+def test_recent_update_ids_evicts_oldest():
+    ids = RecentUpdateIds(size=2)
+    assert ids.add("a") and ids.add("b") and not ids.add("a")
+    assert ids.add("c")
+    assert ids.add("a")  # "a" вытеснен из окна